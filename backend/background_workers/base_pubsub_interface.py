@@ -1,6 +1,7 @@
 import asyncio
 from typing import Any, Dict, Optional
 from backend.__init__ import logger
+from backend.background_workers.catalog_cache_handler import CatalogCacheHandler
 from backend.background_workers.order_confirm_inv_handler import order_confirm_commitintent_handler
 from backend.background_workers.image_tansform_handler import ImageTransformHandler
 from backend.background_workers.outbox_worker_handler import OutboxHandler
@@ -19,6 +20,7 @@ class BasePubSubWorker():
                        "product_image_uploaded":ImageTransformHandler(),
                        "order_finalize":OutboxHandler(),
                        "order_confirm_intent.created":order_confirm_commitintent_handler,
+                       "catalog.changed":CatalogCacheHandler(),
                        }
         
     
@@ -50,6 +52,10 @@ class BasePubSubWorker():
         order_inv_handler= self.handlers["order_confirm_intent.created"]
         self.subscribe("order_confirm_intent.created",order_inv_handler)
 
+        catalog_cache_handler=self.handlers["catalog.changed"]
+        self.subscribe("catalog.changed",catalog_cache_handler.catalog_changed_handler)
+        self.subscribe("catalog.stock_changed",catalog_cache_handler.stock_changed_handler)
+
 
     def _handler_key(self,fn):
         return (getattr(fn,"__self__",None),getattr(fn,"__func__",fn))
@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import Any, Dict
+from sqlalchemy import update
+from backend.cache.cache_get_n_set import bump_catalog_version
+from backend.cache.existence_filter import product_existence_filter
+from backend.cache.listing_index import listing_index
+from backend.cache.cache_prod_details import detail_version, set_product_availability, write_through_product_details
+from backend.db.connection import async_session
+from backend.__init__ import logger
+from backend.products.repository import fetch_product_availability, fetch_product_details
+from backend.schema.full_schema import OutboxEvent, OutboxEventStatus
+
+
+class CatalogCacheHandler:
+    """
+    Consumes catalog.changed outbox events (product create / patch) and moves the catalog caches forward:
+    syncs the product's listing index entry + fragment, bumps the listing version, lets a created product
+    through this worker's existence filter and writes the product detail document through.
+    catalog.stock_changed events (stock commits) only set the per-product availability entry ,listing pages
+    and the static detail document do not carry stock so they stay cached.
+    All of it is idempotent in effect ,a duplicate delivery only costs a cold page / a rejected older version.
+    """
+    def __init__(self):
+        self.async_session = async_session
+
+    async def catalog_changed_handler(self, task_data: Dict[str, Any], w_name: str):
+        outbox_event_id = task_data.get("outbox_event_id")
+        payload = task_data.get("payload") or {}
+        logger.info("[%s] processing catalog_changed outbox_event=%s product=%s", w_name, outbox_event_id,
+                    payload.get("product_public_id"))
+
+        # listing index first: the version bump below drops assembled pages from L1 ,they must rebuild
+        # from the new fragment
+        product_id = payload.get("product_id")
+        if product_id is not None:
+            await listing_index.sync([int(product_id)])
+
+        await bump_catalog_version()
+
+        product_pid = payload.get("product_public_id")
+        if product_pid and payload.get("reason") == "product.created":
+            product_existence_filter.add(product_pid)
+        if product_pid:
+            # write-through: the detail entry moves to the committed row right away instead of waiting for ttl
+            async with self.async_session() as session:
+                await write_through_product_details(session, product_pid, fetch_product_details)
+
+        await self._mark_done(task_data)
+
+    async def stock_changed_handler(self, task_data: Dict[str, Any], w_name: str):
+        payload = task_data.get("payload") or {}
+        product_pid = payload.get("product_public_id")
+        logger.info("[%s] processing stock_changed outbox_event=%s product=%s", w_name,
+                    task_data.get("outbox_event_id"), product_pid)
+
+        if product_pid:
+            stock_qty, updated_at = payload.get("stock_qty"), payload.get("updated_at")
+            if stock_qty is not None and updated_at:
+                await set_product_availability(product_pid, stock_qty, detail_version(datetime.fromisoformat(updated_at)))
+            else:
+                async with self.async_session() as session:
+                    row = await fetch_product_availability(session, product_pid)
+                if row is not None:
+                    await set_product_availability(product_pid, row[0], detail_version(row[1]))
+
+        await self._mark_done(task_data)
+
+    async def _mark_done(self, task_data: Dict[str, Any]):
+        outbox_event_id = task_data.get("outbox_event_id")
+        if outbox_event_id is None:
+            return
+
+        # a newer write may have re-armed the same outbox row ,only close it if it is still the write we handled
+        emitted_at = task_data.get("emitted_at")
+        stmt = update(OutboxEvent).where(OutboxEvent.id == outbox_event_id,
+                                         OutboxEvent.status == OutboxEventStatus.PENDING.value)
+        if emitted_at:
+            stmt = stmt.where(OutboxEvent.created_at <= datetime.fromisoformat(emitted_at))
+
+        async with self.async_session() as session:
+            await session.execute(stmt.values(status=OutboxEventStatus.DONE.value))
+            await session.commit()
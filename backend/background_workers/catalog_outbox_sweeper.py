@@ -0,0 +1,106 @@
+import asyncio
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import or_, select, update
+from backend.__init__ import logger
+from backend.background_workers.events_publisher_loop import MAX_PUBLISH_ATTEMPTS, compute_backoff
+from backend.common.utils import now
+from backend.config.cache_config import cache_settings
+from backend.db.connection import async_session
+from backend.products.constants import CATALOG_CHANGED_TOPIC, STOCK_CHANGED_TOPIC
+from backend.schema.full_schema import OutboxEvent, OutboxEventStatus
+
+CATALOG_TOPICS = (CATALOG_CHANGED_TOPIC, STOCK_CHANGED_TOPIC)
+
+
+class CatalogOutboxSweeper:
+    """
+    Re-delivers catalog outbox rows the fast path left PENDING: publish_catalog_events hit QueueFull, the
+    process died before publishing, or a handler raised (rows are only closed as DONE by the handlers).
+
+    Every `interval` seconds up to `batch` due rows older than `grace` (younger ones are still with the fast
+    path) are claimed with FOR UPDATE SKIP LOCKED ,so one worker per row across processes ,their attempt is counted and
+    next_retry_at pushed out by the outbox backoff before they go to the in-process pubsub again.
+    A row still open after max_attempts is marked FAILED ,the cache ttls bound how stale that product gets.
+    A new write re-arms the row (attempts 0 ,next_retry_at cleared) so it is swept again.
+    """
+    def __init__(self, session_factory: Callable[[], Any], interval: float, grace: float, batch: int,
+                 max_attempts: int = MAX_PUBLISH_ATTEMPTS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.grace = grace
+        self.batch = batch
+        self.max_attempts = max_attempts
+        self._publish: Optional[Callable[[str, Dict[str, Any]], None]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, publish: Callable[[str, Dict[str, Any]], None]):
+        self._publish = publish
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def shutdown(self):
+        task, self._task = self._task, None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("catalog_outbox_sweeper: sweep failed")
+
+    async def sweep(self) -> int:
+        """One pass ,returns how many rows were handed to the pubsub again."""
+        current = now()
+        async with self.session_factory() as session:
+            async with session.begin():
+                res = await session.execute(
+                    select(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.payload, OutboxEvent.attempts,
+                           OutboxEvent.created_at)
+                    .where(OutboxEvent.topic.in_(CATALOG_TOPICS),
+                           OutboxEvent.status == OutboxEventStatus.PENDING.value,
+                           OutboxEvent.created_at <= current - timedelta(seconds=self.grace),
+                           or_(OutboxEvent.next_retry_at == None, OutboxEvent.next_retry_at <= current))
+                    .order_by(OutboxEvent.id)
+                    .limit(self.batch)
+                    .with_for_update(skip_locked=True)
+                )
+                rows = res.all()
+                due = []
+                for outbox_id, topic, payload, attempts, created_at in rows:
+                    attempts = int(attempts or 0) + 1
+                    if attempts > self.max_attempts:
+                        logger.error("catalog_outbox_sweeper: giving up outbox_event=%s topic=%s", outbox_id, topic)
+                        await session.execute(update(OutboxEvent).where(OutboxEvent.id == outbox_id)
+                                              .values(status=OutboxEventStatus.FAILED.value, next_retry_at=None))
+                        continue
+                    await session.execute(update(OutboxEvent).where(OutboxEvent.id == outbox_id).values(
+                        attempts=attempts, next_retry_at=current + timedelta(seconds=compute_backoff(attempts))))
+                    # same task shape as emit_catalog_changed ,emitted_at keeps the handlers' re-arm guard working
+                    due.append({"outbox_event_id": outbox_id, "topic": topic,
+                                "emitted_at": created_at.isoformat(), "payload": payload})
+
+        published = 0
+        for task in due:
+            try:
+                self._publish(task["topic"], task)
+                published += 1
+            except asyncio.QueueFull:
+                # next_retry_at is already pushed out ,the row comes back after the backoff
+                break
+        if due:
+            logger.info("catalog_outbox_sweeper: redelivered %d/%d rows", published, len(due))
+        return published
+
+
+catalog_outbox_sweeper = CatalogOutboxSweeper(async_session,
+                                              interval=cache_settings.CATALOG_OUTBOX_SWEEP_INTERVAL_SECONDS,
+                                              grace=cache_settings.CATALOG_OUTBOX_SWEEP_GRACE_SECONDS,
+                                              batch=cache_settings.CATALOG_OUTBOX_SWEEP_BATCH)
@@ -5,12 +5,16 @@ from sqlalchemy import text
 from datetime import datetime, timedelta
 from backend.common.utils import now
 from backend.db.connection import async_session
+from backend.background_workers.catalog_cache_handler import CatalogCacheHandler
 from backend.orders.repository import sim_emit_outbox_event
+from backend.products.repository import emit_stock_changed
 from backend.schema.full_schema import CommitIntent, CommitIntentStatus, InventoryReservation, InventoryReserveStatus, Product
 from backend.__init__ import logger
 
 DEFAULT_MAX_ATTEMPTS = 5
 
+catalog_cache_handler = CatalogCacheHandler()
+
 async def order_confirm_commitintent_handler(task_data: Dict[str, Any], worker_name: str):
 
     print("commit intent worker------------------------------------------------------------------------------")
@@ -58,6 +62,7 @@ async def order_confirm_commitintent_handler(task_data: Dict[str, Any], worker_n
 
                 # validate reservation sums and lock product rows then decrement
                 errors = []
+                catalog_events = []
                 for it in items:
                     pid = int(it["product_id"])
                     qty = int(it["quantity"])
@@ -74,9 +79,12 @@ async def order_confirm_commitintent_handler(task_data: Dict[str, Any], worker_n
                         continue
 
                     new_stock = prod.stock_qty - qty
+                    stock_updated_at = now()
                     await session.execute(
-                        update(Product).where(Product.id == pid).values(stock_qty=new_stock, updated_at=now())
+                        update(Product).where(Product.id == pid).values(stock_qty=new_stock, updated_at=stock_updated_at)
                     )
+                    catalog_events.append(
+                        await emit_stock_changed(session, pid, prod.public_id, new_stock, stock_updated_at))
                 if errors:
                     raise RuntimeError(f"errors:{errors}")
 
@@ -101,6 +109,15 @@ async def order_confirm_commitintent_handler(task_data: Dict[str, Any], worker_n
 
             logger.info("commit_intent_handler: processed CI id=%s order=%s", ci_id, order_id)
 
+            # stock is committed ,availability updates are best-effort here (on failure the outbox row stays
+            # PENDING and catalog_outbox_sweeper re-delivers it) and must never send the CI back to retry
+            for event in catalog_events:
+                try:
+                    await catalog_cache_handler.stock_changed_handler(event, worker_name)
+                except Exception:
+                    logger.exception("commit_intent_handler: availability update failed product=%s",
+                                     event["payload"]["product_public_id"])
+
         except Exception as exc:
             # schedule retry/backoff or mark failed after N attempts
             logger.exception("commit_intent_handler: failure processing CI %s: %s", ci_id, exc)
@@ -0,0 +1,73 @@
+"""
+Memory and latency of the in-process rate limit fallback at high key cardinality.
+
+    python -m backend.benchmarks.rate_limit_fallback --keys 1000000
+
+Each of `keys` distinct identities hits the limiter `hits` times (what an outage under real ip diversity
+looks like) ,with the entry cap at --max-keys (default: room for every key). Windows are spread over
+--window seconds of simulated time so the expiry sweep does real work.
+Memory is measured in a separate tracemalloc pass ,tracing would skew the timings.
+"""
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+from backend.rate_limiting.rate_limit_local import LocalFixedWindow
+
+START = 1_700_000_000
+
+
+def _run(limiter: LocalFixedWindow, keys: int, hits: int, limit: int, window: int, sample_every: int = 0):
+    """returns sampled per call latencies in ns"""
+    allow = limiter.allow
+    samples = []
+    step = max(1, keys // window)    # keys arriving per simulated second
+    perf = time.perf_counter_ns
+    for h in range(hits):
+        for i in range(keys):
+            now = START + h * window + i // step
+            if sample_every and i % sample_every == 0:
+                t = perf()
+                allow(f"rl:ip:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:{i}", limit, window, now)
+                samples.append(perf() - t)
+            else:
+                allow(f"rl:ip:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:{i}", limit, window, now)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--hits", type=int, default=2, help="requests per key")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--max-keys", type=int, default=None)
+    args = parser.parse_args()
+    max_keys = args.max_keys or args.keys
+
+    gc.collect()
+    limiter = LocalFixedWindow(max_keys)
+    started = time.perf_counter()
+    samples = _run(limiter, args.keys, args.hits, args.limit, args.window, sample_every=100)
+    elapsed = time.perf_counter() - started
+    calls = args.keys * args.hits
+    samples.sort()
+
+    limiter = None
+    gc.collect()
+    tracemalloc.start()
+    limiter = LocalFixedWindow(max_keys)
+    _run(limiter, args.keys, 1, args.limit, args.window)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{args.keys} keys x {args.hits} hits ,max_keys={max_keys} ,tracked at the end: {len(limiter)}")
+    print(f"calls/s      {calls / elapsed:>12.0f}")
+    print(f"p50 / p99    {statistics.median(samples):>8.0f} / {samples[int(len(samples) * 0.99)]:.0f} ns")
+    print(f"memory       {current / (1024 * 1024):>9.1f} MB ({current / max(1, len(limiter)):.0f} B/key ,"
+          f"peak {peak / (1024 * 1024):.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Redis memory per active key for each rate limiting strategy.
+
+    python -m backend.benchmarks.rate_limit_memory --keys 100000 --hits 10
+
+Every key gets `hits` requests (spread over `keys` keys ,pipelined in batches) through the same script the
+limiter runs ,then used_memory growth and a MEMORY USAGE sample are reported per strategy.
+Uses the configured redis (REDIS_HOST / PORT / DB) under its own key prefix and deletes its keys afterwards ,
+point it at a scratch db.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from backend.cache._cache import create_redis_client
+from backend.rate_limiting.lua_scripts import RATE_LIMIT_SCRIPT_SHAS, RATE_LIMIT_SCRIPTS
+from backend.rate_limiting.rate_limit_sliding_counter import sliding_counter_keys
+
+BENCH_PREFIX = "rlbench"
+
+
+def _script_call(strategy: str, key: str, limit: int, window_ms: int, now_ms: int):
+    """(keys, args) exactly as the limiter passes them"""
+    if strategy == "fixed_window":
+        return (key,), (window_ms,)
+    if strategy == "fixed_window_lease":
+        return (key,), (window_ms, limit, max(1, limit // 10))
+    if strategy == "sliding_window":
+        return (key,), (window_ms, limit, now_ms, f"{now_ms}-{uuid.uuid4().hex[:8]}")
+    if strategy == "sliding_window_counter":
+        cur_key, prev_key, elapsed_ms = sliding_counter_keys(key, window_ms, now_ms)
+        return (cur_key, prev_key), (limit, window_ms, elapsed_ms)
+    return (key,), (max(1, window_ms // limit), window_ms)
+
+
+async def _used_memory(rc) -> int:
+    return int((await rc.info("memory"))["used_memory"])
+
+async def _delete_prefix(rc, prefix: str):
+    batch = []
+    async for key in rc.scan_iter(match=f"{prefix}:*", count=1000):
+        batch.append(key)
+        if len(batch) >= 1000:
+            await rc.unlink(*batch)
+            batch = []
+    if batch:
+        await rc.unlink(*batch)
+
+
+async def bench_strategy(rc, strategy: str, keys: int, hits: int, limit: int, window: int, batch: int) -> dict:
+    prefix = f"{BENCH_PREFIX}:{strategy}"
+    await _delete_prefix(rc, prefix)
+    await rc.script_load(RATE_LIMIT_SCRIPTS[strategy])
+    sha = RATE_LIMIT_SCRIPT_SHAS[strategy]
+    window_ms = window * 1000
+
+    before = await _used_memory(rc)
+    calls = 0
+    started = time.perf_counter()
+    for _ in range(hits):
+        for offset in range(0, keys, batch):
+            pipe = rc.pipeline(transaction=False)
+            now_ms = int(time.time() * 1000)
+            for i in range(offset, min(offset + batch, keys)):
+                keys_, script_args = _script_call(strategy, f"{prefix}:{i}", limit, window_ms, now_ms)
+                pipe.evalsha(sha, len(keys_), *keys_, *script_args)
+            await pipe.execute()
+            calls += min(batch, keys - offset)
+    elapsed = time.perf_counter() - started
+    after = await _used_memory(rc)
+
+    # per identity (the sliding window counter spreads one identity over two keys)
+    sample = []
+    now_ms = int(time.time() * 1000)
+    for i in range(0, keys, max(1, keys // 100)):
+        identity_keys, _ = _script_call(strategy, f"{prefix}:{i}", limit, window_ms, now_ms)
+        sample.append(sum([await rc.memory_usage(k) or 0 for k in identity_keys]))
+    await _delete_prefix(rc, prefix)
+    return {
+        "strategy": strategy,
+        "used_memory_mb": (after - before) / (1024 * 1024),
+        "bytes_per_key": (after - before) / keys,
+        "memory_usage_per_key": sum(sample) / len(sample),
+        "calls_per_sec": calls / elapsed,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--hits", type=int, default=10, help="requests per key")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--batch", type=int, default=1000, help="commands per pipeline")
+    parser.add_argument("--strategies", nargs="+", default=list(RATE_LIMIT_SCRIPTS))
+    args = parser.parse_args()
+
+    rc = create_redis_client(socket_timeout=None, guarded=False)
+    try:
+        print(f"{args.keys} keys x {args.hits} hits ,limit={args.limit}/{args.window}s")
+        print(f"{'strategy':<16}{'used_memory':>14}{'bytes/key':>12}{'MEMORY USAGE':>14}{'calls/s':>12}")
+        for strategy in args.strategies:
+            r = await bench_strategy(rc, strategy, args.keys, args.hits, args.limit, args.window, args.batch)
+            print(f"{r['strategy']:<16}{r['used_memory_mb']:>11.1f} MB{r['bytes_per_key']:>12.0f}"
+                  f"{r['memory_usage_per_key']:>14.0f}{r['calls_per_sec']:>12.0f}")
+    finally:
+        await rc.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Requests per second through RateLimitMiddleware (BaseHTTPMiddleware) vs RateLimitASGIMiddleware.
+
+    python -m backend.benchmarks.rate_limit_middleware --requests 20000 --concurrency 50
+
+Both wrap the same FastAPI app (a handful of catalog style routes returning a small json body) and are
+driven in process with raw asgi calls ,so the numbers are middleware + routing overhead without a server
+or client in the way. The limiter itself is the in-process fixed window unless --redis is given (then both
+hit the configured redis with the fixed window script).
+"""
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI
+from backend.middlewares import rate_limit_middleware
+from backend.middlewares.rate_limit_asgi_middleware import RateLimitASGIMiddleware
+from backend.middlewares.rate_limit_middleware import RateLimitMiddleware
+from backend.rate_limiting import policies
+from backend.rate_limiting.policies import RateLimitPolicy
+from backend.rate_limiting.rate_limit_local import LocalFixedWindow
+
+LIMIT = 1_000_000_000     # nothing is denied ,every request runs the full path
+WINDOW = 60
+
+
+def _app(middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/products")
+    async def products():
+        return {"items": [], "next_cursor": None}
+
+    @app.get("/api/v1/products/{product_id}")
+    async def product(product_id: str):
+        return {"id": product_id}
+
+    for i in range(30):
+        app.add_api_route(f"/api/v1/other{i}/{{item_id}}", products, methods=["GET"])
+
+    if middleware is RateLimitMiddleware:
+        app.add_middleware(RateLimitMiddleware, limit=LIMIT, window=WINDOW)
+    else:
+        app.add_middleware(RateLimitASGIMiddleware, default=RateLimitPolicy(limit=LIMIT, window=WINDOW))
+    return app
+
+
+async def _get(app, path: str, client: str) -> int:
+    status = 0
+    sent_body = False
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()     # never disconnects
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"host", b"bench")], "client": (client, 40000), "server": ("bench", 80)}
+    await app(scope, receive, send)
+    return status
+
+
+async def _bench(app, requests: int, concurrency: int) -> float:
+    paths = [f"/api/v1/products/{i:08x}" if i % 2 else "/api/v1/products" for i in range(requests)]
+    # warm up (route compile ,middleware stack build)
+    await _get(app, paths[0], "10.0.0.1")
+    started = time.perf_counter()
+    for offset in range(0, requests, concurrency):
+        batch = paths[offset:offset + concurrency]
+        statuses = await asyncio.gather(*(_get(app, p, f"10.0.{i % 256}.{i // 256 % 256}")
+                                          for i, p in enumerate(batch, offset)))
+        assert all(s == 200 for s in statuses), statuses
+    return requests / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--redis", action="store_true", help="limit through redis instead of in process")
+    args = parser.parse_args()
+
+    if not args.redis:
+        limiter = LocalFixedWindow(max_keys=1_000_000)
+
+        async def local_allow(key, limit, window):
+            return limiter.allow(key, limit, window)
+        rate_limit_middleware.redis_allow = local_allow
+        policies.RATE_LIMIT_STRATEGIES["fixed_window"] = local_allow
+
+    print(f"{args.requests} requests ,concurrency {args.concurrency} ,limiter: {'redis' if args.redis else 'local'}")
+    for middleware in (RateLimitMiddleware, RateLimitASGIMiddleware):
+        rps = await _bench(_app(middleware), args.requests, args.concurrency)
+        print(f"{middleware.__name__:<26}{rps:>10.0f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
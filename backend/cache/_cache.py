@@ -1,10 +1,90 @@
-
 from asyncio import Lock
+from typing import Optional
 import redis.asyncio as redis ,weakref
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from backend.common.circuit_breaker import CircuitBreaker, CircuitOpenError
+from backend.config.cache_config import cache_settings
 from backend.config.settings import config_settings
 
-redis_client = redis.Redis(
-    host=config_settings.REDIS_HOST, port=config_settings.REDIS_PORT, db=config_settings.REDIS_DB, 
-    decode_responses=False)
+REDIS_LOCK_TIMEOUT = 5   # seconds
+
+# transport level failures ,these (and only these) count against the circuit. script / type errors don't.
+REDIS_UNAVAILABLE_ERRORS = (RedisConnectionError, RedisTimeoutError)
+# what callers catch to fall back to L1 / loader / local limiter
+REDIS_ERRORS = REDIS_UNAVAILABLE_ERRORS + (CircuitOpenError,)
+
+redis_circuit = CircuitBreaker(name="redis",
+                               failure_threshold=cache_settings.REDIS_CB_FAILURE_THRESHOLD,
+                               recovery_timeout=cache_settings.REDIS_CB_RECOVERY_TIMEOUT_SECONDS)
+
+
+# BlockingConnectionPool's ConnectionError when no connection frees up within REDIS_POOL_TIMEOUT_SECONDS
+_POOL_EXHAUSTED_MESSAGE = "No connection available."
+
+
+def _pool_exhausted(exc: Exception) -> bool:
+    return isinstance(exc, RedisConnectionError) and str(exc) == _POOL_EXHAUSTED_MESSAGE
+
+
+async def _guarded(call):
+    probe = await redis_circuit.before_call()
+    try:
+        res = await call
+    except REDIS_UNAVAILABLE_ERRORS as exc:
+        if _pool_exhausted(exc):
+            # a local burst saturating this worker's pool ,the command never reached redis
+            redis_circuit.release_probe(probe)
+        else:
+            redis_circuit.record_failure(probe)
+        raise
+    except BaseException:
+        # redis answered (script / type errors) or the caller went away ,neither says anything about its health
+        redis_circuit.release_probe(probe)
+        raise
+    redis_circuit.record_success(probe)
+    return res
+
+
+class GuardedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        return await _guarded(super().execute(raise_on_error=raise_on_error))
+
+
+class GuardedRedis(redis.Redis):
+    """
+    redis.asyncio.Redis whose commands and pipelines go through redis_circuit.
+    While the circuit is open every call raises CircuitOpenError right away instead of waiting on a socket.
+    """
+    async def execute_command(self, *args, **options):
+        return await _guarded(super().execute_command(*args, **options))
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> GuardedPipeline:
+        return GuardedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def create_redis_client(socket_timeout: Optional[float] = cache_settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+                        max_connections: int = cache_settings.REDIS_MAX_CONNECTIONS,
+                        guarded: bool = True) -> redis.Redis:
+    """
+    Bounded pool (callers wait up to REDIS_POOL_TIMEOUT_SECONDS for a free connection instead of opening
+    unbounded sockets) ,connect / per-command deadlines and periodic health checks on idle connections.
+    """
+    pool = redis.BlockingConnectionPool(
+        host=config_settings.REDIS_HOST, port=config_settings.REDIS_PORT, db=config_settings.REDIS_DB,
+        max_connections=max_connections,
+        timeout=cache_settings.REDIS_POOL_TIMEOUT_SECONDS,
+        socket_timeout=socket_timeout,
+        socket_connect_timeout=cache_settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+        socket_keepalive=True,
+        health_check_interval=cache_settings.REDIS_HEALTH_CHECK_INTERVAL,
+        decode_responses=False)
+    client_cls = GuardedRedis if guarded else redis.Redis
+    return client_cls(connection_pool=pool)
+
+
+redis_client = create_redis_client()
 
-REDIS_LOCK_TIMEOUT = 5   # seconds
\ No newline at end of file
+# long lived pubsub subscriptions sit idle between messages ,no read deadline (health checks keep them honest)
+# and outside the circuit so the notifier's own reconnect loop handles outages
+redis_pubsub_client = create_redis_client(socket_timeout=None, max_connections=4, guarded=False)
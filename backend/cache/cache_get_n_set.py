@@ -1,14 +1,34 @@
-
-
-
 import asyncio
-from typing import Any, Callable, Optional
+import time
+from typing import Any, Callable, Dict, Optional, Set
 import uuid
-from backend.cache._cache import REDIS_LOCK_TIMEOUT, redis_client
-from backend.cache.utils import build_key, deserialize, release_lock, serialize
+from fastapi import Request, Response
+from backend.cache._cache import REDIS_ERRORS, REDIS_LOCK_TIMEOUT, redis_circuit, redis_client
+from backend.cache.constants import CACHE_FILL_CHANNEL, CATALOG_VERSION_KEY, logger
+from backend.cache.l1_cache import l1_cache
+from backend.cache.metrics import (CACHE_FALLBACK_COMPUTE, CACHE_HITS, CACHE_LOCK_ACQUIRED, CACHE_MISSES, CACHE_PREFETCH,
+                                   CACHE_STALE_SERVED, lock_wait_timer, record_lookup, timed_loader)
+from backend.cache.notifications import cache_notifier, publish_fill, publish_invalidation
+from backend.cache.singleflight import cache_flights
+from backend.cache.utils import (ENVELOPE_HEADER_SIZE, CachedBody, build_key, deserialize, etag_matches, eval_cache_script,
+                                 make_cached_body, not_modified_response, pack_envelope, peek_envelope, release_lock,
+                                 serialize, unpack_envelope)
 from backend.common.utils import build_success
+from backend.config.cache_config import cache_settings
+
+# strong refs to in-flight background refreshes (each one owns the redis lock of its key)
+_background_refreshes: Set[asyncio.Task] = set()
+
+# speculative fills in flight in this process ,key -> task (bounded by CACHE_PREFETCH_MAX_IN_FLIGHT)
+_prefetches: Dict[str, asyncio.Task] = {}
+
+# last version seen from redis ,used while redis is unreachable so listing keys stay stable in L1
+_last_catalog_version = 0
 
-CATALOG_VERSION_KEY = "phyl:catalog:version"
+# get_or_lock script replies
+GET_OR_LOCK_HIT = 0
+GET_OR_LOCK_GRANTED = 1
+GET_OR_LOCK_BUSY = 2
 
 
 async def get_bytes(key: str) -> Optional[bytes]:
@@ -18,7 +38,119 @@ async def set_bytes(key: str, data: bytes, ttl_seconds: int):
     await redis_client.set(key, data, ex=ttl_seconds)
 
 async def bump_catalog_version():
-    await redis_client.incr(CATALOG_VERSION_KEY)
+    version = await redis_client.incr(CATALOG_VERSION_KEY)
+    await publish_invalidation(CATALOG_VERSION_KEY)
+    return version
+
+async def get_catalog_version() -> int:
+    """
+    Current catalog version ,held in L1 and dropped there by the invalidation channel on every bump.
+    Listing keys embed it so a bump makes every old page unreachable without any SCAN/DEL sweep.
+    """
+    global _last_catalog_version
+    local = l1_cache.get(CATALOG_VERSION_KEY)
+    if local is not None:
+        return int(local)
+    try:
+        raw = await redis_client.get(CATALOG_VERSION_KEY)
+    except REDIS_ERRORS:
+        return _last_catalog_version
+    version = int(raw) if raw is not None else 0
+    _last_catalog_version = version
+    l1_cache.set(CATALOG_VERSION_KEY, str(version).encode(), depends_on=(CATALOG_VERSION_KEY,))
+    return version
+
+async def cached_not_modified(request: Request, key: str, l1_only: bool = False) -> Optional[Response]:
+    """
+    304 for a matching If-None-Match answered from L1 or the redis envelope header (GETRANGE) alone ,
+    the cached body is never fetched nor deserialized. None means "go through the normal path".
+    A stale entry returns None as well so the regular hit path still schedules its refresh.
+    l1_only skips the redis header for keys that are never written there.
+    """
+    if not request.headers.get("if-none-match"):
+        return None
+
+    local = l1_cache.get(key)
+    if isinstance(local, CachedBody):
+        digest, has_gzip = local.digest, local.gzipped is not None
+    elif l1_only:
+        return None
+    else:
+        try:
+            head = await redis_client.getrange(key, 0, ENVELOPE_HEADER_SIZE - 1)
+        except Exception:
+            return None
+        meta = peek_envelope(head or b"")
+        if meta is None:
+            return None
+        digest, has_gzip, fresh_until = meta
+        if fresh_until <= time.time():
+            return None
+
+    if not digest or not etag_matches(request, digest):
+        return None
+    return not_modified_response(request, digest, has_gzip)
+
+def listing_cache_key(namespace: str, key_suffix: str) -> str:
+    return build_key("phyl", namespace, key_suffix)
+
+def _remember(key: str, body: CachedBody, ttl: float):
+    # listing pages are built against the catalog version ,a bump on any worker drops them here as well
+    l1_cache.set(key, body, ttl, depends_on=(CATALOG_VERSION_KEY,), size=body.nbytes)
+
+async def _fill(key: str, loader: Callable[[], Any], ttl: int, hard_ttl: int) -> CachedBody:
+    value = await loader()
+    success_payload = build_success(
+        value,
+        request_id=None,
+    )
+    body = make_cached_body(serialize(success_payload))
+    try:
+        await set_bytes(key, pack_envelope(body, ttl), hard_ttl)
+    except Exception:
+        pass
+    _remember(key, body, ttl)
+    return body
+
+async def _get_or_lock(key: str, lock_key: str, token: str):
+    """(status, raw value or None) in a single round trip ,see cache.lua_scripts.LUA_GET_OR_LOCK."""
+    res = await eval_cache_script(redis_client, "get_or_lock", 2, key, lock_key, token,
+                                  REDIS_LOCK_TIMEOUT * 1000, repr(time.time()))
+    return int(res[0]), (res[1] if len(res) > 1 else None)
+
+async def _fill_and_release(key: str, lock_key: str, token: str, loader: Callable[[], Any], ttl: int,
+                            hard_ttl: int) -> CachedBody:
+    """Lock holder side: loader ,then store + unlock + wake waiters in one script call."""
+    try:
+        value = await loader()
+    except Exception:
+        await release_lock(redis_client, lock_key, token)
+        # wake waiters on every worker ,on failure they compute themselves
+        await publish_fill(key)
+        raise
+    body = make_cached_body(serialize(build_success(value, request_id=None)))
+    try:
+        await eval_cache_script(redis_client, "fill_and_release", 2, key, lock_key, token,
+                                pack_envelope(body, ttl), hard_ttl, CACHE_FILL_CHANNEL)
+    except Exception:
+        # lock expires on its own ,waiters give up after lock_timeout
+        logger.warning("cache.fill.store_failed", extra={"cache_key": key})
+    _remember(key, body, ttl)
+    return body
+
+async def _refresh_in_background(key: str, lock_key: str, token: str, loader: Callable[[], Any], ttl: int,
+                                 hard_ttl: int):
+    try:
+        await _fill_and_release(key, lock_key, token, loader, ttl, hard_ttl)
+    except Exception:
+        # stale entry keeps being served until hard ttl ,next stale hit retries the refresh
+        logger.warning("cache.refresh.failed", extra={"cache_key": key})
+
+def _schedule_refresh(key: str, lock_key: str, token: str, loader: Callable[[], Any], ttl: int, hard_ttl: int):
+    # the caller already holds the redis lock (granted by get_or_lock) ,so this is the only refresh fleet wide
+    task = asyncio.create_task(_refresh_in_background(key, lock_key, token, loader, ttl, hard_ttl))
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
 
 
 async def cache_get_or_set_product_listings(
@@ -27,97 +159,156 @@ async def cache_get_or_set_product_listings(
     ttl: int,
     loader: Callable[[], Any],
     mode: str = "wait",
-    stale_window: int = 15,  # seconds before expiry to refresh in background
+    stale_window: int = 15,  # seconds past ttl an entry may still be served while it is refreshed in background
     lock_timeout: int = 8,
-) -> Any:
-   
-    key = build_key("phyl", namespace, key_suffix)
-    raw = await get_bytes(key)
+    on_fetched: Optional[Callable[[CachedBody], Any]] = None,
+) -> CachedBody:
+    """
+    ttl is the soft ttl (freshness) stored inside the cached envelope.
+    mode="stale" keeps entries in redis for ttl + stale_window ,a hit past the soft ttl is served immediately
+    and a single background task (guarded by the redis lock) refreshes it ,so expiry never blocks a request.
+    mode="wait" has no stale phase ,hard ttl == ttl.
+    `loader` must not depend on request scoped resources since it may run after the response is sent.
+    on_fetched(body) runs once per flight for bodies that came from redis or the loader ,never on L1 hits.
+    """
+    key = listing_cache_key(namespace, key_suffix)
+    hard_ttl = ttl + stale_window if mode == "stale" else ttl
+    record_lookup(namespace, key)
+
+    local = l1_cache.get(key)
+    if local is not None:
+        CACHE_HITS.labels(namespace, "l1").inc()
+        return local
+
+    loader = timed_loader(namespace, loader)
+
+    # redis circuit open => straight to the loader ,L1 (and singleflight) still absorb repeats in this worker
+    if redis_circuit.is_open:
+        CACHE_FALLBACK_COMPUTE.labels(namespace, "redis_unavailable").inc()
+        return await cache_flights.do(key, _then(lambda: _fill(key, loader, ttl, hard_ttl), on_fetched))
+
+    # only one coroutine per process goes to redis (and maybe the lock / loader) for a given key
+    try:
+        return await cache_flights.do(
+            key, _then(lambda: _get_or_fill_listing(namespace, key, ttl, hard_ttl, loader, mode, lock_timeout),
+                       on_fetched))
+    except REDIS_ERRORS:
+        logger.warning("cache.redis_unavailable", extra={"cache_key": key})
+        CACHE_FALLBACK_COMPUTE.labels(namespace, "redis_unavailable").inc()
+        return await cache_flights.do(key, _then(lambda: _fill(key, loader, ttl, hard_ttl), on_fetched))
+
+
+def _then(fetch: Callable[[], Any], on_fetched: Optional[Callable[[CachedBody], Any]]) -> Callable[[], Any]:
+    if on_fetched is None:
+        return fetch
+
+    async def run():
+        body = await fetch()
+        on_fetched(body)
+        return body
+    return run
+
+
+async def _get_or_fill_listing(namespace: str, key: str, ttl: int, hard_ttl: int, loader: Callable[[], Any], mode: str,
+                               lock_timeout: int) -> CachedBody:
+    # GET + lock attempt in one script call ,a fresh hit never takes the lock
+    lock_key = key + ":lock"
+    token = uuid.uuid4().hex
+    status, raw = await _get_or_lock(key, lock_key, token)
+
+    body = None
     if raw is not None:
-        #** may add background refresh when ttl is nearing expiry for stale modes
         try:
-            print("deserializing cache hit")
-            return deserialize(raw)
+            body, fresh_until = unpack_envelope(deserialize(raw))
         except Exception:
             await redis_client.delete(key)
-            raw = None
+            if status == GET_OR_LOCK_HIT:
+                # corrupt entry ,recompute without coordination (rare)
+                CACHE_FALLBACK_COMPUTE.labels(namespace, "corrupt_entry").inc()
+                return await _fill(key, loader, ttl, hard_ttl)
 
-    # cache miss => try lock
-    lock_key = key + ":lock"
-    token = uuid.uuid4().hex
-    locked = await redis_client.set(lock_key, token, nx=True, ex=REDIS_LOCK_TIMEOUT)
-    if locked:
+    if status == GET_OR_LOCK_HIT:
+        CACHE_HITS.labels(namespace, "redis").inc()
+        _remember(key, body, fresh_until - time.time())
+        return body
+
+    if status == GET_OR_LOCK_GRANTED:
+        CACHE_LOCK_ACQUIRED.labels(namespace).inc()
+        if body is not None and mode == "stale":
+            # stale hit and we own the lock: serve stale now ,refill in background so expiry never blocks
+            CACHE_STALE_SERVED.labels(namespace).inc()
+            _schedule_refresh(key, lock_key, token, loader, ttl, hard_ttl)
+            return body
+        CACHE_MISSES.labels(namespace).inc()
+        return await _fill_and_release(key, lock_key, token, loader, ttl, hard_ttl)
+
+    # someone else is computing
+    if body is not None and mode == "stale":
+        CACHE_STALE_SERVED.labels(namespace).inc()
+        return body
+
+    # block until its fill notification (or the lock timeout) instead of polling
+    CACHE_MISSES.labels(namespace).inc()
+    with cache_notifier.fill_waiter(key) as waiter, lock_wait_timer(namespace):
+        # the fill may have landed between our script call and registering the waiter
+        raw_after = await redis_client.get(key)
+        if raw_after is None or raw_after == raw:
+            await waiter.wait(lock_timeout + 1)
+            raw_after = await redis_client.get(key)
+
+    if raw_after is not None:
         try:
-            # re-check cache: another process may have populated while we raced for lock 
-            # as in like someone acquired lock and released it as well , so in case we try to acquire lock after that .
-            raw_after = await get_bytes(key)
-            if raw_after is not None:
-                try:
-                    return deserialize(raw_after)
-                except Exception:
-                    await redis_client.delete(key)
-                
-            value = await loader()
-            success_payload = build_success(
-                value,
-                request_id=None,
-            )
-            payload_bytes=serialize(success_payload)
-           
-            try:
-                await set_bytes(key, payload_bytes, ttl)
-            except Exception as e:
-                pass
-            return payload_bytes
-        finally:
-            await release_lock(redis_client, lock_key, token)
-    else:
-        # someone else is computing 
-        if mode == "wait":
-            # poll until cache appears or timeout
-            waited = 0.0
-            interval = 0.05
-            timeout = lock_timeout + 1
-            while waited < timeout:
-                await asyncio.sleep(interval)
-                waited += interval
-                raw_after = await redis_client.get(key)
-                if raw_after is not None:
-                    try:
-                        return deserialize(raw_after)
-                    except Exception:
-                        await redis_client.delete(key)
-                        break
-            # fallback to compute ourselves
-            value = await loader()
-            success_payload = build_success(
-                value,
-                request_id=None,
-            )
-            payload_bytes=serialize(success_payload)
-            try:
-                await redis_client.set(key, payload_bytes, ex=ttl)
-            except Exception:
-                pass
-            return payload_bytes
+            body, fresh_until = unpack_envelope(deserialize(raw_after))
+            if mode == "stale" or fresh_until > time.time():
+                _remember(key, body, fresh_until - time.time())
+                return body
+        except Exception:
+            await redis_client.delete(key)
+
+    # lock holder failed or timed out => fallback to compute ourselves
+    CACHE_FALLBACK_COMPUTE.labels(namespace, "lock_timeout").inc()
+    return await _fill(key, loader, ttl, hard_ttl)
+
+
+def prefetch_listing(namespace: str, key_suffix: str, ttl: int, loader: Callable[[], Any],
+                     stale_window: int = 15) -> bool:
+    """
+    Low priority background fill of a listing key a client is likely to ask for next (eg. the next page).
+    Skipped when the key is already in L1 / being computed in this worker, when the per-worker prefetch
+    budget is used up or while redis is unavailable. Fleet wide dedup comes from the same redis lock as a
+    regular miss ,a prefetch never waits for another worker's fill. Returns True if a fill was scheduled.
+    """
+    if not cache_settings.CACHE_PREFETCH_ENABLED or redis_circuit.is_open:
+        return False
+    key = listing_cache_key(namespace, key_suffix)
+    if key in _prefetches or cache_flights.in_flight(key) or l1_cache.get(key) is not None:
+        return False
+    if len(_prefetches) >= cache_settings.CACHE_PREFETCH_MAX_IN_FLIGHT:
+        CACHE_PREFETCH.labels(namespace, "budget_exhausted").inc()
+        return False
+
+    task = asyncio.create_task(_prefetch(namespace, key, ttl, ttl + stale_window, timed_loader(namespace, loader)))
+    _prefetches[key] = task
+    task.add_done_callback(lambda t: _prefetches.pop(key, None))
+    return True
+
+async def _prefetch(namespace: str, key: str, ttl: int, hard_ttl: int, loader: Callable[[], Any]):
+    try:
+        # yield once so the response that triggered us goes out first
+        await asyncio.sleep(0)
+        token = uuid.uuid4().hex
+        lock_key = key + ":lock"
+        status, raw = await _get_or_lock(key, lock_key, token)
+        if status == GET_OR_LOCK_HIT:
+            body, fresh_until = unpack_envelope(deserialize(raw))
+            _remember(key, body, fresh_until - time.time())
+            CACHE_PREFETCH.labels(namespace, "cached").inc()
+        elif status == GET_OR_LOCK_GRANTED:
+            # missing or stale ,either way we hold the lock now
+            await _fill_and_release(key, lock_key, token, loader, ttl, hard_ttl)
+            CACHE_PREFETCH.labels(namespace, "filled").inc()
         else:
-            # mode == "stale": short wait then fallback to compute
-            await asyncio.sleep(0.15)
-            raw_after = await redis_client.get(key)
-            if raw_after is not None:
-                try:
-                    return deserialize(raw_after)
-                except Exception:
-                    await redis_client.delete(key)
-            # fallback to compute (do NOT take lock here to avoid heavy thundering)
-            value = await loader()
-            success_payload = build_success(
-                value,
-                request_id=None,
-            )
-            payload_bytes=serialize(success_payload)
-            try:
-                await redis_client.set(key, payload_bytes, ex=ttl)
-            except Exception:
-                pass
-            return payload_bytes
\ No newline at end of file
+            CACHE_PREFETCH.labels(namespace, "busy").inc()
+    except Exception:
+        CACHE_PREFETCH.labels(namespace, "failed").inc()
+        logger.warning("cache.prefetch.failed", extra={"cache_key": key})
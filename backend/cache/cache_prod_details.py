@@ -1,22 +1,251 @@
-import asyncio
+import hashlib
 import time
 import uuid
-from backend.cache._cache import redis_client
-from backend.cache.utils import deserialize, release_lock, serialize
+import orjson
+from typing import Optional
+from fastapi import HTTPException, Request, Response
+from datetime import datetime, timedelta, timezone
+from backend.cache._cache import REDIS_ERRORS, redis_circuit, redis_client
+from backend.cache.constants import CACHE_INVALIDATION_CHANNEL
+from backend.cache.existence_filter import product_existence_filter
+from backend.cache.l1_cache import l1_cache
+from backend.cache.metrics import (CACHE_FALLBACK_COMPUTE, CACHE_HITS, CACHE_LOADER, CACHE_LOCK_ACQUIRED, CACHE_MISSES,
+                                   lock_wait_timer, record_lookup)
+from backend.cache.notifications import cache_notifier, publish_fill, publish_invalidation
+from backend.cache.singleflight import cache_flights
+from backend.cache.utils import (ENVELOPE_HEADER_SIZE, ETAG_DIGEST_SIZE, CachedBody, content_digest, deserialize, etag_matches,
+                                 make_cached_body, not_modified_response, pack_envelope, peek_envelope, release_lock,
+                                 serialize, unpack_envelope)
 from backend.common.utils import build_success
+from backend.config.cache_config import cache_settings
+from backend.db.connection import async_session
 
-PRODUCT_DETAIL_TTL = 15 * 60  # 15 min
+PRODUCT_DETAIL_TTL = 15 * 60  # 15 min ,catalog writes write through (see write_through_product_details) ,the ttl
+                              # bounds staleness when that write-through is lost for good
 REDIS_LOCK_TIMEOUT = 5  # seconds
 
+# stored under product:{id} for ids the db answered 404 for ,never a valid envelope (first byte is the version)
+PRODUCT_TOMBSTONE = b"\x00404"
+METRICS_NAMESPACE = "product_details"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def product_cache_key(product_public_id: str) -> str:
+    return f"product:{product_public_id}"
+
+def product_version_key(product_public_id: str) -> str:
+    return f"product:{product_public_id}:ver"
+
+def product_availability_key(product_public_id: str) -> str:
+    # hash {qty, ver} ,kept out of the static detail document so stock movements never rebuild it
+    return f"product:{product_public_id}:avail"
+
+def _remember(product_public_id: str, body: CachedBody):
+    l1_cache.set(product_cache_key(product_public_id), body, PRODUCT_DETAIL_TTL,
+                 depends_on=(product_version_key(product_public_id),), size=body.nbytes)
+
+def _remember_availability(product_public_id: str, stock_qty: int):
+    key = product_availability_key(product_public_id)
+    l1_cache.set(key, stock_qty, cache_settings.PRODUCT_AVAILABILITY_L1_TTL_SECONDS, depends_on=(key,), size=8)
+
+def _not_found() -> HTTPException:
+    return HTTPException(status_code=404, detail="Product not found")
+
+def reject_unknown_product(product_public_id: str):
+    """404 straight from the in-memory existence filter ,no redis / db io for ids that can not exist."""
+    if not product_existence_filter.might_exist(product_public_id):
+        raise _not_found()
+
+def _raise_if_tombstone(raw):
+    if raw == PRODUCT_TOMBSTONE:
+        raise _not_found()
+
+async def _load_or_tombstone(session, product_public_id: str, get_product_details_db) -> dict:
+    """db read that leaves a short lived tombstone behind on 404 ,repeat misses stop at redis."""
+    try:
+        with CACHE_LOADER.labels(METRICS_NAMESPACE).time():
+            return await get_product_details_db(session, product_public_id)
+    except HTTPException as e:
+        if e.status_code == 404:
+            await _set_tombstone(product_public_id)
+        raise
+
+async def _set_tombstone(product_public_id: str):
+    try:
+        # NX: never clobber a real document written through in the meantime
+        await redis_client.set(product_cache_key(product_public_id), PRODUCT_TOMBSTONE,
+                               ex=cache_settings.PRODUCT_NOT_FOUND_TTL, nx=True)
+    except Exception:
+        pass
+
+def detail_version(updated_at: datetime) -> int:
+    """
+    Monotonic cache version for a product row: updated_at in integer microseconds since epoch.
+    Exact integer math (no float timestamp) so two writes within the same second still order correctly.
+    """
+    return (updated_at - _EPOCH) // timedelta(microseconds=1)
+
+def _details_payload(product_details: dict):
+    """
+    Serialize the db row dict into the cached success envelope ,returns (CachedBody, version, stock_qty).
+    stock_qty is not part of the static document ,it lives in the availability entry.
+    """
+    updated_at = product_details.get("updated_at")
+    updated_at_ts = detail_version(updated_at)
+    stock_qty = product_details.pop("stock_qty", None)
+
+    product_details["updated_at"] = updated_at.isoformat()
+    product_details["_cached_at"] = updated_at_ts
+    return make_cached_body(serialize(build_success(product_details, request_id=None))), updated_at_ts, stock_qty
+
+
+# every static document starts with this (build_success key order ,data is never empty) ,stock_qty is spliced
+# in right after it so the cached bytes are never parsed per request
+_DATA_PREFIX = b'{"status":"ok","data":{'
+
+def availability_digest(static_digest: bytes, stock_qty: int) -> bytes:
+    return hashlib.blake2b(static_digest + b":%d" % stock_qty, digest_size=ETAG_DIGEST_SIZE).digest()
+
+def with_availability(body: CachedBody, stock_qty: int) -> CachedBody:
+    """Static document + current stock as one response body (identity only ,GZipMiddleware handles large ones)."""
+    identity = body.identity
+    if identity.startswith(_DATA_PREFIX):
+        merged = b'%s"stock_qty":%d,%s' % (_DATA_PREFIX, stock_qty, identity[len(_DATA_PREFIX):])
+    else:
+        doc = orjson.loads(identity)
+        doc["data"]["stock_qty"] = stock_qty
+        merged = serialize(doc)
+    static_digest = body.digest or content_digest(identity)
+    return CachedBody(merged, None, availability_digest(static_digest, stock_qty))
+
+
+async def product_details_not_modified(request: Request, product_public_id: str) -> Optional[Response]:
+    """
+    304 for a matching If-None-Match from L1 / the document's envelope header plus the availability entry
+    (one pipelined round trip) ,the document body is never fetched. None means "go through the normal path".
+    """
+    if not request.headers.get("if-none-match"):
+        return None
+
+    key = product_cache_key(product_public_id)
+    local = l1_cache.get(key)
+    qty = l1_cache.get(product_availability_key(product_public_id))
+    replies = []
+    if local is None or qty is None:
+        pipe = redis_client.pipeline(transaction=False)
+        if local is None:
+            pipe.getrange(key, 0, ENVELOPE_HEADER_SIZE - 1)
+        if qty is None:
+            pipe.hget(product_availability_key(product_public_id), "qty")
+        try:
+            replies = await pipe.execute()
+        except Exception:
+            return None
+        if qty is None:
+            qty = replies[-1]
+            if qty is None:
+                return None
+            _remember_availability(product_public_id, int(qty))
+    if local is not None:
+        static_digest = local.digest
+    else:
+        meta = peek_envelope(replies[0] or b"")
+        if meta is None:
+            return None
+        static_digest = meta[0]
+
+    digest = availability_digest(static_digest, int(qty))
+    if not static_digest or not etag_matches(request, digest):
+        return None
+    return not_modified_response(request, digest, False)
+
+async def set_product_availability(product_public_id: str, stock_qty: int, version: int) -> bool:
+    """
+    Set-if-newer on the availability hash (version = detail_version of the row that produced stock_qty).
+    Raises on redis errors so the stock outbox row stays PENDING ,request paths use _try_set_availability.
+    """
+    key = product_availability_key(product_public_id)
+    res = await redis_client.eval(_SET_AVAILABILITY_IF_NEWER_LUA, 1, key, str(int(stock_qty)), str(version),
+                                  str(PRODUCT_DETAIL_TTL), CACHE_INVALIDATION_CHANNEL)
+    if res:
+        # other workers drop theirs on the script's PUBLISH ,this one right away
+        l1_cache.invalidate_dependents(key)
+    return bool(res)
+
+async def _try_set_availability(product_public_id: str, stock_qty: int, version: int):
+    try:
+        await set_product_availability(product_public_id, stock_qty, version)
+    except Exception:
+        pass
+
+async def _availability(session, product_public_id: str, get_product_details_db) -> int:
+    """
+    Stock from L1 (a short lived copy ,dropped on every change) or redis ,cold entries are rebuilt from the row
+    (never from the possibly older document).
+    """
+    local = l1_cache.get(product_availability_key(product_public_id))
+    if local is not None:
+        return local
+    raw = await redis_client.hget(product_availability_key(product_public_id), "qty")
+    if raw is not None:
+        _remember_availability(product_public_id, int(raw))
+        return int(raw)
+    product_details = await _load_or_tombstone(session, product_public_id, get_product_details_db)
+    stock_qty = int(product_details["stock_qty"])
+    await _try_set_availability(product_public_id, stock_qty, detail_version(product_details["updated_at"]))
+    return stock_qty
+
+
 async def cache_get_n_set_product_details(session, product_public_id: str,get_product_details_db):
-    key = f"product:{product_public_id}"
+    """Static document (L1 / redis / db) merged with the exact availability entry ,callers run reject_unknown_product first."""
+    key = product_cache_key(product_public_id)
+    record_lookup(METRICS_NAMESPACE, key)
+    if redis_circuit.is_open:
+        CACHE_FALLBACK_COMPUTE.labels(METRICS_NAMESPACE, "redis_unavailable").inc()
+        return await _details_from_db(session, product_public_id, get_product_details_db)
+
+    try:
+        static = l1_cache.get(key)
+        if static is not None:
+            CACHE_HITS.labels(METRICS_NAMESPACE, "l1").inc()
+        else:
+            # concurrent requests for the same product in this process share one redis/db round
+            # the flight outlives this request for its followers ,so it loads on its own session
+            static = await cache_flights.do(
+                key, lambda: _get_or_fill_details(product_public_id, get_product_details_db))
+
+        stock_qty = await _availability(session, product_public_id, get_product_details_db)
+    except REDIS_ERRORS:
+        CACHE_FALLBACK_COMPUTE.labels(METRICS_NAMESPACE, "redis_unavailable").inc()
+        return await _details_from_db(session, product_public_id, get_product_details_db)
+    return with_availability(static, stock_qty)
+
+
+async def _details_from_db(session, product_public_id: str, get_product_details_db) -> CachedBody:
+    """redis unreachable: row straight from the db (stock included ,so exact) ,nothing is written back."""
+    body, _, stock_qty = _details_payload(await get_product_details_db(session, product_public_id))
+    return with_availability(body, stock_qty)
+
+
+async def _load_detached(product_public_id: str, get_product_details_db) -> dict:
+    """Detail row on a session of its own ,never the request scoped one of whichever request led the flight."""
+    async with async_session() as session:
+        return await _load_or_tombstone(session, product_public_id, get_product_details_db)
+
+async def _get_or_fill_details(product_public_id: str, get_product_details_db) -> CachedBody:
+    key = product_cache_key(product_public_id)
     lock_key = key + ":lock"
 
     # Try to get from cache
     raw = await redis_client.get(key)
+    _raise_if_tombstone(raw)
     if raw:
         try:
-            return deserialize(raw)
+            value, _ = unpack_envelope(deserialize(raw))
+            CACHE_HITS.labels(METRICS_NAMESPACE, "redis").inc()
+            _remember(product_public_id, value)
+            return value
         except Exception:
             await redis_client.delete(key)
 
@@ -24,90 +253,238 @@ async def cache_get_n_set_product_details(session, product_public_id: str,get_pr
     token = uuid.uuid4().hex
     locked = await redis_client.set(lock_key, token, nx=True, ex=REDIS_LOCK_TIMEOUT)
 
-    print("cache miss")
+    CACHE_MISSES.labels(METRICS_NAMESPACE).inc()
     if locked:
+        CACHE_LOCK_ACQUIRED.labels(METRICS_NAMESPACE).inc()
         try:
             # Re-check cache after acquiring lock
             raw_after = await redis_client.get(key)
+            _raise_if_tombstone(raw_after)
             if raw_after:
                 try:
-                    return deserialize(raw)
+                    value, _ = unpack_envelope(deserialize(raw_after))
+                    _remember(product_public_id, value)
+                    return value
                 except Exception:
                     await redis_client.delete(key)
 
             # Fetch from DB
-            product_details = await get_product_details_db(session, product_public_id)
-            updated_at = product_details.get("updated_at")
-           
-            updated_at_ts = int(updated_at.timestamp())
-            
-            product_details["updated_at"] = updated_at.isoformat()
-            product_details["_cached_at"] = updated_at_ts
+            product_details = await _load_detached(product_public_id, get_product_details_db)
+            body, updated_at_ts, stock_qty = _details_payload(product_details)
 
             # Store in cache
-            await set_product_cache_if_newer(redis_client, product_public_id, product_details, 
+            await set_product_cache_if_newer(redis_client, product_public_id, body,
                                              updated_at_ts, PRODUCT_DETAIL_TTL)
-            return product_details
-            
+            await _try_set_availability(product_public_id, stock_qty, updated_at_ts)
+            _remember(product_public_id, body)
+            return body
+
         finally:
             await release_lock(redis_client, lock_key, token)
+            await publish_fill(key)
     else:
-        # Someone else is fetching — wait briefly and retry
-        waited = 0.0
-        interval = 0.05
-        timeout = REDIS_LOCK_TIMEOUT + 1
-        while waited < timeout:
-            await asyncio.sleep(interval)
-            waited += interval
+        # Someone else is fetching — block on its fill notification (bounded by the lock timeout)
+        with cache_notifier.fill_waiter(key) as waiter, lock_wait_timer(METRICS_NAMESPACE):
             raw_after = await redis_client.get(key)
-            if raw_after:
-                try:
-                    return deserialize(raw_after)
-                except Exception:
-                    await redis_client.delete(key)
-                    break
+            if not raw_after:
+                await waiter.wait(REDIS_LOCK_TIMEOUT + 1)
+                raw_after = await redis_client.get(key)
+        _raise_if_tombstone(raw_after)
+        if raw_after:
+            try:
+                value, _ = unpack_envelope(deserialize(raw_after))
+                _remember(product_public_id, value)
+                return value
+            except Exception:
+                await redis_client.delete(key)
         # Fallback: fetch ourselves if cache still empty
-        product_details = await get_product_details_db(session, product_public_id)
-        updated_at = product_details.get("updated_at")
-           
-        updated_at_ts = int(updated_at.timestamp())
-        product_details["updated_at"] = updated_at.isoformat()
-        product_details["_cached_at"] = updated_at_ts
+        CACHE_FALLBACK_COMPUTE.labels(METRICS_NAMESPACE, "lock_timeout").inc()
+        product_details = await _load_detached(product_public_id, get_product_details_db)
+        body, updated_at_ts, stock_qty = _details_payload(product_details)
 
         # Store in cache
-        await set_product_cache_if_newer(redis_client, product_public_id, product_details, 
+        await set_product_cache_if_newer(redis_client, product_public_id, body,
                                             updated_at_ts, PRODUCT_DETAIL_TTL)
-        return product_details
-    
+        await _try_set_availability(product_public_id, stock_qty, updated_at_ts)
+        return body
 
 
-async def set_product_cache_if_newer(redis_client, public_id: str, payload: dict, new_ts: int, ttl: int):
+
+async def cache_get_n_set_product_details_batch(session, product_public_ids: list[str], get_products_details_db) -> list:
+    """
+    Many product details in one redis round trip: L1 first ,then a single pipeline (MGET of the static
+    documents + HGET of the availability entries not held in L1) ,one set based db query for whatever is
+    cold and one pipelined set-if-newer backfill.
+    Returns the detail documents (data part of each cached envelope + stock_qty) in request order ,
+    None for unknown ids.
+    """
+    unique_ids = [pid for pid in dict.fromkeys(product_public_ids) if product_existence_filter.might_exist(pid)]
+    if not unique_ids:
+        return [None for _ in product_public_ids]
+    if redis_circuit.is_open:
+        return await _details_batch_from_db(session, unique_ids, product_public_ids, get_products_details_db)
+    try:
+        return await _details_batch(session, unique_ids, product_public_ids, get_products_details_db)
+    except REDIS_ERRORS:
+        return await _details_batch_from_db(session, unique_ids, product_public_ids, get_products_details_db)
+
+
+async def _details_batch_from_db(session, unique_ids: list, product_public_ids: list, get_products_details_db) -> list:
+    loaded = await get_products_details_db(session, unique_ids)
+    docs = {}
+    for pid, product_details in loaded.items():
+        body, _, stock_qty = _details_payload(product_details)
+        doc = orjson.loads(body.identity)["data"]
+        doc["stock_qty"] = stock_qty
+        docs[pid] = doc
+    return [docs.get(pid) for pid in product_public_ids]
+
+
+async def _details_batch(session, unique_ids: list, product_public_ids: list, get_products_details_db) -> list:
+    found: dict = {}
+    stock: dict = {}
+
+    remote_ids = []
+    for pid in unique_ids:
+        local = l1_cache.get(product_cache_key(pid))
+        if local is not None:
+            found[pid] = local
+        else:
+            remote_ids.append(pid)
+        qty = l1_cache.get(product_availability_key(pid))
+        if qty is not None:
+            stock[pid] = qty
+    stock_ids = [pid for pid in unique_ids if pid not in stock]
+
+    raws = []
+    if remote_ids or stock_ids:
+        pipe = redis_client.pipeline(transaction=False)
+        if remote_ids:
+            pipe.mget([product_cache_key(pid) for pid in remote_ids])
+        for pid in stock_ids:
+            pipe.hget(product_availability_key(pid), "qty")
+        replies = await pipe.execute()
+        raws = replies[0] if remote_ids else []
+        for pid, qty in zip(stock_ids, replies[1:] if remote_ids else replies):
+            if qty is not None:
+                stock[pid] = int(qty)
+                _remember_availability(pid, int(qty))
+
+    missing_ids = []
+    for pid, raw in zip(remote_ids, raws):
+        if raw == PRODUCT_TOMBSTONE:
+            continue
+        if raw:
+            value, _ = unpack_envelope(deserialize(raw))
+            found[pid] = value
+            _remember(pid, value)
+        else:
+            missing_ids.append(pid)
+
+    # cold static documents and cold availability entries come from the same bulk read
+    cold_ids = list(dict.fromkeys(missing_ids + [pid for pid in found if pid not in stock]))
+    if cold_ids:
+        loaded = await get_products_details_db(session, cold_ids)
+        pipe = redis_client.pipeline(transaction=False)
+        for pid in missing_ids:
+            if pid not in loaded:
+                pipe.set(product_cache_key(pid), PRODUCT_TOMBSTONE, ex=cache_settings.PRODUCT_NOT_FOUND_TTL, nx=True)
+        for pid, product_details in loaded.items():
+            body, version, stock_qty = _details_payload(product_details)
+            stock[pid] = stock_qty
+            pipe.eval(_SET_AVAILABILITY_IF_NEWER_LUA, 1, product_availability_key(pid), str(stock_qty), str(version),
+                      str(PRODUCT_DETAIL_TTL), CACHE_INVALIDATION_CHANNEL)
+            if pid in found:
+                continue
+            found[pid] = body
+            pipe.eval(_SET_IF_NEWER_LUA, 2, product_cache_key(pid), product_version_key(pid),
+                      pack_envelope(body, PRODUCT_DETAIL_TTL), str(version), str(PRODUCT_DETAIL_TTL),
+                      CACHE_INVALIDATION_CHANNEL)
+        try:
+            await pipe.execute(raise_on_error=False)
+        except Exception:
+            pass
+
+    docs = {}
+    for pid, body in found.items():
+        if pid not in stock:
+            # document cached but the row is gone (deleted since) ,same as unknown
+            continue
+        doc = orjson.loads(body.identity)["data"]
+        doc["stock_qty"] = stock[pid]
+        docs[pid] = doc
+    return [docs.get(pid) for pid in product_public_ids]
+
+
+async def write_through_product_details(session, product_public_id: str, get_product_details_db) -> bool:
+    """
+    Rebuild the detail document (and its availability entry) from the committed row and push both with
+    set-if-newer ,called after catalog writes so readers never wait for expiry. Deleted products are tombstoned.
+    Returns True if the cache now holds this version.
+    """
+    try:
+        product_details = await get_product_details_db(session, product_public_id)
+    except HTTPException as e:
+        if e.status_code != 404:
+            raise
+        await redis_client.delete(product_cache_key(product_public_id), product_version_key(product_public_id),
+                                  product_availability_key(product_public_id))
+        await _set_tombstone(product_public_id)
+        await publish_invalidation(product_version_key(product_public_id))
+        return False
+
+    body, version, stock_qty = _details_payload(product_details)
+    await set_product_availability(product_public_id, stock_qty, version)
+    return await set_product_cache_if_newer(redis_client, product_public_id, body, version, PRODUCT_DETAIL_TTL)
+
+
+async def set_product_cache_if_newer(redis_client, public_id: str, payload: CachedBody, new_ts: int, ttl: int):
     """
     Atomically set product cache only if new_ts >= existing version.
-    payload must be serializable (dict). new_ts is int (epoch seconds).
+    payload is the serialized success envelope (stored in its soft-ttl/encoding envelope).
+    new_ts is the detail_version (epoch micros) of the row.
+    When the stored version moves forward, the version key is published so other workers drop their L1 copy.
     """
-    value_key = f"product:{public_id}"
-    ver_key = value_key + ":ver"
-    data = serialize(payload)
-    success_payload = build_success(data,request_id=None)
+    value_key = product_cache_key(public_id)
+    ver_key = product_version_key(public_id)
     try:
-        res = await redis_client.eval(_SET_IF_NEWER_LUA, 2, value_key, ver_key, success_payload, str(new_ts), str(ttl))
+        res = await redis_client.eval(_SET_IF_NEWER_LUA, 2, value_key, ver_key, pack_envelope(payload, ttl),
+                                      str(new_ts), str(ttl),
+                                      CACHE_INVALIDATION_CHANNEL)
         return bool(res)
     except Exception:
         pass
         return False
-        
+
 
 _SET_IF_NEWER_LUA = """
 local cur = redis.call("GET", KEYS[2])
-if not cur then cur = "0" end
 local newv = tonumber(ARGV[2])
-local curv = tonumber(cur)
+local curv = tonumber(cur or "0")
 if newv >= curv then
   redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[3])
   redis.call("SET", KEYS[2], ARGV[2], "EX", ARGV[3])
+  if cur and newv > curv then
+    redis.call("PUBLISH", ARGV[4], KEYS[2])
+  end
   return 1
 else
   return 0
 end
-"""
\ No newline at end of file
+"""
+
+
+_SET_AVAILABILITY_IF_NEWER_LUA = """
+local cur = redis.call("HMGET", KEYS[1], "qty", "ver")
+local curv = tonumber(cur[2] or "0")
+local newv = tonumber(ARGV[2])
+if newv >= curv then
+  redis.call("HSET", KEYS[1], "qty", ARGV[1], "ver", ARGV[2])
+  redis.call("EXPIRE", KEYS[1], ARGV[3])
+  if cur[1] and cur[1] ~= ARGV[1] then
+    redis.call("PUBLISH", ARGV[4], KEYS[1])
+  end
+  return 1
+end
+return 0
+"""
@@ -0,0 +1,75 @@
+import struct
+import zlib
+from typing import Any, Callable, Dict, NamedTuple, Optional
+import msgpack
+import orjson
+from backend.config.cache_config import cache_settings
+
+# every value written through the registry starts with [marker:1][codec id:1][flags:1]
+# 0xC1 is never produced by msgpack and is not valid utf-8 ,so it can't be confused with a plain json /
+# msgpack value written before the header existed (those are decoded with the namespace's legacy codec).
+CODEC_MARKER = 0xC1
+FLAG_ZLIB = 0x01
+_CODEC_HEADER = struct.Struct(">BBB")
+
+
+class Codec(NamedTuple):
+    codec_id: int
+    encode: Callable[[Any], bytes]
+    decode: Callable[[bytes], Any]
+
+
+def _bytes_only(value: Any) -> bytes:
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        raise TypeError("raw codec stores bytes as is ,got %s" % type(value).__name__)
+    return bytes(value)
+
+# codec ids are part of the stored format ,never reuse one
+CODECS: Dict[str, Codec] = {
+    "raw": Codec(0, _bytes_only, bytes),     # already serialized bytes (json response bodies) passed through
+    "json": Codec(1, orjson.dumps, orjson.loads),
+    "msgpack": Codec(2, lambda v: msgpack.packb(v, use_bin_type=True), lambda b: msgpack.unpackb(b, raw=False)),
+}
+_CODECS_BY_ID = {codec.codec_id: codec for codec in CODECS.values()}
+
+
+class NamespaceCodec(NamedTuple):
+    codec: str                                   # what new entries are written with
+    compress_min_bytes: Optional[int] = None     # zlib at/above this size ,None = never
+    legacy: str = "raw"                          # how to read entries written before the header existed
+
+
+# per namespace encoding ,changing one only affects new writes: readers follow the header of each entry
+NAMESPACE_CODECS: Dict[str, NamespaceCodec] = {
+    # response bodies are json already and live inside the soft-ttl envelope (see cache.utils)
+    "products_listing": NamespaceCodec("raw"),
+    "product_details": NamespaceCodec("raw"),
+    # internal structures only workers read ,no json parse on the hot path
+    "listing_fragment": NamespaceCodec("msgpack", compress_min_bytes=cache_settings.CACHE_ZLIB_MIN_BYTES,
+                                       legacy="json"),
+}
+_DEFAULT = NamespaceCodec("json", legacy="json")
+
+
+def encode_value(namespace: str, value: Any) -> bytes:
+    spec = NAMESPACE_CODECS.get(namespace, _DEFAULT)
+    codec = CODECS[spec.codec]
+    payload = codec.encode(value)
+    flags = 0
+    if spec.compress_min_bytes is not None and len(payload) >= spec.compress_min_bytes:
+        compressed = zlib.compress(payload, cache_settings.CACHE_ZLIB_LEVEL)
+        if len(compressed) < len(payload):
+            payload, flags = compressed, FLAG_ZLIB
+    return _CODEC_HEADER.pack(CODEC_MARKER, codec.codec_id, flags) + payload
+
+def decode_value(namespace: str, raw: bytes) -> Any:
+    if len(raw) >= _CODEC_HEADER.size and raw[0] == CODEC_MARKER:
+        _, codec_id, flags = _CODEC_HEADER.unpack_from(raw)
+        codec = _CODECS_BY_ID.get(codec_id)
+        if codec is None:
+            raise ValueError("unknown cache codec %d" % codec_id)
+        payload = raw[_CODEC_HEADER.size:]
+        if flags & FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+        return codec.decode(payload)
+    return CODECS[NAMESPACE_CODECS.get(namespace, _DEFAULT).legacy].decode(raw)
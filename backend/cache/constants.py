@@ -0,0 +1,11 @@
+from backend.common.logging_setup import get_logger
+
+CATALOG_VERSION_KEY = "phyl:catalog:version"
+
+# every worker subscribes to this channel ,message body is the version key that changed
+CACHE_INVALIDATION_CHANNEL = "phyl:cache:invalidate"
+
+# lock holders publish the cache key here once a fill attempt is done ,lock waiters block on it instead of polling
+CACHE_FILL_CHANNEL = "phyl:cache:filled"
+
+logger = get_logger("chlorophyll.cache")
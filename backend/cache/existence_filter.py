@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import math
+import time
+import uuid
+from typing import Awaitable, Callable, Iterable, List, Optional
+from backend.cache.constants import logger
+from backend.config.cache_config import cache_settings
+
+
+class BloomFilter:
+    """
+    Plain bloom filter over strings ,sized for `capacity` items at `error_rate` false positives.
+    k bit positions come from one blake2b digest (double hashing) ,no false negatives.
+    """
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, int(capacity))
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+def _uuid7_millis(value: uuid.UUID) -> Optional[int]:
+    return value.int >> 80 if value.version == 7 else None
+
+
+class ProductExistenceFilter:
+    """
+    Per-process existence filter over live product public ids ,so ids that can not exist are answered
+    with 404 before any redis or db round trip.
+
+    - built from the db (loader injected at startup) ,until the first build completes everything is allowed through.
+    - created products are add()ed by the catalog.changed handler ,edits don't change existence so they cost nothing.
+      a bloom filter can't drop members ,deleted ids keep passing (to the redis tombstone) until the periodic
+      full rebuild every `rebuild_interval` seconds.
+    - product ids are uuid7 ,an id minted after the snapshot started (minus a grace period for in-flight
+      transactions and host clock skew) is always allowed through ,so a product created through another
+      worker is never rejected here before the next rebuild picks it up.
+    """
+    def __init__(self, error_rate: float, grace_seconds: float, rebuild_interval: float):
+        self.error_rate = error_rate
+        self.grace_seconds = grace_seconds
+        self.rebuild_interval = rebuild_interval
+        self._loader: Optional[Callable[[], Awaitable[Iterable[str]]]] = None
+        self._bloom: Optional[BloomFilter] = None
+        self._snapshot_ms = 0
+        self._added_during_build: Optional[List[str]] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._periodic_task: Optional[asyncio.Task] = None
+        self._rebuild_again = False
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    def start(self, loader: Callable[[], Awaitable[Iterable[str]]]):
+        self._loader = loader
+        self.schedule_rebuild()
+        if self._periodic_task is None:
+            self._periodic_task = asyncio.create_task(self._periodic_rebuild())
+
+    async def shutdown(self):
+        for task in (self._periodic_task, self._rebuild_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._periodic_task = self._rebuild_task = None
+
+    def add(self, product_public_id):
+        """A product was created ,let its id through without reloading every id."""
+        pid = str(product_public_id)
+        if self._added_during_build is not None:
+            # the snapshot being loaded may predate it ,carried over into the new filter
+            self._added_during_build.append(pid)
+        if self._bloom is not None:
+            self._bloom.add(pid)
+
+    def might_exist(self, product_public_id) -> bool:
+        try:
+            value = product_public_id if isinstance(product_public_id, uuid.UUID) else uuid.UUID(str(product_public_id))
+        except ValueError:
+            return False
+        bloom = self._bloom
+        if bloom is None:
+            return True
+        minted_ms = _uuid7_millis(value)
+        if minted_ms is not None and minted_ms >= self._snapshot_ms:
+            return True
+        return str(value) in bloom
+
+    def schedule_rebuild(self):
+        if self._loader is None:
+            return
+        if self._rebuild_task and not self._rebuild_task.done():
+            # a bump landed while the snapshot query was running ,rebuild once more afterwards
+            self._rebuild_again = True
+            return
+        self._rebuild_task = asyncio.create_task(self._rebuild_loop())
+
+    async def _periodic_rebuild(self):
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            self.schedule_rebuild()
+
+    async def _rebuild_loop(self):
+        while True:
+            self._rebuild_again = False
+            try:
+                await self.rebuild()
+            except Exception:
+                # keep serving with the previous filter (or none) ,the next periodic rebuild retries
+                logger.warning("cache.existence_filter.rebuild_failed")
+            if not self._rebuild_again:
+                return
+
+    async def rebuild(self):
+        snapshot_ms = int((time.time() - self.grace_seconds) * 1000)
+        self._added_during_build = []
+        try:
+            ids = list(await self._loader())
+            bloom = BloomFilter(capacity=max(len(ids), 1024), error_rate=self.error_rate)
+            for pid in ids:
+                bloom.add(str(pid))
+            for pid in self._added_during_build:
+                bloom.add(pid)
+            self._bloom, self._snapshot_ms = bloom, snapshot_ms
+        finally:
+            self._added_during_build = None
+        logger.info("cache.existence_filter.rebuilt", extra={"items": len(ids), "bytes": bloom.nbytes})
+
+
+product_existence_filter = ProductExistenceFilter(error_rate=cache_settings.PRODUCT_FILTER_ERROR_RATE,
+                                                  grace_seconds=cache_settings.PRODUCT_FILTER_GRACE_SECONDS,
+                                                  rebuild_interval=cache_settings.PRODUCT_FILTER_REBUILD_SECONDS)
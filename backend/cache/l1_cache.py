@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set, Tuple
+from backend.config.cache_config import cache_settings
+
+
+class _L1Entry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: float
+    deps: Tuple[str, ...]
+
+
+class L1Cache:
+    """
+    Per-process LRU over serialized payloads (bytes ,or CachedBody with its gzip variant).
+
+    - bounded by total payload size (max_bytes), least recently used entries are evicted first.
+      non-bytes values pass their size explicitly.
+    - every entry has its own ttl (monotonic clock) ,expired entries are dropped on read.
+    - entries can depend on version keys (eg. phyl:catalog:version , product:{id}:ver) ,
+      invalidate_dependents(dep) drops every entry built against that version.
+
+    Not thread safe ,meant to be used from the event loop of a single worker.
+    """
+    def __init__(self, max_bytes: int, default_ttl: float):
+        self.max_bytes = max(0, int(max_bytes))
+        self.default_ttl = float(default_ttl)
+        self._entries: "OrderedDict[str, _L1Entry]" = OrderedDict()
+        self._dependents: Dict[str, Set[str]] = {}
+        self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, depends_on: Iterable[str] = (),
+            size: Optional[int] = None):
+        ttl = self.default_ttl if ttl is None else min(float(ttl), self.default_ttl)
+        size = len(value) if size is None else size
+        if ttl <= 0 or size > self.max_bytes:
+            # never let one oversized payload flush the whole tier
+            self._drop(key)
+            return
+
+        self._drop(key)
+        deps = tuple(depends_on)
+        self._entries[key] = _L1Entry(value, size, time.monotonic() + ttl, deps)
+        self._size += size
+        for dep in deps:
+            self._dependents.setdefault(dep, set()).add(key)
+
+        while self._size > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def invalidate(self, key: str):
+        self._drop(key)
+
+    def invalidate_dependents(self, dep: str):
+        for key in self._dependents.pop(dep, ()):
+            self._drop(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._dependents.clear()
+        self._size = 0
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= entry.size
+        for dep in entry.deps:
+            keys = self._dependents.get(dep)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._dependents[dep]
+
+
+l1_cache = L1Cache(max_bytes=cache_settings.L1_CACHE_MAX_BYTES if cache_settings.L1_CACHE_ENABLED else 0,
+                   default_ttl=cache_settings.L1_CACHE_TTL_SECONDS)
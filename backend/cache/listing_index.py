@@ -0,0 +1,250 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from redis.exceptions import NoScriptError
+from backend.cache._cache import REDIS_ERRORS, redis_circuit, redis_client
+from backend.cache.codecs import decode_value, encode_value
+from backend.cache.constants import CATALOG_VERSION_KEY, logger
+from backend.cache.l1_cache import l1_cache
+from backend.cache.lua_scripts import CACHE_SCRIPT_SHAS, CACHE_SCRIPTS
+from backend.cache.metrics import CACHE_HITS, CACHE_MISSES, record_lookup
+from backend.cache.singleflight import cache_flights
+from backend.cache.utils import CachedBody, build_key, eval_cache_script, make_cached_body, release_lock, serialize
+from backend.common.utils import build_success
+from backend.config.cache_config import cache_settings
+
+# one zset of every live product ordered like the listing ,plus one summary fragment per product
+LISTING_INDEX_KEY = "phyl:catalog:listing"
+LISTING_INDEX_READY_KEY = "phyl:catalog:listing:ready"   # set once a full build finished ,gone => rebuild
+LISTING_INDEX_REBUILD_LOCK = "phyl:catalog:listing:rebuild"
+METRICS_NAMESPACE = "products_listing_index"
+FRAGMENT_NAMESPACE = "listing_fragment"   # msgpack ,see cache.codecs
+MAX_PAGE_PASSES = 8   # re-queries of one page while dropping gone products ,past that the per-page cache serves it
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class ListingEntry(NamedTuple):
+    item: dict            # listing item exactly as served (see products.services.listing_item)
+    created_at: datetime
+    version: int          # row updated_at in epoch micros ,fragments are set-if-newer on it
+
+
+def listing_fragment_key(product_id: int) -> str:
+    return f"phyl:listing_item:{int(product_id)}"
+
+def index_score(created_at: datetime) -> int:
+    # newest first ,exact integer micros (fits a double's 53 bits)
+    return -((created_at - _EPOCH) // timedelta(microseconds=1))
+
+def index_member(product_id: int) -> str:
+    # zero padded so members with the same score sort by numeric id ascending ,same order as fetch_prods
+    return f"{int(product_id):020d}"
+
+
+class ListingIndex:
+    """
+    Listing pages assembled from shared pieces instead of one cached blob per (limit, cursor, q, category):
+
+    - a zset of live product ids scored by created_at (ties by id) ,a page is one script call that
+      positions after the cursor + one MGET of the per-product summary fragments.
+    - fragments are filled lazily from the db on miss and written through by the catalog.changed handler
+      (sync) ,an edit touches exactly one fragment (and one zset member on create / delete).
+    - the zset is built once from the db (one worker ,under a redis lock) whenever the ready marker is
+      missing ,until then page() returns None and callers use the per-page cache.
+
+    Loaders are injected at startup (see main.app_lifespan) ,before start() everything is a no-op.
+    """
+    def __init__(self, fragment_ttl: int, rebuild_chunk: int, rebuild_lock_seconds: int):
+        self.fragment_ttl = fragment_ttl
+        self.rebuild_chunk = max(1, rebuild_chunk)
+        self.rebuild_lock_seconds = rebuild_lock_seconds
+        self._load_entries: Optional[Callable[[], Awaitable[Iterable[Tuple[int, datetime]]]]] = None
+        self._load_items: Optional[Callable[[List[int]], Awaitable[Dict[int, ListingEntry]]]] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    @property
+    def started(self) -> bool:
+        return self._load_items is not None
+
+    def start(self, load_entries: Callable[[], Awaitable[Iterable[Tuple[int, datetime]]]],
+              load_items: Callable[[List[int]], Awaitable[Dict[int, ListingEntry]]]):
+        self._load_entries, self._load_items = load_entries, load_items
+        self.schedule_rebuild()
+
+    async def shutdown(self):
+        task, self._rebuild_task = self._rebuild_task, None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def page_body(self, cursor_vals, limit: int, build_page: Callable[[list, bool], dict]) -> Optional[CachedBody]:
+        """
+        Serialized success envelope of one page ,build_page(items, has_more) shapes the data part.
+        Kept in L1 until the next catalog version bump. None => index not usable right now.
+        """
+        if not self.started:
+            return None
+        key = self.page_key(cursor_vals, limit)
+        record_lookup(METRICS_NAMESPACE, key)
+        local = l1_cache.get(key)
+        if local is not None:
+            CACHE_HITS.labels(METRICS_NAMESPACE, "l1").inc()
+            return local
+
+        async def assemble():
+            page = await self.page(cursor_vals, limit)
+            if page is None:
+                return None
+            body = make_cached_body(serialize(build_success(build_page(*page), request_id=None)))
+            l1_cache.set(key, body, depends_on=(CATALOG_VERSION_KEY,), size=body.nbytes)
+            return body
+        return await cache_flights.do(key, assemble)
+
+    def page_key(self, cursor_vals, limit: int) -> str:
+        """L1 key of an assembled page ,those only live in L1 (no redis copy)."""
+        score, member = _cursor_position(cursor_vals)
+        return build_key("phyl", METRICS_NAMESPACE, f"limit={limit}", f"after={score}:{member}")
+
+    async def page(self, cursor_vals, limit: int) -> Optional[Tuple[list, bool]]:
+        """(items, has_more) for the page after cursor_vals ,None when the index is not built or redis is down."""
+        if not self.started or redis_circuit.is_open:
+            return None
+        score, member = _cursor_position(cursor_vals)
+        try:
+            for _ in range(MAX_PAGE_PASSES):
+                members = await eval_cache_script(redis_client, "listing_page", 2, LISTING_INDEX_KEY,
+                                                  LISTING_INDEX_READY_KEY, score, member, limit + 1)
+                if members is None:
+                    self.schedule_rebuild()
+                    return None
+                ids = [int(m) for m in members]
+                items, gone = await self._fragments(ids)
+                if gone:
+                    # products deleted without their event reaching us (or before a rebuild re-added them)
+                    await redis_client.zrem(LISTING_INDEX_KEY, *[index_member(pid) for pid in gone])
+                # re-query until limit + 1 live items ,a short page would report has_more=False mid catalog
+                if not gone or len(ids) <= limit:
+                    break
+            else:
+                logger.warning("cache.listing_index.page_gave_up", extra={"limit": limit})
+                return None
+        except REDIS_ERRORS:
+            return None
+
+        ordered = [items[pid] for pid in ids if pid in items]
+        CACHE_HITS.labels(METRICS_NAMESPACE, "redis").inc()
+        return ordered[:limit], len(ordered) > limit
+
+    async def _fragments(self, ids: List[int]) -> Tuple[Dict[int, dict], List[int]]:
+        """Summary fragments for ids ,missing ones loaded from the db and backfilled. Returns (items, gone ids)."""
+        raws = await redis_client.mget([listing_fragment_key(pid) for pid in ids]) if ids else []
+        items: Dict[int, dict] = {}
+        missing = []
+        for pid, raw in zip(ids, raws):
+            if raw:
+                items[pid] = decode_value(FRAGMENT_NAMESPACE, raw.partition(b"|")[2])
+            else:
+                missing.append(pid)
+        if not missing:
+            return items, []
+
+        CACHE_MISSES.labels(METRICS_NAMESPACE).inc(len(missing))
+        loaded = await self._load_items(missing)
+        try:
+            await self._store(loaded, index=False)
+        except Exception:
+            pass
+        for pid, entry in loaded.items():
+            items[pid] = entry.item
+        return items, [pid for pid in missing if pid not in loaded]
+
+    async def sync(self, product_ids: List[int]):
+        """
+        Move the index to the committed rows of product_ids (catalog.changed handler) ,live rows are
+        (re)indexed and their fragment written through ,missing / deleted rows leave the index.
+        Raises on redis errors so the outbox row stays PENDING and is retried.
+        """
+        if not self.started or not product_ids:
+            return
+        loaded = await self._load_items(list(product_ids))
+        await self._store(loaded, index=True)
+        gone = [pid for pid in product_ids if pid not in loaded]
+        if gone:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.zrem(LISTING_INDEX_KEY, *[index_member(pid) for pid in gone])
+            pipe.delete(*[listing_fragment_key(pid) for pid in gone])
+            await pipe.execute()
+
+    async def _store(self, entries: Dict[int, ListingEntry], index: bool):
+        if not entries:
+            return
+        try:
+            await self._store_pipeline(entries, index).execute()
+        except NoScriptError:
+            # script cache flushed (redis restart / failover) ,load it back and redo the batch ,every write is idempotent
+            await redis_client.script_load(CACHE_SCRIPTS["set_fragment_if_newer"])
+            await self._store_pipeline(entries, index).execute()
+
+    def _store_pipeline(self, entries: Dict[int, ListingEntry], index: bool):
+        pipe = redis_client.pipeline(transaction=False)
+        for pid, entry in entries.items():
+            fragment = b"%d|%s" % (entry.version, encode_value(FRAGMENT_NAMESPACE, entry.item))
+            pipe.evalsha(CACHE_SCRIPT_SHAS["set_fragment_if_newer"], 1, listing_fragment_key(pid),
+                         str(entry.version), fragment, str(self.fragment_ttl))
+        if index:
+            pipe.zadd(LISTING_INDEX_KEY, {index_member(pid): index_score(entry.created_at)
+                                          for pid, entry in entries.items()})
+        return pipe
+
+    def schedule_rebuild(self):
+        if self._load_entries is None:
+            return
+        if self._rebuild_task and not self._rebuild_task.done():
+            return
+        self._rebuild_task = asyncio.create_task(self._rebuild_quietly())
+
+    async def _rebuild_quietly(self):
+        try:
+            await self.rebuild_if_missing()
+        except Exception:
+            # page() keeps returning None ,the next one retries
+            logger.warning("cache.listing_index.rebuild_failed")
+
+    async def rebuild_if_missing(self) -> bool:
+        """Full build from the db when the ready marker is gone ,only one worker at a time. True if ready."""
+        if self._load_entries is None:
+            return False
+        if await redis_client.exists(LISTING_INDEX_READY_KEY):
+            return True
+        token = uuid.uuid4().hex
+        if not await redis_client.set(LISTING_INDEX_REBUILD_LOCK, token, nx=True, ex=self.rebuild_lock_seconds):
+            return False
+        try:
+            entries = list(await self._load_entries())
+            # plain ZADDs into the live key ,concurrent sync() calls only add too so nothing is lost
+            for i in range(0, len(entries), self.rebuild_chunk):
+                chunk = entries[i:i + self.rebuild_chunk]
+                await redis_client.zadd(LISTING_INDEX_KEY, {index_member(pid): index_score(created_at)
+                                                            for pid, created_at in chunk})
+            await redis_client.set(LISTING_INDEX_READY_KEY, str(len(entries)))
+            logger.info("cache.listing_index.rebuilt", extra={"items": len(entries)})
+            return True
+        finally:
+            await release_lock(redis_client, LISTING_INDEX_REBUILD_LOCK, token)
+
+
+def _cursor_position(cursor_vals) -> Tuple[str, str]:
+    if not cursor_vals:
+        return "", ""
+    created_at, last_id = cursor_vals
+    return str(index_score(created_at)), index_member(last_id)
+
+
+listing_index = ListingIndex(fragment_ttl=cache_settings.LISTING_FRAGMENT_TTL,
+                             rebuild_chunk=cache_settings.LISTING_INDEX_REBUILD_CHUNK,
+                             rebuild_lock_seconds=cache_settings.LISTING_INDEX_REBUILD_LOCK_SECONDS)
@@ -0,0 +1,95 @@
+# cache scripts ,called by sha (see cache.utils.eval_cache_script)
+import hashlib
+
+
+# one round trip for a cache read on the miss / stale path
+# KEYS[1] value key ,KEYS[2] lock key
+# ARGV[1] lock token ,ARGV[2] lock ttl ms ,ARGV[3] now (epoch seconds)
+# returns {0, value}        fresh hit
+#         {1, stale|nil}    lock granted to the caller (stale value if any)
+#         {2, stale|nil}    someone else holds the lock
+# fresh_until is read from the envelope header (cache.utils) ,v2/v3: byte 3 ,v1: byte 2. anything else
+# (legacy plain bytes ,tombstones) has no soft ttl and counts as fresh until redis expires it.
+LUA_GET_OR_LOCK = """
+local v = redis.call("GET", KEYS[1])
+if v then
+  local fresh_until = nil
+  local version = string.byte(v, 1)
+  if (version == 2 or version == 3) and #v >= 10 then
+    fresh_until = struct.unpack(">d", v, 3)
+  elseif version == 1 and #v >= 9 then
+    fresh_until = struct.unpack(">d", v, 2)
+  end
+  if fresh_until == nil or fresh_until > tonumber(ARGV[3]) then
+    return {0, v}
+  end
+end
+if redis.call("SET", KEYS[2], ARGV[1], "NX", "PX", ARGV[2]) then
+  return {1, v}
+end
+return {2, v}
+"""
+
+# store the filled value ,drop the lock if it is still ours and wake waiters ,all in one round trip
+# KEYS[1] value key ,KEYS[2] lock key
+# ARGV[1] lock token ,ARGV[2] value ,ARGV[3] hard ttl seconds ,ARGV[4] fill channel
+# returns 1 if the lock was still held by the caller
+LUA_FILL_AND_RELEASE = """
+redis.call("SET", KEYS[1], ARGV[2], "EX", ARGV[3])
+local owned = 0
+if redis.call("GET", KEYS[2]) == ARGV[1] then
+  redis.call("DEL", KEYS[2])
+  owned = 1
+end
+redis.call("PUBLISH", ARGV[4], KEYS[1])
+return owned
+"""
+
+# one page of the shared listing index (see cache.listing_index)
+# KEYS[1] index zset ,KEYS[2] ready marker
+# ARGV[1] cursor score ("" for the first page) ,ARGV[2] cursor member ,ARGV[3] count
+# returns the members right after (cursor score, cursor member) ,nil while the index is not built.
+# the cursor product may have left the index since ,then the position is counted from score + ties instead
+LUA_LISTING_PAGE = """
+if redis.call("EXISTS", KEYS[2]) == 0 then
+  return false
+end
+local start = 0
+if ARGV[1] ~= "" then
+  local rank = redis.call("ZRANK", KEYS[1], ARGV[2])
+  if rank and tonumber(redis.call("ZSCORE", KEYS[1], ARGV[2])) == tonumber(ARGV[1]) then
+    start = rank + 1
+  else
+    start = redis.call("ZCOUNT", KEYS[1], "-inf", "(" .. ARGV[1])
+    for _, m in ipairs(redis.call("ZRANGEBYSCORE", KEYS[1], ARGV[1], ARGV[1])) do
+      if m <= ARGV[2] then
+        start = start + 1
+      end
+    end
+  end
+end
+return redis.call("ZRANGE", KEYS[1], start, start + tonumber(ARGV[3]) - 1)
+"""
+
+# listing fragment set-if-newer ,fragments are "<version>|<item encoded by cache.codecs>"
+# KEYS[1] fragment key ,ARGV[1] version ,ARGV[2] fragment ,ARGV[3] ttl seconds
+LUA_SET_FRAGMENT_IF_NEWER = """
+local cur = redis.call("GET", KEYS[1])
+if cur then
+  local curv = tonumber(string.match(cur, "^(%d+)|") or "0")
+  if curv > tonumber(ARGV[1]) then
+    return 0
+  end
+end
+redis.call("SET", KEYS[1], ARGV[2], "EX", ARGV[3])
+return 1
+"""
+
+CACHE_SCRIPTS = {
+    "get_or_lock": LUA_GET_OR_LOCK,
+    "fill_and_release": LUA_FILL_AND_RELEASE,
+    "listing_page": LUA_LISTING_PAGE,
+    "set_fragment_if_newer": LUA_SET_FRAGMENT_IF_NEWER,
+}
+# sha1 of the source is what SCRIPT LOAD / EVAL register it under ,no round trip needed to know it
+CACHE_SCRIPT_SHAS = {name: hashlib.sha1(src.encode()).hexdigest() for name, src in CACHE_SCRIPTS.items()}
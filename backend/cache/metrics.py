@@ -0,0 +1,123 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from backend.config.cache_config import cache_settings
+
+# all series are labelled by cache namespace (products_listing ,product_details ..)
+CACHE_HITS = Counter("phyl_cache_hits_total", "Cache hits", ["namespace", "tier"])  # tier: l1 | redis
+CACHE_MISSES = Counter("phyl_cache_misses_total", "Cache misses (value had to be computed or waited for)", ["namespace"])
+CACHE_STALE_SERVED = Counter("phyl_cache_stale_served_total", "Entries served past their soft ttl", ["namespace"])
+CACHE_LOCK_ACQUIRED = Counter("phyl_cache_lock_acquired_total", "Fill locks acquired", ["namespace"])
+CACHE_FALLBACK_COMPUTE = Counter("phyl_cache_fallback_compute_total",
+                                 "Values computed outside the lock protocol", ["namespace", "reason"])
+CACHE_PREFETCH = Counter("phyl_cache_prefetch_total", "Speculative fills by outcome", ["namespace", "outcome"])
+CACHE_LOCK_WAIT = Histogram("phyl_cache_lock_wait_seconds", "Time spent waiting on another worker's fill",
+                            ["namespace"], buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+CACHE_LOADER = Histogram("phyl_cache_loader_seconds", "Loader (db) duration on fills", ["namespace"],
+                         buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+
+@contextmanager
+def lock_wait_timer(namespace: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        CACHE_LOCK_WAIT.labels(namespace).observe(time.perf_counter() - started)
+
+def timed_loader(namespace: str, loader: Callable[[], Any]) -> Callable[[], Any]:
+    histogram = CACHE_LOADER.labels(namespace)
+
+    async def _timed():
+        started = time.perf_counter()
+        try:
+            return await loader()
+        finally:
+            histogram.observe(time.perf_counter() - started)
+    return _timed
+
+
+class SpaceSaving:
+    """
+    Space-saving heavy hitter sketch (Metwally et al.) over at most `capacity` counters.
+
+    Every item whose true frequency is above total/capacity is guaranteed to be tracked ,counts are
+    over-estimates by at most `error` (the count of the counter it replaced). Counters live in buckets
+    keyed by count so offer() is O(1) ,evictions always take a key from the minimum bucket.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._counts: Dict[Hashable, Tuple[int, int]] = {}   # item -> (count, error)
+        self._buckets: Dict[int, Dict[Hashable, None]] = {}  # count -> items (insertion ordered set)
+        self._min = 0
+        self.total = 0
+
+    def __len__(self):
+        return len(self._counts)
+
+    def offer(self, item: Hashable):
+        self.total += 1
+        entry = self._counts.get(item)
+        if entry is not None:
+            count, error = entry
+            self._move(item, count, count + 1)
+            self._counts[item] = (count + 1, error)
+            return
+
+        if len(self._counts) < self.capacity:
+            self._counts[item] = (1, 0)
+            self._buckets.setdefault(1, {})[item] = None
+            self._min = 1
+            return
+
+        # replace one of the least counted items ,the newcomer inherits its count as error bound
+        evicted = self._min
+        bucket = self._buckets[evicted]
+        victim = next(iter(bucket))
+        del bucket[victim]
+        del self._counts[victim]
+        self._counts[item] = (evicted + 1, evicted)
+        self._buckets.setdefault(evicted + 1, {})[item] = None
+        if not bucket:
+            del self._buckets[evicted]
+            self._min = evicted + 1
+
+    def _move(self, item: Hashable, old: int, new: int):
+        bucket = self._buckets[old]
+        bucket.pop(item, None)
+        self._buckets.setdefault(new, {})[item] = None
+        if not bucket:
+            del self._buckets[old]
+            if self._min == old:
+                self._min = new
+
+    def top(self, n: int) -> List[Tuple[Hashable, int, int]]:
+        """[(item, count, error)] ,highest counts first."""
+        ranked = sorted(self._counts.items(), key=lambda kv: kv[1][0], reverse=True)[:n]
+        return [(item, count, error) for item, (count, error) in ranked]
+
+
+hot_keys = SpaceSaving(cache_settings.CACHE_HOT_KEYS_CAPACITY)
+
+def record_lookup(namespace: str, key: str):
+    hot_keys.offer((namespace, key))
+
+
+class HotKeyCollector:
+    """Exports the current top-N of the hot key sketch at scrape time (label cardinality stays <= N)."""
+    def __init__(self, sketch: SpaceSaving, top_n: int):
+        self.sketch = sketch
+        self.top_n = top_n
+
+    def collect(self):
+        gauge = GaugeMetricFamily("phyl_cache_hot_key_lookups",
+                                  "Estimated lookups of the hottest cache keys since start (space-saving sketch)",
+                                  labels=["namespace", "key"])
+        for (namespace, key), count, _error in self.sketch.top(self.top_n):
+            gauge.add_metric([namespace, key], count)
+        yield gauge
+
+
+REGISTRY.register(HotKeyCollector(hot_keys, cache_settings.CACHE_HOT_KEYS_TOP_N))
@@ -0,0 +1,160 @@
+import asyncio
+from typing import Callable, Dict, List, Optional, Set
+from backend.cache._cache import redis_client, redis_pubsub_client
+from backend.cache.constants import CACHE_FILL_CHANNEL, CACHE_INVALIDATION_CHANNEL, logger
+from backend.cache.l1_cache import L1Cache, l1_cache
+
+
+async def publish_invalidation(dep_key: str):
+    """Tell every worker (including this one) that `dep_key` changed. best-effort."""
+    l1_cache.invalidate_dependents(dep_key)
+    try:
+        await redis_client.publish(CACHE_INVALIDATION_CHANNEL, dep_key)
+    except Exception:
+        logger.warning("cache.invalidation.publish_failed", extra={"dep_key": dep_key})
+
+async def publish_fill(key: str):
+    """Wake lock waiters on every worker ,called by the lock holder once its fill attempt is over. best-effort."""
+    try:
+        await redis_client.publish(CACHE_FILL_CHANNEL, key)
+    except Exception:
+        logger.warning("cache.fill.publish_failed", extra={"cache_key": key})
+
+
+class FillWaiter:
+    """Registered before the waiter re-checks redis ,so a fill landing in between is never missed."""
+    def __init__(self, notifier: "CacheNotifier", key: str):
+        self._notifier = notifier
+        self.key = key
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def wait(self, timeout: float) -> bool:
+        """True if a fill notification arrived ,False if we gave up after timeout (lock holder died/slow)."""
+        try:
+            await asyncio.wait_for(asyncio.shield(self.future), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._notifier._discard_waiter(self)
+
+
+class CacheNotifier:
+    """
+    Background subscriber shared by everything cache related in this worker.
+
+    - CACHE_INVALIDATION_CHANNEL carries version keys (phyl:catalog:version , product:{id}:ver) and drops
+      every L1 entry built against them.
+    - CACHE_FILL_CHANNEL carries cache keys a lock holder just filled ,resolving local FillWaiters so each
+      waiter wakes exactly once instead of polling redis.
+    Whenever the subscription (re)connects the L1 is cleared and pending waiters are woken since messages
+    may have been missed in between ,waiters then just re-check redis. Invalidation listeners (on_invalidation)
+    are run for every invalidated key they watch ,and all of them after a reconnect.
+    """
+    def __init__(self, cache: L1Cache, reconnect_delay: float = 1.0):
+        self.cache = cache
+        self.reconnect_delay = reconnect_delay
+        self._task: Optional[asyncio.Task] = None
+        self._fill_waiters: Dict[str, Set[FillWaiter]] = {}
+        self._invalidation_listeners: Dict[str, List[Callable[[], None]]] = {}
+
+    def start(self):
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._listen_loop())
+
+    async def shutdown(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+        self._wake_all()
+
+    def on_invalidation(self, dep_key: str, callback: Callable[[], None]):
+        """Run `callback` (sync ,must not block) whenever dep_key is invalidated ,and after a reconnect."""
+        self._invalidation_listeners.setdefault(dep_key, []).append(callback)
+
+    def _notify_listeners(self, dep_key: Optional[str] = None):
+        keys = [dep_key] if dep_key is not None else list(self._invalidation_listeners)
+        for key in keys:
+            for callback in self._invalidation_listeners.get(key, ()):
+                try:
+                    callback()
+                except Exception:
+                    logger.warning("cache.notifier.listener_failed", extra={"dep_key": key})
+
+    def fill_waiter(self, key: str) -> FillWaiter:
+        waiter = FillWaiter(self, key)
+        self._fill_waiters.setdefault(key, set()).add(waiter)
+        return waiter
+
+    def _discard_waiter(self, waiter: FillWaiter):
+        waiters = self._fill_waiters.get(waiter.key)
+        if waiters is None:
+            return
+        waiters.discard(waiter)
+        if not waiters:
+            del self._fill_waiters[waiter.key]
+
+    def _wake(self, key: str):
+        for waiter in self._fill_waiters.pop(key, ()):
+            if not waiter.future.done():
+                waiter.future.set_result(True)
+
+    def _wake_all(self):
+        for key in list(self._fill_waiters):
+            self._wake(key)
+
+    async def _listen_loop(self):
+        missed = False
+        while True:
+            pubsub = redis_pubsub_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL, CACHE_FILL_CHANNEL)
+                self.cache.clear()
+                self._wake_all()
+                if missed:
+                    self._notify_listeners()
+                    missed = False
+                async for message in pubsub.listen():
+                    self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("cache.notifier.disconnected")
+                missed = True
+                self.cache.clear()
+                self._wake_all()
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def _dispatch(self, message):
+        if message.get("type") != "message":
+            return
+        channel = message.get("channel")
+        data = message.get("data")
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        if isinstance(data, bytes):
+            data = data.decode()
+
+        if channel == CACHE_FILL_CHANNEL:
+            self._wake(data)
+        else:
+            self.cache.invalidate_dependents(data)
+            self._notify_listeners(data)
+
+
+cache_notifier = CacheNotifier(l1_cache)
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Process-local request coalescing.
+
+    Concurrent do(key, fn) calls for the same key share one execution of fn ,the first caller (leader)
+    starts it and everyone else awaits the same task. fn runs as its own task and is shielded ,so a
+    cancelled caller (client disconnect) doesn't cancel the work other callers are waiting on.
+    Results are not kept once the call finishes ,caching is the caller's job.
+    """
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # mark exception retrieved even if every caller went away
+            task.exception()
+
+
+cache_flights = SingleFlight()
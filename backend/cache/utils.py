@@ -1,13 +1,20 @@
 
 
+import gzip
 import hashlib
-from fastapi import Response
+import struct
+import time
+from fastapi import Request, Response
 import orjson
 import uuid
 import msgpack
-from typing import Any
+from typing import Any, NamedTuple, Optional, Tuple
+from redis.exceptions import NoScriptError
+from backend.cache.codecs import CODECS
+from backend.cache.lua_scripts import CACHE_SCRIPT_SHAS, CACHE_SCRIPTS
 from backend.common.constants import request_id_ctx
 from backend.common.utils import build_success
+from backend.config.cache_config import cache_settings
 
 def build_key(*parts: str) -> str:
     joined = ":".join(p for p in parts if p is not None and p != "")
@@ -16,11 +23,150 @@ def build_key(*parts: str) -> str:
     return joined
 
 def serialize(value: Any) -> bytes:
- 
-    return orjson.dumps(value)
+    """Response payload -> json bytes ,served and cached (inside the envelope) as is."""
+    return CODECS["json"].encode(value)
 
-def deserialize(b: bytes) -> Response:
-    return b 
+def deserialize(b: bytes) -> bytes:
+    """
+    Cached response entries stay bytes ,the envelope is unpacked but the json body is never parsed.
+    Internal structures go through cache.codecs.decode_value instead.
+    """
+    return CODECS["raw"].decode(b)
+
+
+class CachedBody(NamedTuple):
+    """
+    Serialized response body plus its pre-compressed variant (only for payloads above GZIP_MIN_BYTES)
+    and a short content digest of the identity bytes ,the ETag is derived from it.
+    """
+    identity: bytes
+    gzipped: Optional[bytes] = None
+    digest: bytes = b""
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.identity) + (len(self.gzipped) if self.gzipped is not None else 0)
+
+ETAG_DIGEST_SIZE = 8
+
+def content_digest(payload: bytes) -> bytes:
+    return hashlib.blake2b(payload, digest_size=ETAG_DIGEST_SIZE).digest()
+
+def make_cached_body(payload: bytes) -> CachedBody:
+    # compressed and hashed once at fill time ,never per request. mtime=0 keeps the output deterministic.
+    digest = content_digest(payload)
+    if len(payload) < cache_settings.GZIP_MIN_BYTES:
+        return CachedBody(payload, None, digest)
+    return CachedBody(payload, gzip.compress(payload, compresslevel=cache_settings.GZIP_LEVEL, mtime=0), digest)
+
+
+# soft-ttl envelope around cached bytes: [format version:1][encoding:1][fresh_until epoch secs:8][digest:8][payload]
+# redis EX carries the hard ttl ,fresh_until the soft one ,in between the entry is stale but servable.
+# redis keeps a single variant per key (gzip when the body is large enough) ,L1 keeps both.
+# the digest sits in the fixed size header so conditional requests can be answered with a GETRANGE of the header.
+ENVELOPE_VERSION = 3
+ENCODING_IDENTITY = 0
+ENCODING_GZIP = 1
+_ENVELOPE_HEADER = struct.Struct(">BBd%ds" % ETAG_DIGEST_SIZE)
+_ENVELOPE_HEADER_V2 = struct.Struct(">BBd")
+_ENVELOPE_HEADER_V1 = struct.Struct(">Bd")
+ENVELOPE_HEADER_SIZE = _ENVELOPE_HEADER.size
+
+def pack_envelope(body: CachedBody, soft_ttl: float) -> bytes:
+    if body.gzipped is not None:
+        encoding, payload = ENCODING_GZIP, body.gzipped
+    else:
+        encoding, payload = ENCODING_IDENTITY, body.identity
+    digest = body.digest or content_digest(body.identity)
+    return _ENVELOPE_HEADER.pack(ENVELOPE_VERSION, encoding, time.time() + soft_ttl, digest) + payload
+
+def unpack_envelope(raw: bytes) -> Tuple[CachedBody, float]:
+    """
+    Returns (body, fresh_until). v1/v2 envelopes (no digest / no encoding byte) and entries written before
+    the envelope existed (plain orjson bytes ,treated as fresh until redis expires them) are still readable.
+    """
+    version = raw[0] if raw else None
+    if version == ENVELOPE_VERSION:
+        _, encoding, fresh_until, digest = _ENVELOPE_HEADER.unpack_from(raw)
+        payload = raw[_ENVELOPE_HEADER.size:]
+        if encoding == ENCODING_GZIP:
+            return CachedBody(gzip.decompress(payload), payload, digest), fresh_until
+        return CachedBody(payload, None, digest), fresh_until
+    if version == 2:
+        _, encoding, fresh_until = _ENVELOPE_HEADER_V2.unpack_from(raw)
+        payload = raw[_ENVELOPE_HEADER_V2.size:]
+        if encoding == ENCODING_GZIP:
+            identity = gzip.decompress(payload)
+            return CachedBody(identity, payload, content_digest(identity)), fresh_until
+        return CachedBody(payload, None, content_digest(payload)), fresh_until
+    if version == 1:
+        _, fresh_until = _ENVELOPE_HEADER_V1.unpack_from(raw)
+        payload = raw[_ENVELOPE_HEADER_V1.size:]
+        return CachedBody(payload, None, content_digest(payload)), fresh_until
+    return CachedBody(raw, None, content_digest(raw)), float("inf")
+
+def peek_envelope(head: bytes) -> Optional[Tuple[bytes, bool, float]]:
+    """
+    (digest, gzipped, fresh_until) from the first ENVELOPE_HEADER_SIZE bytes of a cached value ,None when
+    the entry predates the digest header (callers then fall back to reading the body).
+    """
+    if len(head) < _ENVELOPE_HEADER.size or head[0] != ENVELOPE_VERSION:
+        return None
+    _, encoding, fresh_until, digest = _ENVELOPE_HEADER.unpack_from(head)
+    return digest, encoding == ENCODING_GZIP, fresh_until
+
+
+def accepts_gzip(request: Request) -> bool:
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+def representation_etag(digest: bytes, gzipped: bool) -> str:
+    # strong validators must differ per content-coding ,the gzip variant gets its own suffix
+    return f'"{digest.hex()}-gz"' if gzipped else f'"{digest.hex()}"'
+
+def etag_matches(request: Request, digest: bytes) -> bool:
+    """If-None-Match uses weak comparison ,either coding of the same content counts as a match."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    hex_digest = digest.hex()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"') in (hex_digest, hex_digest + "-gz"):
+            return True
+    return False
+
+def not_modified_response(request: Request, digest: bytes, has_gzip: bool) -> Response:
+    etag = representation_etag(digest, has_gzip and accepts_gzip(request))
+    return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+
+def cached_json_response(request: Request, body: CachedBody) -> Response:
+    """Pick the stored variant from Accept-Encoding ,no compression work happens here."""
+    digest = body.digest or content_digest(body.identity)
+    if etag_matches(request, digest):
+        return not_modified_response(request, digest, body.gzipped is not None)
+
+    headers = {"Vary": "Accept-Encoding"}
+    if body.gzipped is not None and accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        headers["ETag"] = representation_etag(digest, True)
+        return Response(content=body.gzipped, media_type="application/json", headers=headers)
+    headers["ETag"] = representation_etag(digest, False)
+    return Response(content=body.identity, media_type="application/json", headers=headers)
 
 
 _RELEASE_LOCK_LUA = """
@@ -41,3 +187,11 @@ async def release_lock(redis_client, lock_key: str, token: str):
         except Exception:
             pass
 
+
+async def eval_cache_script(redis_client, name: str, numkeys: int, *args):
+    """One EVALSHA of the named cache script ,on NOSCRIPT (redis restart / failover / SCRIPT FLUSH) EVAL runs it
+    and puts it back in the script cache ,same as rate_limiting.utils.eval_rate_limit_script."""
+    try:
+        return await redis_client.evalsha(CACHE_SCRIPT_SHAS[name], numkeys, *args)
+    except NoScriptError:
+        return await redis_client.eval(CACHE_SCRIPTS[name], numkeys, *args)
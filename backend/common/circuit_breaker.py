@@ -38,53 +38,87 @@ class CircuitBreaker:
         self._fail_count = 0
         self._opened_at: Optional[float] = None
         self._half_open_success_count = 0
+        self._half_open_since: Optional[float] = None
+        self._half_open_probes = 0
 
-        # concurrency control for probes and state transitions
-        self._lock = asyncio.Lock()
+        # no lock around the state: every read + transition below runs without a suspension point ,so on one
+        # event loop they can't interleave. the semaphore gates db probes in common.retries
         self._half_open_semaphore = asyncio.Semaphore(self.max_concurrent_half_open_probes)
 
-    async def _maybe_transition(self):
-        # called under lock before allowing calls
-        if self._state == "OPEN" and self._opened_at is not None :
-            if time.monotonic() - self._opened_at >= self.recovery_timeout:
-                self._state = "HALF_OPEN"
-                self._half_open_success_count = 0
-
-
-    async def before_call(self):
-      
-        async with self._lock:
-            await self._maybe_transition()
-            if self._state == "OPEN":
+    @property
+    def is_open(self) -> bool:
+        """
+        Lock free check: OPEN and still inside recovery_timeout. lets hot paths skip the call (and its
+        fallback decision) without awaiting before_call ,half open probing still goes through before_call.
+        """
+        return (self._state == "OPEN" and self._opened_at is not None
+                and time.monotonic() - self._opened_at < self.recovery_timeout)
+
+    def _enter_half_open(self, now: float):
+        self._state = "HALF_OPEN"
+        self._half_open_since = now
+        self._half_open_success_count = 0
+        self._half_open_probes = 0
+
+    async def before_call(self) -> bool:
+        """
+        Raises CircuitOpenError while open ,and in HALF_OPEN once max_concurrent_half_open_probes calls are out.
+        Returns True when the caller holds one of those probe slots ,hand it back to record_success /
+        record_failure / release_probe.
+        """
+        if self._state == "CLOSED":
+            return False
+        now = time.monotonic()
+        if self._state == "OPEN":
+            if now - self._opened_at < self.recovery_timeout:
                 raise CircuitOpenError(f"circuit {self.name} is open")
-
-    async def _record_success(self):
-        async with self._lock:
-            if self._state in ("OPEN", "HALF_OPEN"):
-                # a success in HALF_OPEN counts towards closing
-                if self._state == "HALF_OPEN":
-                    self._half_open_success_count += 1
-                    if self._half_open_success_count >= self.half_open_success_threshold:
-                        self._state = "CLOSED"
-                        self._fail_count = 0
-                        self._opened_at = None
-                        self._half_open_success_count = 0
-            else:
+            self._enter_half_open(now)
+        elif now - self._half_open_since >= self.recovery_timeout:
+            # probes that never reported back (cancelled ,caller gave up) ,start a new round
+            self._enter_half_open(now)
+        if self._half_open_probes >= self.max_concurrent_half_open_probes:
+            raise CircuitOpenError(f"circuit {self.name} is half open ,probe in flight")
+        self._half_open_probes += 1
+        return True
+
+    def release_probe(self, probe: bool = True):
+        """Give a probe slot back without an outcome (the call said nothing about the service's health)."""
+        if probe and self._half_open_probes > 0:
+            self._half_open_probes -= 1
+
+    def record_success(self, probe: bool = False):
+        self.release_probe(probe)
+        if self._state == "HALF_OPEN":
+            # a success in HALF_OPEN counts towards closing
+            self._half_open_success_count += 1
+            if self._half_open_success_count >= self.half_open_success_threshold:
+                self._state = "CLOSED"
                 self._fail_count = 0
-
-    async def _record_failure(self):
-        async with self._lock:
-            if self._state == "HALF_OPEN":
+                self._opened_at = None
+                self._half_open_success_count = 0
+        elif self._state == "CLOSED":
+            self._fail_count = 0
+
+    def record_failure(self, probe: bool = False):
+        self.release_probe(probe)
+        if self._state == "HALF_OPEN":
+            self._state = "OPEN"
+            self._opened_at = time.monotonic()
+            self._fail_count = 0
+            self._half_open_success_count = 0
+        elif self._state == "CLOSED":
+            self._fail_count += 1
+            if self._fail_count >= self.failure_threshold:
                 self._state = "OPEN"
                 self._opened_at = time.monotonic()
                 self._fail_count = 0
-                self._half_open_success_count = 0
-            elif self._state == "CLOSED":
-                self._fail_count += 1
-                if self._fail_count >= self.failure_threshold:
-                    self._state = "OPEN"
-                    self._opened_at = time.monotonic()
-                    self._fail_count = 0
+
+    # awaited by common.retries
+    async def _record_success(self):
+        self.record_success()
+
+    async def _record_failure(self):
+        self.record_failure()
 
     async def acquire_half_open_probe(self, timeout: Optional[float] = None) -> bool:
         try:
@@ -69,3 +69,10 @@ async def health_check(session:AsyncSession=Depends(get_session)):
     
     return {"status": "healthy"}
 
+
+# readiness (vs /health liveness): 503 while the startup warm-up is still running ,see common/warmup.py
+@home_router.get("/ready")
+async def readiness_check(request: Request):
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "warming_up"})
+    return {"status": "ready"}
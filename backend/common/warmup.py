@@ -0,0 +1,105 @@
+import asyncio
+import time
+import uuid
+from contextlib import AsyncExitStack
+import orjson
+from fastapi import FastAPI
+from sqlalchemy import text
+from backend.cache._cache import redis_client
+from backend.cache.cache_prod_details import cache_get_n_set_product_details_batch
+from backend.cache.listing_index import listing_index
+from backend.common import logger
+from backend.config.warmup_config import warmup_settings
+from backend.db.connection import async_engine, async_session
+from backend.products.repository import fetch_prods, fetch_product_details, fetch_products_details_bulk
+from backend.products.services import listing_page
+from backend.products.utils import decode_cursor
+from backend.user.repository import identify_user_by_pid
+
+
+async def run_warmup(app: FastAPI):
+    """
+    Post deploy warm-up ,started from app_lifespan as a background task.
+    app.state.ready flips to True once every stage ran or the time budget ran out (whatever is warm by then
+    stays warm) ,a failing stage is logged and never blocks readiness.
+    """
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(_warm_all(), timeout=warmup_settings.WARMUP_TIME_BUDGET_SECONDS)
+        logger.info("warmup.done", extra={"elapsed_ms": int((time.monotonic() - started) * 1000)})
+    except asyncio.TimeoutError:
+        logger.warning("warmup.budget_exceeded", extra={"budget_s": warmup_settings.WARMUP_TIME_BUDGET_SECONDS})
+    except Exception:
+        logger.exception("warmup.failed")
+    finally:
+        app.state.ready = True
+
+
+async def _warm_all():
+    await _stage("pool", _warm_pool(warmup_settings.WARMUP_POOL_CONNECTIONS))
+    await _stage("statements", _warm_statements())
+    await _stage("listing_index", listing_index.rebuild_if_missing())
+    public_ids = await _stage("listing", _warm_listing_pages(warmup_settings.WARMUP_LISTING_PAGES,
+                                                               warmup_settings.WARMUP_LISTING_PAGE_SIZE))
+    await _stage("details", _warm_product_details(public_ids or [], warmup_settings.WARMUP_TOP_PRODUCTS))
+
+async def _stage(name: str, coro):
+    # stages are independent ,one failing (eg. redis down) still lets the rest warm up
+    try:
+        return await coro
+    except Exception:
+        logger.warning("warmup.stage_failed", extra={"stage": name})
+        return None
+
+
+async def _warm_pool(n: int):
+    """Check out n connections at the same time so the pool really holds n open sockets afterwards."""
+    pool_size = getattr(async_engine.pool, "size", None)
+    if callable(pool_size):
+        n = min(n, pool_size())
+    async with AsyncExitStack() as stack:
+        conns = [await stack.enter_async_context(async_engine.connect()) for _ in range(max(0, n))]
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+    await redis_client.ping()
+
+async def _warm_statements():
+    # hot query shapes compiled once so the first real requests hit sqlalchemy's compiled cache
+    # and asyncpg's prepared statement cache on the pooled connections
+    async with async_session() as session:
+        await identify_user_by_pid(session, uuid.uuid4())
+        rows = await fetch_prods(session, None, 1)
+        if rows:
+            await fetch_product_details(session, str(rows[0]._mapping["public_id"]))
+
+async def _warm_listing_pages(pages: int, limit: int) -> list:
+    """
+    First `pages` pages of the default listing (no q / category) through the same path as GET /products
+    (listing index fragments ,or the per-page cache). Whatever is cached already is only read.
+    Returns the listed public ids.
+    """
+    public_ids = []
+    cursor_vals = None
+    for _ in range(pages):
+        body = await listing_page(cursor_vals, limit)
+        page = orjson.loads(body.identity)["data"]
+        public_ids.extend(item["public_id"] for item in page["items"])
+        if not page.get("has_more") or not page.get("next_cursor"):
+            break
+        created_at, last_id = decode_cursor(page["next_cursor"])
+        cursor_vals = (created_at, int(last_id))
+    return public_ids
+
+async def _warm_product_details(listed_ids: list, top: int):
+    """
+    Top M product details into redis with one bulk query + one pipelined backfill.
+    There is no popularity signal yet ,"top" follows the listing order (newest first) like the listing itself.
+    """
+    if top <= 0:
+        return
+    public_ids = list(dict.fromkeys(listed_ids))[:top]
+    async with async_session() as session:
+        if len(public_ids) < top:
+            rows = await fetch_prods(session, None, top)
+            public_ids = list(dict.fromkeys(public_ids + [str(r._mapping["public_id"]) for r in rows[:top]]))[:top]
+        if public_ids:
+            await cache_get_n_set_product_details_batch(session, public_ids, fetch_products_details_bulk)
@@ -0,0 +1,60 @@
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    # in-process L1 tier sitting in front of redis for catalog reads
+    L1_CACHE_ENABLED: bool = True
+    L1_CACHE_MAX_BYTES: int = 32 * 1024 * 1024   # total payload bytes held per worker
+    L1_CACHE_TTL_SECONDS: float = 10.0            # upper bound on how long a worker serves its own copy
+
+    # cached bodies at/above this size also get a pre-compressed gzip variant
+    GZIP_MIN_BYTES: int = 1024
+    GZIP_LEVEL: int = 6
+
+    # internal cached structures (see cache/codecs.py) are zlib compressed at/above this size
+    CACHE_ZLIB_MIN_BYTES: int = 512
+    CACHE_ZLIB_LEVEL: int = 1
+
+    # redis client (see cache/_cache.py) ,per-command deadline is the socket timeout
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 1.0
+    REDIS_CONNECT_TIMEOUT_SECONDS: float = 0.5
+    REDIS_MAX_CONNECTIONS: int = 64            # per worker ,callers wait up to REDIS_POOL_TIMEOUT_SECONDS for one
+    REDIS_POOL_TIMEOUT_SECONDS: float = 0.2
+    REDIS_HEALTH_CHECK_INTERVAL: int = 15      # idle connections are PINGed before reuse after this many seconds
+    # redis circuit breaker ,open => cache goes to L1 / loader and rate limiting to its local fallback
+    REDIS_CB_FAILURE_THRESHOLD: int = 5
+    REDIS_CB_RECOVERY_TIMEOUT_SECONDS: float = 5.0
+
+    # unknown product ids: short lived tombstones in redis + per-worker bloom filter over live public ids
+    PRODUCT_NOT_FOUND_TTL: int = 60
+    # per-worker copy of a product's stock ,dropped by the invalidation channel when it changes ,the ttl bounds a missed message
+    PRODUCT_AVAILABILITY_L1_TTL_SECONDS: float = 2.0
+    PRODUCT_FILTER_ENABLED: bool = True
+    PRODUCT_FILTER_ERROR_RATE: float = 0.01
+    PRODUCT_FILTER_GRACE_SECONDS: float = 30.0   # uuid7 ids minted after (snapshot - grace) always pass
+    PRODUCT_FILTER_REBUILD_SECONDS: float = 10 * 60   # full reload ,the only way deleted ids leave the filter
+
+    # hot key tracking (space-saving sketch) exported on /metrics
+    CACHE_HOT_KEYS_CAPACITY: int = 256
+    CACHE_HOT_KEYS_TOP_N: int = 20
+
+    # speculative fill of the next listing page ,at most this many prefetches in flight per worker
+    CACHE_PREFETCH_ENABLED: bool = True
+    CACHE_PREFETCH_MAX_IN_FLIGHT: int = 4
+
+    # listing pages from the shared id index (zset) + per-product fragments ,see cache/listing_index.py
+    LISTING_INDEX_ENABLED: bool = True
+    LISTING_FRAGMENT_TTL: int = 60 * 60
+    LISTING_INDEX_REBUILD_CHUNK: int = 1000
+    LISTING_INDEX_REBUILD_LOCK_SECONDS: int = 120
+
+    # catalog outbox rows the fast path left PENDING are re-delivered (see catalog_outbox_sweeper)
+    CATALOG_OUTBOX_SWEEP_INTERVAL_SECONDS: float = 15.0
+    CATALOG_OUTBOX_SWEEP_GRACE_SECONDS: float = 30.0
+    CATALOG_OUTBOX_SWEEP_BATCH: int = 100
+
+    class Config:
+        env_file = ".env"
+        extra="ignore"
+
+cache_settings = Settings()
@@ -0,0 +1,17 @@
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    # startup warm-up run from app_lifespan ,/ready reports 503 until it finishes or runs out of budget
+    WARMUP_ENABLED: bool = True
+    WARMUP_TIME_BUDGET_SECONDS: float = 10.0
+    WARMUP_POOL_CONNECTIONS: int = 5     # db connections opened up front (capped at the pool size)
+    WARMUP_LISTING_PAGES: int = 3        # first K pages of the default listing
+    WARMUP_LISTING_PAGE_SIZE: int = 20   # the listing route's default limit
+    WARMUP_TOP_PRODUCTS: int = 50        # top M product details pushed into redis
+
+    class Config:
+        env_file = ".env"
+        extra="ignore"
+
+warmup_settings = Settings()
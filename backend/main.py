@@ -1,6 +1,9 @@
 
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import Depends, FastAPI
+from prometheus_fastapi_instrumentator import Instrumentator
+from starlette.middleware.gzip import GZipMiddleware
 from backend.api.routers import public_routers,admin_routers
 from backend.auth.routes import auth_router
 from backend.common.custom_exceptions import register_all_exceptions
@@ -9,31 +12,73 @@ from backend.db.dependencies import get_session
 from backend.middlewares.auth_middleware import AuthenticationMiddleware
 from backend.middlewares.authorization_middleware import AuthorizationMiddleware
 from backend.middlewares.device_authentication_middleware import DeviceSessionMiddleware
-from backend.middlewares.rate_limit_middleware import RateLimitMiddleware
 from backend.middlewares.request_id_middleware import RequestIdMiddleware
 from backend.orders.webhooks import razorpay_webhook
 from backend.user.routes import user_router
 from backend.db.connection import async_engine,async_session
 from backend.api.__init__ import version_prefix,cur_version
 from backend.background_workers.base_pubsub_interface import BasePubSubWorker
+from backend.background_workers.catalog_outbox_sweeper import catalog_outbox_sweeper
 from backend.config.admin_config import admin_config
 from backend.config.settings import config_settings
+from backend.config.cache_config import cache_settings
+from backend.cache.notifications import cache_notifier
+from backend.cache.existence_filter import product_existence_filter
+from backend.cache.listing_index import listing_index
+from backend.products.repository import fetch_live_product_public_ids
+from backend.products.services import load_listing_index_entries, load_listing_items
+from backend.common.warmup import run_warmup
+from backend.rate_limiting.utils import preload_rate_limit_scripts
+from backend.config.warmup_config import warmup_settings
 
 rzpay_webhook_path = config_settings.RZPAY_WEBHOOK_PATH
 
 @asynccontextmanager
 async def app_lifespan(app: FastAPI):
     setup_logging()
-    app.state.rate_limit_strategy = "fixed_window"
+    app.state.rate_limit_strategy = "fixed_window"   # fixed_window | sliding_window | sliding_window_counter | leaky_bucket (GCRA)
     base_pubsub=BasePubSubWorker()
     base_pubsub.start()
 
     app.state.pubsub_pub=base_pubsub.publish
+    # catalog outbox rows whose fast path publish / handler failed go through the pubsub again
+    catalog_outbox_sweeper.start(base_pubsub.publish)
+
+    # limiter scripts into redis' script cache up front ,each limiter call is then one EVALSHA
+    await preload_rate_limit_scripts()
+
+    # keeps per-worker L1 cache coherent with version bumps from other workers
+    cache_notifier.start()
+
+    # unknown product ids are rejected in memory ,creates are added by the catalog handler ,full reload periodically
+    if cache_settings.PRODUCT_FILTER_ENABLED:
+        async def live_product_ids():
+            async with async_session() as session:
+                return await fetch_live_product_public_ids(session)
+        product_existence_filter.start(live_product_ids)
+
+    # listing pages from the shared id index ,built once (one worker) if redis doesn't have it yet
+    if cache_settings.LISTING_INDEX_ENABLED:
+        listing_index.start(load_listing_index_entries, load_listing_items)
+
+    # pool / statement caches / hot catalog keys ,/ready stays 503 until this finishes or hits its budget
+    app.state.ready = not warmup_settings.WARMUP_ENABLED
+    warmup_task = asyncio.create_task(run_warmup(app)) if warmup_settings.WARMUP_ENABLED else None
 
     try:
         yield
     finally:
         # at this point new requests accept has been stopped already before calling shutdown
+        if warmup_task and not warmup_task.done():
+            warmup_task.cancel()
+            try:
+                await warmup_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        await product_existence_filter.shutdown()
+        await listing_index.shutdown()
+        await catalog_outbox_sweeper.shutdown()
+        await cache_notifier.shutdown()
         await base_pubsub.shutdown()
         # safe to dispose DB engine after workers exit
         await async_engine.dispose()
@@ -59,12 +104,20 @@ def create_app():
     
     # app.add_middleware(DeviceSessionMiddleware,session=async_session,paths=[f"{version_prefix}/cart/items",
     #                                                                         f"{version_prefix}/checkout"])
-    # app.add_middleware(RateLimitMiddleware)
+
+    # request metrics + the cache counters / hot key gauge from backend.cache.metrics ,scraped by prometheus
+    Instrumentator().instrument(app).expose(app, include_in_schema=False)
+
+    # uncached json responses ,cached catalog bodies already carry Content-Encoding and pass through untouched
+    app.add_middleware(GZipMiddleware, minimum_size=cache_settings.GZIP_MIN_BYTES,
+                       compresslevel=cache_settings.GZIP_LEVEL)
     
     app.add_middleware(AuthorizationMiddleware,session_maker=async_session,paths=[f"{version_prefix}/admin/products"])
     
     app.add_middleware(AuthenticationMiddleware,session_maker=async_session,paths=[f"{version_prefix}/auth/",
                                                                              f"{version_prefix}/health",
+                                                                             f"{version_prefix}/ready",
+                                                                             "/metrics",
                                                                              f"{version_prefix}/session/init",
                                                                              f"{version_prefix}/admin/uploads",f"{version_prefix}/webhooks",
                                                                              f"/webhooks",
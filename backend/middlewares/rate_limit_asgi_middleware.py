@@ -0,0 +1,94 @@
+import time
+from typing import Dict, Optional
+import orjson
+from backend.common.utils import build_error
+from backend.rate_limiting.constants import RATE_LIMIT_PREFIX
+from backend.rate_limiting.policies import PolicyTable, RateLimitPolicy
+from backend.rate_limiting.utils import _identifier_from_scope
+from backend.middlewares.constants import logger
+
+
+class RateLimitASGIMiddleware:
+    """
+    Pure asgi rate limiter: no extra tasks / streams around the response (BaseHTTPMiddleware) ,the limit
+    headers are added to http.response.start as it passes through.
+
+    Requests are keyed by route template (one bucket for every /products/{product_id}) and resolved through
+    a PolicyTable compiled from the app's routes at startup ,when the lifespan reports startup complete (routers
+    are included inside app_lifespan ,so not before). A bad policy fails the startup instead of a request.
+    Nothing is read from app.state per call.
+
+        app.add_middleware(RateLimitASGIMiddleware, default=RateLimitPolicy(limit=100, window=60),
+                           policies={"/api/v1/auth/login": RateLimitPolicy(limit=5, window=60, scope="ip"),
+                                     "/api/v1/admin/*": None})
+    """
+    def __init__(self, app, *, default: Optional[RateLimitPolicy] = RateLimitPolicy(),
+                 policies: Optional[Dict[str, Optional[RateLimitPolicy]]] = None):
+        self.app = app
+        self.default = default
+        self.policies = policies or {}
+        self._table: Optional[PolicyTable] = None
+
+    def compile(self, app) -> PolicyTable:
+        """policy table for `app`'s routes ,strategy from app.state.rate_limit_strategy (set in the lifespan)"""
+        templates = [route.path for route in getattr(app, "routes", ()) if getattr(route, "path", None)]
+        state = getattr(app, "state", None)
+        strategy = getattr(state, "rate_limit_strategy", None) or "fixed_window"
+        self._table = PolicyTable.compile(templates, self.policies, self.default, strategy)
+        return self._table
+
+    def _compile_on_startup(self, scope, send):
+        async def send_after_compile(message):
+            if message["type"] == "lifespan.startup.complete":
+                try:
+                    self.compile(scope.get("app"))
+                except Exception as exc:
+                    logger.exception("rate_limit.middleware.compile_failed")
+                    message = {"type": "lifespan.startup.failed", "message": str(exc)}
+            await send(message)
+        return send_after_compile
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.app(scope, receive, self._compile_on_startup(scope, send))
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # compiled at startup ,only a server running without lifespan events gets here first
+        table = self._table or self.compile(scope.get("app"))
+        policy = table.resolve(scope["path"])
+        if policy is None:
+            return await self.app(scope, receive, send)
+
+        if policy.scope == "route":
+            identifier, kind = "all", "route"
+        else:
+            identifier, kind = _identifier_from_scope(scope, ip_only=policy.scope == "ip")
+        key = f"{RATE_LIMIT_PREFIX}:{kind}:{identifier}:{policy.template}"
+        try:
+            allowed, remaining, reset = await policy.allow(key, policy.limit, policy.window)
+        except Exception:
+            logger.warning("rate_limit.middleware.failed", extra={"path": scope["path"]})
+            return await self.app(scope, receive, send)
+
+        scope.setdefault("state", {})["rate_limit"] = {"limit": policy.limit, "remaining": remaining, "reset": reset}
+        headers = [(b"x-ratelimit-limit", policy.limit_header),
+                   (b"x-ratelimit-remaining", str(remaining).encode()),
+                   (b"x-ratelimit-reset", str(reset).encode())]
+
+        if not allowed:
+            retry_after = max(0, reset - int(time.time()))
+            body = orjson.dumps(build_error(code="RATE_LIMITED", details={"message": "Too many requests"}))
+            await send({"type": "http.response.start", "status": 429,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode()),
+                                    (b"retry-after", str(retry_after).encode()), *headers]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_limit_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), *headers]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_limit_headers)
@@ -4,8 +4,11 @@ from fastapi import Request, Response, status
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 from backend.common.utils import build_error, json_error
-from backend.rate_limiting.constants import DEFAULT_LIMIT, DEFAULT_WINDOW, RATE_LIMIT_PREFIX
+from backend.rate_limiting.constants import DEFAULT_LEASE_SIZE, DEFAULT_LIMIT, DEFAULT_WINDOW, RATE_LIMIT_PREFIX
 from backend.rate_limiting.rate_limit_fixed_window import redis_allow
+from backend.rate_limiting.rate_limit_leaky_bucket import redis_allow_gcra
+from backend.rate_limiting.rate_limit_lease import redis_allow_leased
+from backend.rate_limiting.rate_limit_sliding_counter import redis_allow_sliding_counter
 from backend.rate_limiting.rate_limit_sliding_window import redis_allow_sliding
 from backend.rate_limiting.utils import _identifier_from_request
 from backend.middlewares.constants import logger
@@ -13,10 +16,12 @@ from backend.middlewares.constants import logger
 
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, limit: int = DEFAULT_LIMIT, window: int = DEFAULT_WINDOW):
+    def __init__(self, app, limit: int = DEFAULT_LIMIT, window: int = DEFAULT_WINDOW,
+                 lease_size: int = DEFAULT_LEASE_SIZE):
         super().__init__(app)
         self.limit = limit
         self.window = window
+        self.lease_size = lease_size
 
     async def dispatch(self, request: Request, call_next):
 
@@ -34,6 +39,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         rl_cfg = getattr(request.app.state, "rate_limit", None) if cfg else None
         limit = rl_cfg.get("limit", self.limit) if rl_cfg else self.limit
         window = rl_cfg.get("window", self.window) if rl_cfg else self.window
+        lease_size = rl_cfg.get("lease_size", self.lease_size) if rl_cfg else self.lease_size
 
         rate_limit_strategy = getattr(request.app.state, "rate_limit_strategy", "fixed_window")
 
@@ -48,9 +54,24 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             except Exception as e:
                 return await call_next(request)
 
+        if rate_limit_strategy == "sliding_window_counter":
+            try:
+                allowed, remaining, reset = await redis_allow_sliding_counter(key, limit, window)
+            except Exception as e:
+                return await call_next(request)
+
+        if rate_limit_strategy == "leaky_bucket":
+            try:
+                allowed, remaining, reset = await redis_allow_gcra(key, limit, window)
+            except Exception as e:
+                return await call_next(request)
+
         if rate_limit_strategy == "fixed_window":
             try:
-                allowed, remaining, reset = await redis_allow(key, limit, window)
+                if lease_size > 1:
+                    allowed, remaining, reset = await redis_allow_leased(key, limit, window, lease_size)
+                else:
+                    allowed, remaining, reset = await redis_allow(key, limit, window)
             except Exception as e:
                 return await call_next(request)
         request.state.rate_limit = {"limit": limit, "remaining": remaining, "reset": reset}
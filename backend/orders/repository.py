@@ -12,6 +12,7 @@ from sqlalchemy import Tuple, and_, case, delete, func, select, text, update
 from sqlalchemy.exc import IntegrityError
 from backend.common.utils import build_success, json_ok, now
 from backend.orders.constants import RESERVATION_TTL_MINUTES, UPI_RESERVATION_TTL_MINUTES
+from backend.products.repository import emit_stock_changed
 from backend.schema.full_schema import Cart, CartItem, CheckoutSession, CheckoutStatus, CommitIntent, CommitIntentStatus, IdempotencyKey, InventoryReservation, InventoryReserveStatus, OrderIdempotencyStatus, Orders, OrderItem, OrderStatus, OutboxEvent, OutboxEventStatus, Payment, PaymentAttempt, PaymentStatus, PaymentWebhookEvent, Product
 
 
@@ -708,11 +709,17 @@ async def commit_reservations_and_decrement_stock(session,order_id):
         prod_update = (
                 update(Product)
                 .where(and_(Product.id == pid, Product.stock_qty >= q))
-                .values(stock_qty=Product.stock_qty - q)
+                .values(stock_qty=Product.stock_qty - q, updated_at=now())
+                .returning(Product.public_id, Product.stock_qty, Product.updated_at)
         )
         prod_result = await session.execute(prod_update)
-        # prod_result.rowcount should be 1 if update succeeded (stock >= q), otherwise 0
-        if prod_result.rowcount == 0:
+        prod_row = prod_result.one_or_none()
+        prod_pid = prod_row[0] if prod_row is not None else None
+        if prod_row is not None:
+            # same tx as the decrement ,the outbox relay sets the availability entry after commit
+            await emit_stock_changed(session, pid, prod_pid, prod_row[1], prod_row[2])
+        # a row is returned only if update succeeded (stock >= q)
+        if prod_pid is None:
             # Either product not found OR stock insufficient OR concurrent change
             #** log it , also check how to handle it properly webhook shouldn't retry in case of concurrent update or if product stock rem is low--
             #-- product not found shouldn't happen--
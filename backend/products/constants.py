@@ -1,5 +1,14 @@
 
-PRODUCT_LIST_TTL : int = 210  # seconds
+# listing keys embed the catalog version so writes don't wait for expiry ,the ttl only bounds staleness when a
+# version bump is lost for good (outbox row FAILED after the sweeper's retries)
+PRODUCT_LIST_TTL : int = 5 * 60  # seconds
+PRODUCT_LIST_STALE_WINDOW : int = 60  # seconds a listing page may be served stale while it is refreshed
+PRODUCT_BATCH_MAX : int = 50  # ids per POST /products/batch
+
+CATALOG_CHANGED_TOPIC = "catalog.changed"
+# stock movements only touch the per-product availability entry ,separate outbox row so they never
+# coalesce with (and swallow) a pending catalog.changed for the same product
+STOCK_CHANGED_TOPIC = "catalog.stock_changed"
 
 from backend.common.logging_setup import get_logger
 
@@ -2,7 +2,9 @@
 
 from datetime import datetime
 from typing import Any, Dict, List, Optional
+from uuid import UUID
 from pydantic import BaseModel, Field
+from backend.products.constants import PRODUCT_BATCH_MAX
 
 
 class ProductCreateIn(BaseModel):
@@ -26,3 +28,8 @@ class ProductUpdateIn(BaseModel):
 
     model_config = {"extra": "forbid"}   # for any extra input fields in model raise 422 at pydantic level
 
+
+class ProductBatchIn(BaseModel):
+    public_ids: List[UUID] = Field(..., min_length=1, max_length=PRODUCT_BATCH_MAX)
+
+    model_config = {"extra": "forbid"}
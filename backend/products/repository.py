@@ -6,8 +6,8 @@ from sqlalchemy import and_, desc, or_, select, text, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload , load_only
 from backend.common.utils import now
-from backend.schema.full_schema import Product, ProductCategory, ProductCategoryLink
-from backend.products.constants import logger
+from backend.schema.full_schema import OutboxEvent, OutboxEventStatus, Product, ProductCategory, ProductCategoryLink
+from backend.products.constants import CATALOG_CHANGED_TOPIC, STOCK_CHANGED_TOPIC, logger
 
 async def add_product_categories(session, product_id, product_pid, cat_names):
 
@@ -69,10 +69,8 @@ async def find_product_by_pid(session, product_pid):
     }
 
 
-#** images not joined for now .
-#** may use postgres specific single query join and aggregate for better perf .
-async def fetch_product_details(session, product_public_id: str):
-    stmt = (
+def _product_details_stmt():
+    return (
         select(Product)
         .options(
             load_only(
@@ -90,21 +88,10 @@ async def fetch_product_details(session, product_public_id: str):
                 ProductCategory.name,
             ),
         )
-        .where(
-            Product.public_id == product_public_id,
-            Product.deleted_at.is_(None),
-        )
+        .where(Product.deleted_at.is_(None))
     )
 
-    res = await session.execute(stmt)
-    product = res.scalar_one_or_none()
-
-    if product is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found",
-        )
-
+def _product_details_dict(product):
     return {
         "public_id": str(product.public_id),
         "stock_qty": product.stock_qty,
@@ -119,6 +106,58 @@ async def fetch_product_details(session, product_public_id: str):
         ],
     }
 
+#** images not joined for now .
+#** may use postgres specific single query join and aggregate for better perf .
+async def fetch_product_details(session, product_public_id: str):
+    stmt = _product_details_stmt().where(Product.public_id == product_public_id)
+
+    res = await session.execute(stmt)
+    product = res.scalar_one_or_none()
+
+    if product is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found",
+        )
+
+    return _product_details_dict(product)
+
+async def fetch_product_availability(session, product_public_id: str):
+    """(stock_qty, updated_at) of a live product ,None when missing/deleted."""
+    stmt = select(Product.stock_qty, Product.updated_at).where(Product.public_id == product_public_id,
+                                                                Product.deleted_at.is_(None))
+    res = await session.execute(stmt)
+    row = res.one_or_none()
+    return (row[0], row[1]) if row else None
+
+async def fetch_live_product_public_ids(session) -> list[str]:
+    """Every live (not deleted) product public id ,feeds the per-worker existence filter."""
+    res = await session.execute(select(Product.public_id).where(Product.deleted_at.is_(None)))
+    return [str(pid) for pid in res.scalars().all()]
+
+async def fetch_listing_index_entries(session) -> list:
+    """(id, created_at) of every live product ,the full build of the listing index."""
+    res = await session.execute(select(Product.id, Product.created_at).where(Product.deleted_at.is_(None)))
+    return [(row[0], row[1]) for row in res.all()]
+
+async def fetch_listing_rows_by_ids(session, product_ids: list[int]):
+    """Listing columns (+ updated_at as fragment version) of the live products among product_ids."""
+    if not product_ids:
+        return []
+    stmt = select(Product.id, Product.public_id, Product.name, Product.base_price, Product.created_at,
+                  Product.updated_at).where(Product.id.in_(product_ids), Product.deleted_at.is_(None))
+    res = await session.execute(stmt)
+    return res.all()
+
+async def fetch_products_details_bulk(session, product_public_ids: list[str]) -> dict:
+    """One set based query (+ one selectin for categories) for many products ,missing/deleted ids are absent."""
+    if not product_public_ids:
+        return {}
+    stmt = _product_details_stmt().where(Product.public_id.in_(product_public_ids))
+
+    res = await session.execute(stmt)
+    return {str(p.public_id): _product_details_dict(p) for p in res.scalars().all()}
+
 async def patch_product(session, updates, user_id, user_pid, product_id):
     stmt = (
         update(Product)
@@ -202,5 +241,60 @@ async def fetch_prods(session,cursor_vals,limit):
 
     result = await session.execute(stmt)
     rows = result.all()
-    return rows 
+    return rows
+
+
+async def emit_catalog_changed(session, product_id: int, product_pid, reason: str):
+    """
+    Record a catalog.changed outbox row inside the caller's transaction.
+
+    One row per product (unique topic/aggregate) ,a later write re-arms the same row back to PENDING
+    with a fresh created_at ,so at least one cache bump is always pending after the latest write.
+    Returns the pubsub task dict to publish once the transaction has committed.
+    """
+    payload = {"product_id": product_id, "product_public_id": str(product_pid), "reason": reason}
+    return await _emit_product_outbox(session, CATALOG_CHANGED_TOPIC, product_id, payload)
+
+async def emit_stock_changed(session, product_id: int, product_pid, stock_qty: int, updated_at):
+    """
+    Same as emit_catalog_changed for stock movements ,carries the committed quantity and row updated_at so
+    the availability entry can be set without reading the row back.
+    """
+    payload = {"product_id": product_id, "product_public_id": str(product_pid), "reason": "stock.committed",
+               "stock_qty": int(stock_qty), "updated_at": updated_at.isoformat()}
+    return await _emit_product_outbox(session, STOCK_CHANGED_TOPIC, product_id, payload)
+
+async def _emit_product_outbox(session, topic: str, product_id: int, payload: dict):
+    emitted_at = now()
+    stmt = (
+        insert(OutboxEvent)
+        .values(
+            topic=topic,
+            payload=payload,
+            aggregate_type="product",
+            aggregate_id=product_id,
+            status=OutboxEventStatus.PENDING.value,
+            attempts=0,
+            created_at=emitted_at,
+        )
+        .on_conflict_do_update(
+            constraint="uq_outboxevent_topic_agtype_agid",
+            set_={
+                "payload": payload,
+                "status": OutboxEventStatus.PENDING.value,
+                "attempts": 0,
+                "next_retry_at": None,
+                "created_at": emitted_at,
+            },
+        )
+        .returning(OutboxEvent.id)
+    )
+    res = await session.execute(stmt)
+    outbox_event_id = res.scalar_one()
 
+    return {
+        "outbox_event_id": outbox_event_id,
+        "topic": topic,
+        "emitted_at": emitted_at.isoformat(),
+        "payload": payload,
+    }
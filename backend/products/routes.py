@@ -1,19 +1,19 @@
 
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Request, Response,status
+from fastapi import APIRouter, Depends, HTTPException, Request,status
 from fastapi.params import Query
-from backend.cache.cache_get_n_set import cache_get_or_set_product_listings
-from backend.cache.cache_prod_details import cache_get_n_set_product_details
+from backend.cache.utils import cached_json_response
+from backend.cache.cache_prod_details import cache_get_n_set_product_details, cache_get_n_set_product_details_batch, product_details_not_modified, reject_unknown_product
 from backend.common.utils import success_response
 from backend.db.dependencies import get_session
-from backend.products.constants import PRODUCT_LIST_TTL
 from backend.products.dependency import require_permissions
-from backend.products.models import ProductCreateIn, ProductUpdateIn
+from backend.products.models import ProductBatchIn, ProductCreateIn, ProductUpdateIn
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.products.repository import fetch_prods, fetch_product_details, find_product_by_pid, patch_product, validate_categories_by_names
-from backend.products.services import create_product_with_catgs
+from backend.products.repository import emit_catalog_changed, fetch_prods, fetch_product_details, fetch_products_details_bulk, find_product_by_pid, patch_product, validate_categories_by_names
+from backend.products.services import (build_listing_page, create_product_with_catgs, listing_not_modified, listing_page,
+                                       publish_catalog_events)
 from backend.image_uploads.routes import prod_images_router
-from backend.products.utils import decode_cursor, encode_cursor, make_params_key, validate_uuid
+from backend.products.utils import decode_cursor, validate_uuid
 from backend.products.constants import logger
 
 prods_public_router=APIRouter()
@@ -29,8 +29,9 @@ async def create_product(request:Request,payload: ProductCreateIn, session: Asyn
 
     logger.info("product.create.attempt", extra={"user": user_pid})
    
-    product_res=await create_product_with_catgs(session,payload,user_identifier,user_pid)
+    product_res, catalog_event=await create_product_with_catgs(session,payload,user_identifier,user_pid)
     await session.commit()
+    publish_catalog_events(request.app, [catalog_event])
 
     logger.info("product.create.success",extra={"product_id": product_res["public_id"], "user": user_pid})
 
@@ -55,10 +56,12 @@ async def update_product(request:Request,payload: ProductUpdateIn, product_publi
     updates.pop("category_names",None)
 
     product_pid = await patch_product(session, updates, user_identifier, user_pid, product["product_id"])
+    catalog_event = await emit_catalog_changed(session, product["product_id"], product_pid, reason="product.updated")
 
     # if cat_ids is not None:
     #     await replace_catgs(session,product_id,cat_ids)
     await session.commit()
+    publish_catalog_events(request.app, [catalog_event])
 
     resp =  {"message":f"product {product_pid} updated"}
     return success_response(resp)
@@ -66,53 +69,36 @@ async def update_product(request:Request,payload: ProductUpdateIn, product_publi
 #** currently using created at to sort products , later chnage it to use popularity score .
 @prods_public_router.get("")
 async def get_products(
+    request: Request,
     limit: int = Query(20, ge=1, le=100),
     cursor: Optional[str] = Query(None, description="Opaque signed cursor token"),
     q: Optional[str] = Query(None),
-    category: Optional[str] = Query(None),
-    session: AsyncSession = Depends(get_session)):
+    category: Optional[str] = Query(None)):
     
-    canonical_cursor_key: str = "start"  # first page
-   
     cursor_vals = None
     if cursor:
         prod_created_at, last_prod_id = decode_cursor(cursor, max_age=24*3600)  # optional max_age
         cursor_vals = (prod_created_at, int(last_prod_id))
-        canonical_cursor_key = f"{prod_created_at.isoformat()}_{int(last_prod_id)}"
-
-    key_suffix = make_params_key(limit, canonical_cursor_key, q, category)
-
-        
-    async def loader():
-        rows = await fetch_prods(session,cursor_vals,limit)
-
-        has_more = len(rows) > limit
-        page_rows = rows[:limit]
-
-        items_out = []
-        for p in page_rows:
-            m = p._mapping  # SQLAlchemy Row -> mapping of selected columns
-            items_out.append({
-                "id": str(m["id"]),
-                "public_id": str(m["public_id"]),
-                "name": m["name"],
-                "price": int(m["base_price"] or 0),
-                "created_at": m["created_at"].isoformat()
-            })
-
-        next_cursor = None
-        if has_more:
-            last = page_rows[-1]._mapping
-            next_cursor = encode_cursor(last.created_at, last.id, ttl_seconds=3600)
-
-        response = {"items": items_out, "next_cursor": next_cursor, "has_more": has_more}
-        return response
-    
-    results = await cache_get_or_set_product_listings("products_listing", key_suffix, PRODUCT_LIST_TTL, loader)
-    return Response(
-        content=results,
-        media_type="application/json",
-    )
+
+    # a matching If-None-Match is answered from the cached digest ,the page body is never built / fetched
+    not_modified = await listing_not_modified(request, cursor_vals, limit, q, category)
+    if not_modified is not None:
+        return not_modified
+
+    # shared listing index when built ,per-page cache otherwise (see services.listing_page)
+    results = await listing_page(cursor_vals, limit, q, category)
+    return cached_json_response(request, results)
+
+
+# cart / checkout / wishlist screens: one call instead of one GET /products/{id} per item
+@prods_public_router.post("/batch")
+async def get_products_batch(
+    payload: ProductBatchIn,
+    session: AsyncSession = Depends(get_session)):
+
+    public_ids = [str(pid) for pid in payload.public_ids]
+    items = await cache_get_n_set_product_details_batch(session, public_ids, fetch_products_details_bulk)
+    return success_response({"items": items})
 
 
 @prods_public_router.get("/{product_public_id}")
@@ -120,13 +106,14 @@ async def get_product_details(
     request:Request,
     product_public_id: str,
     session: AsyncSession = Depends(get_session)):
-   
+
+    reject_unknown_product(product_public_id)
+    not_modified = await product_details_not_modified(request, product_public_id)
+    if not_modified is not None:
+        return not_modified
 
     product_details = await cache_get_n_set_product_details(session, product_public_id,fetch_product_details)
-    return Response(
-        content=product_details,
-        media_type="application/json",
-    )
+    return cached_json_response(request, product_details)
 
 
 @prods_public_router.get("/without_cache/")
@@ -137,43 +124,13 @@ async def get_products_without_cache(
     category: Optional[str] = Query(None),
     session: AsyncSession = Depends(get_session)):
     
-    canonical_cursor_key: str = "start"  # first page
-   
     cursor_vals = None
     if cursor:
         prod_created_at, last_prod_id = decode_cursor(cursor, max_age=24*3600)  # optional max_age
         cursor_vals = (prod_created_at, int(last_prod_id))
-        canonical_cursor_key = f"{prod_created_at.isoformat()}_{int(last_prod_id)}"
-
-    key_suffix = make_params_key(limit, canonical_cursor_key, q, category)
-
-        
-    async def loader():
-        rows = await fetch_prods(session,cursor_vals,limit)
-
-        has_more = len(rows) > limit
-        page_rows = rows[:limit]
-
-        items_out = []
-        for p in page_rows:
-            m = p._mapping  # SQLAlchemy Row -> mapping of selected columns
-            items_out.append({
-                "id": str(m["id"]),
-                "public_id": str(m["public_id"]),
-                "name": m["name"],
-                "price": int(m["base_price"] or 0),
-                "created_at": m["created_at"].isoformat()
-            })
-
-        next_cursor = None
-        if has_more:
-            last = page_rows[-1]._mapping
-            next_cursor = encode_cursor(last.created_at, last.id, ttl_seconds=3600)
-
-        response = {"items": items_out, "next_cursor": next_cursor, "has_more": has_more}
-        return response
-    
-    results = await loader()
+
+    rows = await fetch_prods(session,cursor_vals,limit)
+    results = build_listing_page(rows, limit)
     return success_response(results, status_code=status.HTTP_200_OK)
      
 
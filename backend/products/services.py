@@ -1,13 +1,26 @@
 
+import asyncio
+from datetime import datetime
+import orjson
 from fastapi import HTTPException , status
 from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
 from uuid6 import uuid7
+from backend.cache.cache_get_n_set import (cache_get_or_set_product_listings, cached_not_modified, get_catalog_version,
+                                           listing_cache_key, prefetch_listing)
+from backend.cache.cache_prod_details import detail_version
+from backend.cache.listing_index import ListingEntry, listing_index
+from backend.cache.utils import CachedBody
 from backend.common.utils import now
-from backend.products.repository import add_product_categories
+from backend.config.cache_config import cache_settings
+from backend.db.connection import async_session
+from backend.products.constants import PRODUCT_LIST_STALE_WINDOW, PRODUCT_LIST_TTL
+from backend.products.repository import (add_product_categories, emit_catalog_changed, fetch_listing_index_entries,
+                                         fetch_listing_rows_by_ids, fetch_prods)
 from backend.schema.full_schema import Product
 from sqlalchemy.exc import IntegrityError
 from backend.products.constants import logger
+from backend.products.utils import encode_cursor, make_params_key
 
 async def create_product_with_catgs(session, payload, user_id, user_pid):
     values = {
@@ -48,12 +61,132 @@ async def create_product_with_catgs(session, payload, user_id, user_pid):
     if payload.category_names:
         await add_product_categories(session, product_id, product_pid, payload.category_names)
 
+    catalog_event = await emit_catalog_changed(session, product_id, product_pid, reason="product.created")
+
     return {
             "public_id": str(product_pid),
             "name": name,
             "base_price": base_price,
             "stock_qty": stock_qty
-        }
+        }, catalog_event
+
+
+def publish_catalog_events(app, events):
+    """Hand committed catalog.changed outbox rows to the in-process workers (cache bumps)."""
+    for event in events:
+        try:
+            app.state.pubsub_pub(event["topic"], event)
+        except asyncio.QueueFull:
+            # row stays PENDING in outbox ,catalog_outbox_sweeper re-delivers it after its grace period
+            logger.warning("catalog.changed.enqueue_failed", extra={"outbox_event_id": event["outbox_event_id"]})
+
+
+def listing_cursor_key(cursor_vals) -> str:
+    """Canonical cache key part for a decoded listing cursor ,"start" for the first page."""
+    if not cursor_vals:
+        return "start"
+    created_at, last_id = cursor_vals
+    return f"{created_at.isoformat()}_{int(last_id)}"
+
+def listing_item(m) -> dict:
+    """One listing item from a row mapping ,shared by the per-page path and the listing index fragments."""
+    return {
+        "id": str(m["id"]),
+        "public_id": str(m["public_id"]),
+        "name": m["name"],
+        "price": int(m["base_price"] or 0),
+        "created_at": m["created_at"].isoformat()
+    }
+
+def listing_page_payload(items: list, has_more: bool) -> dict:
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = encode_cursor(datetime.fromisoformat(last["created_at"]), last["id"], ttl_seconds=3600)
+    return {"items": items, "next_cursor": next_cursor, "has_more": has_more}
+
+def build_listing_page(rows, limit):
+    """Shape fetch_prods rows (limit + 1 fetched) into the listing response payload."""
+    # SQLAlchemy Row -> mapping of selected columns
+    items_out = [listing_item(p._mapping) for p in rows[:limit]]
+    return listing_page_payload(items_out, len(rows) > limit)
+
+
+async def listing_page(cursor_vals, limit: int, q=None, category=None) -> CachedBody:
+    """
+    One GET /products page. Served from the shared listing index (zset + per-product fragments) ,while
+    that is not built yet or redis is down it falls back to the per-page cache (+ next page prefetch).
+    """
+    if cache_settings.LISTING_INDEX_ENABLED:
+        body = await listing_index.page_body(cursor_vals, limit, listing_page_payload)
+        if body is not None:
+            return body
+
+    catalog_version = await get_catalog_version()
+    key_suffix = make_params_key(limit, listing_cursor_key(cursor_vals), q, category, catalog_version=catalog_version)
+    # page 2+ are usually requested right after ,warm the next key in background (budgeted per worker).
+    # only when the page came from redis / the db ,an L1 hit already scheduled it when it was filled
+    return await cache_get_or_set_product_listings(
+        "products_listing", key_suffix, PRODUCT_LIST_TTL, listing_page_loader(cursor_vals, limit),
+        mode="stale", stale_window=PRODUCT_LIST_STALE_WINDOW,
+        on_fetched=lambda body: prefetch_next_listing_page(body, limit, q, category, catalog_version))
+
+async def listing_not_modified(request, cursor_vals, limit: int, q=None, category=None):
+    """
+    304 for a matching If-None-Match from the page's cached digest alone (index page in L1 ,else the per-page
+    entry's L1 copy / envelope header) ,before listing_page builds or fetches the body. None => serve the page.
+    """
+    if not request.headers.get("if-none-match"):
+        return None
+    if cache_settings.LISTING_INDEX_ENABLED and listing_index.started:
+        not_modified = await cached_not_modified(request, listing_index.page_key(cursor_vals, limit), l1_only=True)
+        if not_modified is not None:
+            return not_modified
+    catalog_version = await get_catalog_version()
+    key_suffix = make_params_key(limit, listing_cursor_key(cursor_vals), q, category, catalog_version=catalog_version)
+    return await cached_not_modified(request, listing_cache_key("products_listing", key_suffix))
+
+async def load_listing_index_entries():
+    async with async_session() as session:
+        return await fetch_listing_index_entries(session)
+
+async def load_listing_items(product_ids: list) -> dict:
+    """Listing index fragments for product_ids ,{id: ListingEntry} for the live ones."""
+    async with async_session() as session:
+        rows = await fetch_listing_rows_by_ids(session, product_ids)
+    entries = {}
+    for row in rows:
+        m = row._mapping
+        entries[m["id"]] = ListingEntry(listing_item(m), m["created_at"], detail_version(m["updated_at"]))
+    return entries
+
 
+def listing_page_loader(cursor_vals, limit):
+    """
+    Cache loader for one listing page ,opens its own session since in stale mode / prefetch it runs after
+    the request that scheduled it has finished.
+    """
+    async def loader():
+        async with async_session() as session:
+            rows = await fetch_prods(session, cursor_vals, limit)
+        return build_listing_page(rows, limit)
+    return loader
 
+def next_listing_cursor_vals(body: CachedBody):
+    """Decoded cursor of the page after `body` (same values decode_cursor gives for its next_cursor) ,None on the last page."""
+    if b'"has_more":true' not in body.identity:
+        return None
+    items = orjson.loads(body.identity)["data"]["items"]
+    if not items:
+        return None
+    last = items[-1]
+    return (datetime.fromisoformat(last["created_at"]), int(last["id"]))
 
+def prefetch_next_listing_page(body: CachedBody, limit: int, q, category, catalog_version: int) -> bool:
+    """Clients almost always follow next_cursor right away ,fill that page's key before they ask."""
+    cursor_vals = next_listing_cursor_vals(body)
+    if cursor_vals is None:
+        return False
+    key_suffix = make_params_key(limit, listing_cursor_key(cursor_vals), q, category, catalog_version=catalog_version)
+    return prefetch_listing("products_listing", key_suffix, PRODUCT_LIST_TTL, listing_page_loader(cursor_vals, limit),
+                            stale_window=PRODUCT_LIST_STALE_WINDOW)
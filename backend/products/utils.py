@@ -66,10 +66,13 @@ def encode_cursor(last_cursor: datetime, last_cursor_id: str, ttl_seconds: int =
 
 
 
-def make_params_key(limit: int, cursor_token: Optional[str], q: Optional[str] = None, category: Optional[str] = None) -> str:
+def make_params_key(limit: int, cursor_token: Optional[str], q: Optional[str] = None, category: Optional[str] = None,
+                    catalog_version: Optional[int] = None) -> str:
     # Keep suffix stable and deterministic. We include cursor token directly (it's opaque).
     # If cursor is a long token, may hash it to keep key short
-    parts = [f"limit={limit}"]
+    # catalog version goes first so a bump moves every page to fresh keys (old ones just expire)
+    parts = [] if catalog_version is None else [f"v={catalog_version}"]
+    parts.append(f"limit={limit}")
     parts.append(f"cursor={cursor_token or ''}")
     if q:
         parts.append(f"q={q}")
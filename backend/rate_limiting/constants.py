@@ -1,6 +1,5 @@
 
-import asyncio
-from typing import Optional
+from backend.common.logging_setup import get_logger
 
 
 DEFAULT_LIMIT = 5         # default requests
@@ -9,10 +8,17 @@ RATE_LIMIT_PREFIX = "rl"    # redis key prefix
 REDIS_TIMEOUT_SECONDS = 0.5
 FAIL_OPEN = True                  # if redis is unavailable, allow requests (True) or deny (False)
 USE_IN_MEMORY_FALLBACK = True     # allow simple local fallback when redis fails (not distributed)
+IN_MEMORY_FALLBACK_MAX_KEYS = 200_000   # per worker ,windows closest to their reset are dropped beyond this
+# fallback counters shared by every worker on the host (mmap'd file) ,per worker counters if it can't be opened
+SHARED_MEMORY_FALLBACK = True
+SHARED_FALLBACK_PATH = "/dev/shm/chlorophyll_rate_limit"
+SHARED_FALLBACK_SLOTS = 1 << 19         # 24 bytes each ,~12 MB
+SHARED_FALLBACK_BUCKET_SLOTS = 8        # slots scanned + locked per call
 
-_script_sha: Optional[str] = None
-_asyncio_lock = asyncio.Lock()
+# fixed window quota leasing (opt-in per route ,0 = off): tokens a worker claims from the redis counter at once.
+# a window may end with up to lease size x workers tokens claimed but unspent ,never over-admits.
+DEFAULT_LEASE_SIZE = 0
+LEASE_MAX_KEYS = 10_000           # per worker ,least recently used leases are dropped beyond this
 
 
-_in_memory_counters = {}
-_in_memory_lock = asyncio.Lock()
\ No newline at end of file
+logger = get_logger("chlorophyll.rate_limiting")
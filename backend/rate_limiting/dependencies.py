@@ -2,23 +2,32 @@
 import time
 from typing import Optional
 from fastapi import HTTPException, Request,status
-from backend.rate_limiting.constants import RATE_LIMIT_PREFIX
+from backend.rate_limiting.constants import DEFAULT_LEASE_SIZE, RATE_LIMIT_PREFIX
 from backend.rate_limiting.rate_limit_fixed_window import redis_allow
+from backend.rate_limiting.rate_limit_leaky_bucket import redis_allow_gcra
+from backend.rate_limiting.rate_limit_lease import redis_allow_leased
+from backend.rate_limiting.rate_limit_sliding_counter import redis_allow_sliding_counter
 from backend.rate_limiting.rate_limit_sliding_window import redis_allow_sliding
 from backend.rate_limiting.utils import _identifier_from_request
 
 
-def rate_limit_dependency(limit=10, window=60, route_key: Optional[str] = None):
+def rate_limit_dependency(limit=10, window=60, route_key: Optional[str] = None, lease_size: int = DEFAULT_LEASE_SIZE):
+    # lease_size > 1: fixed window tokens are claimed from redis in batches of that size (see rate_limit_lease)
     async def _dep(request: Request):
-        if route_key is None:
-            route_key = request.url.path
+        path_key = route_key if route_key is not None else request.url.path
         rate_lim_style = getattr(request.app.state, "rate_limit_strategy", "fixed_window")
 
         identifier, scope = _identifier_from_request(request)
-        key = f"{RATE_LIMIT_PREFIX}:{scope}:{identifier}:{route_key}"
+        key = f"{RATE_LIMIT_PREFIX}:{scope}:{identifier}:{path_key}"
         if rate_lim_style == "sliding_window":
             allowed, remaining, reset = await redis_allow_sliding(key, limit, window)
-        elif rate_lim_style == "fixed_window":
+        elif rate_lim_style == "sliding_window_counter":
+            allowed, remaining, reset = await redis_allow_sliding_counter(key, limit, window)
+        elif rate_lim_style == "leaky_bucket":
+            allowed, remaining, reset = await redis_allow_gcra(key, limit, window)
+        elif lease_size > 1:
+            allowed, remaining, reset = await redis_allow_leased(key, limit, window, lease_size)
+        else:
             allowed, remaining, reset = await redis_allow(key, limit, window)
         request.state.rate_limit = {"limit": limit, "remaining": remaining, "reset": reset}
         if not allowed:
@@ -1,4 +1,5 @@
 
+import hashlib
 
 
 LUA_SLIDING_WINDOW = """
@@ -9,7 +10,7 @@ local now_ms = tonumber(ARGV[3])
 local member = ARGV[4]
 
 -- remove old entries (score <= now_ms - window_ms)
-oldest_timestamp = now_ms - window_ms
+local min_score = now_ms - window_ms
 redis.call("ZREMRANGEBYSCORE", key, 0, min_score)
 
 -- current number of events in window
@@ -56,4 +57,98 @@ else
 end
 local ttl = redis.call("PTTL", KEYS[1])
 return {counter, ttl}
-"""
\ No newline at end of file
+"""
+
+
+# GCRA (leaky bucket as a meter): one integer per key ,the theoretical arrival time (tat) of the next
+# request in ms. emission interval T = window / limit ,a burst of up to `limit` is allowed (tolerance = window - T).
+# redis' own clock is used so workers with skewed clocks agree.
+# KEYS[1] key ,ARGV[1] emission interval ms ,ARGV[2] window ms
+# returns {allowed, remaining, reset_ms} ,reset_ms: until the bucket is empty (allowed) / until the next
+# request would be allowed (denied)
+LUA_GCRA = """
+local emission = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local tat = tonumber(redis.call("GET", KEYS[1]) or "0")
+if tat < now then
+  tat = now
+end
+local new_tat = tat + emission
+
+if new_tat - now > window then
+  return {0, 0, tat + emission - window - now}
+end
+
+redis.call("SET", KEYS[1], string.format("%d", new_tat), "PX", string.format("%d", new_tat - now))
+return {1, math.floor((window - (new_tat - now)) / emission), new_tat - now}
+"""
+
+# sliding window counter: two fixed window counters (current + previous) ,the previous one weighted by how
+# much of it still overlaps the sliding window. two integer keys per identity whatever the limit.
+# KEYS[1] current window counter ,KEYS[2] previous window counter
+# ARGV[1] limit ,ARGV[2] window ms ,ARGV[3] ms elapsed in the current window
+# returns {allowed, remaining, reset_ms} ,reset_ms: until the current window ends (allowed) / until one more
+# request fits the estimate (denied)
+LUA_SLIDING_WINDOW_COUNTER = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local cur = tonumber(redis.call("GET", KEYS[1]) or "0")
+local prev = tonumber(redis.call("GET", KEYS[2]) or "0")
+local weight = (window - elapsed) / window
+
+if prev * weight + cur + 1 > limit then
+  local wait
+  if cur + 1 <= limit and prev > 0 then
+    -- previous window has to slide out until prev * weight <= limit - cur - 1
+    wait = math.ceil(window * (1 - (limit - cur - 1) / prev)) - elapsed
+  else
+    -- current window alone is full ,it becomes the previous one at the boundary
+    wait = (window - elapsed) + math.ceil(window * (1 - (limit - 1) / math.max(cur, 1)))
+  end
+  return {0, 0, math.max(wait, 0)}
+end
+
+cur = redis.call("INCR", KEYS[1])
+if cur == 1 then
+  -- kept for one more window where it is the previous counter
+  redis.call("PEXPIRE", KEYS[1], window * 2)
+end
+return {1, math.max(math.floor(limit - (prev * weight + cur)), 0), window - elapsed}
+"""
+
+# fixed window lease: claim up to ARGV[3] tokens of the same counter LUA_FIXED_WINDOW_INCR_AND_PEXPIRE uses ,
+# the worker then spends them locally. tokens are only handed out while the counter is below the limit.
+# KEYS[1] counter ,ARGV[1] window ms ,ARGV[2] limit ,ARGV[3] tokens wanted
+# returns {granted, counter, ttl_ms} ,granted 0 => the window is used up
+LUA_FIXED_WINDOW_LEASE = """
+local limit = tonumber(ARGV[2])
+local current = tonumber(redis.call("GET", KEYS[1]) or "0")
+local grant = math.min(tonumber(ARGV[3]), limit - current)
+if grant <= 0 then
+  return {0, current, redis.call("PTTL", KEYS[1])}
+end
+local counter = redis.call("INCRBY", KEYS[1], grant)
+local ttl = redis.call("PTTL", KEYS[1])
+if ttl < 0 then
+  redis.call("PEXPIRE", KEYS[1], ARGV[1])
+  ttl = tonumber(ARGV[1])
+end
+return {grant, counter, ttl}
+"""
+
+# every limiter script by name ,called by sha (see rate_limiting.utils.eval_rate_limit_script)
+RATE_LIMIT_SCRIPTS = {
+    "fixed_window": LUA_FIXED_WINDOW_INCR_AND_PEXPIRE,
+    "fixed_window_lease": LUA_FIXED_WINDOW_LEASE,
+    "sliding_window": LUA_SLIDING_WINDOW,
+    "leaky_bucket": LUA_GCRA,
+    "sliding_window_counter": LUA_SLIDING_WINDOW_COUNTER,
+}
+
+# redis identifies scripts by the sha1 of their source ,computed here so no call ever waits on SCRIPT LOAD
+# and each strategy always runs its own script
+RATE_LIMIT_SCRIPT_SHAS = {name: hashlib.sha1(src.encode()).hexdigest() for name, src in RATE_LIMIT_SCRIPTS.items()}
@@ -0,0 +1,140 @@
+from functools import partial
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+from backend.rate_limiting.constants import DEFAULT_LEASE_SIZE, DEFAULT_LIMIT, DEFAULT_WINDOW
+from backend.rate_limiting.rate_limit_fixed_window import redis_allow
+from backend.rate_limiting.rate_limit_leaky_bucket import redis_allow_gcra
+from backend.rate_limiting.rate_limit_lease import redis_allow_leased
+from backend.rate_limiting.rate_limit_sliding_counter import redis_allow_sliding_counter
+from backend.rate_limiting.rate_limit_sliding_window import redis_allow_sliding
+
+# strategy name (app.state.rate_limit_strategy) -> allow(key, limit, window) -> (allowed, remaining, reset_ts)
+RATE_LIMIT_STRATEGIES: Dict[str, Callable[..., Awaitable]] = {
+    "fixed_window": redis_allow,
+    "sliding_window": redis_allow_sliding,
+    "sliding_window_counter": redis_allow_sliding_counter,
+    "leaky_bucket": redis_allow_gcra,
+}
+
+# key scopes: "client" = user id when authenticated else ip ,"ip" = ip only ,"route" = one bucket for everyone
+KEY_SCOPES = ("client", "ip", "route")
+UNMATCHED_TEMPLATE = "<unmatched>"     # every path no route serves (404s) shares one bucket per client
+
+
+class RateLimitPolicy(NamedTuple):
+    limit: int = DEFAULT_LIMIT
+    window: int = DEFAULT_WINDOW
+    strategy: Optional[str] = None       # None = the app wide strategy
+    scope: str = "client"
+    lease_size: int = DEFAULT_LEASE_SIZE  # fixed window only ,see rate_limit_lease
+
+
+class CompiledPolicy(NamedTuple):
+    """A policy bound to its route template ,with everything the per request path needs resolved up front."""
+    template: str
+    limit: int
+    window: int
+    scope: str
+    allow: Callable[..., Awaitable]
+    limit_header: bytes
+
+
+def compile_policy(template: str, policy: RateLimitPolicy, default_strategy: str) -> CompiledPolicy:
+    if policy.scope not in KEY_SCOPES:
+        raise ValueError("unknown rate limit key scope %r for %s" % (policy.scope, template))
+    strategy = policy.strategy or default_strategy
+    if strategy not in RATE_LIMIT_STRATEGIES:
+        raise ValueError("unknown rate limit strategy %r for %s" % (strategy, template))
+    allow = RATE_LIMIT_STRATEGIES[strategy]
+    if strategy == "fixed_window" and policy.lease_size > 1:
+        allow = partial(redis_allow_leased, lease_size=policy.lease_size)
+    return CompiledPolicy(template, policy.limit, policy.window, policy.scope, allow, str(policy.limit).encode())
+
+
+_MISS = object()
+
+
+class _Node:
+    __slots__ = ("literal", "param", "rest", "policy")
+
+    def __init__(self):
+        self.literal: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None    # {name} segment
+        self.rest = _MISS                       # {name:path} ,matches whatever is left
+        self.policy = _MISS                     # CompiledPolicy ,None = exempt
+
+
+def _segments(path: str) -> List[str]:
+    return [s for s in path.split("/") if s]
+
+
+class PolicyTable:
+    """
+    Route template -> policy ,resolved per request through a segment trie: literal segments first ,then a
+    {param} segment ,then a {rest:path} tail ,so /products/featured wins over /products/{product_id}.
+    Requests are keyed by the template they resolve to ,every /products/<id> shares one bucket per client.
+    """
+    def __init__(self, unmatched: Optional[CompiledPolicy]):
+        self._root = _Node()
+        self.unmatched = unmatched
+
+    @classmethod
+    def compile(cls, templates: Iterable[str], policies: Dict[str, Optional[RateLimitPolicy]],
+                default: Optional[RateLimitPolicy], default_strategy: str) -> "PolicyTable":
+        """
+        `policies` maps a route template (or a "/prefix/*" covering every route under it) to its policy ,
+        None exempts. Routes without one get `default` (None = not limited).
+        """
+        prefixes = sorted((p[:-1] for p in policies if p.endswith("/*")), key=len, reverse=True)
+
+        def policy_for(template: str):
+            if template in policies:
+                return policies[template]
+            for prefix in prefixes:
+                if template.startswith(prefix):
+                    return policies[prefix + "*"]
+            return default
+
+        compiled = {}
+        def compiled_for(template: str, policy: Optional[RateLimitPolicy]):
+            if policy is None:
+                return None
+            # routes sharing one policy object still get their own template (their own bucket)
+            if (template, policy) not in compiled:
+                compiled[(template, policy)] = compile_policy(template, policy, default_strategy)
+            return compiled[(template, policy)]
+
+        table = cls(compiled_for(UNMATCHED_TEMPLATE, default))
+        for template in templates:
+            table.insert(template, compiled_for(template, policy_for(template)))
+        return table
+
+    def insert(self, template: str, policy: Optional[CompiledPolicy]):
+        node = self._root
+        for segment in _segments(template):
+            if segment.startswith("{") and segment.endswith(":path}"):
+                node.rest = policy
+                return
+            if "{" in segment:
+                node.param = node.param or _Node()
+                node = node.param
+            else:
+                node = node.literal.setdefault(segment, _Node())
+        node.policy = policy
+
+    def resolve(self, path: str) -> Optional[CompiledPolicy]:
+        found = self._match(self._root, _segments(path), 0)
+        return self.unmatched if found is _MISS else found
+
+    def _match(self, node: _Node, segments: List[str], i: int):
+        if i == len(segments):
+            return node.policy if node.policy is not _MISS else node.rest
+        child = node.literal.get(segments[i])
+        if child is not None:
+            found = self._match(child, segments, i + 1)
+            if found is not _MISS:
+                return found
+        if node.param is not None:
+            found = self._match(node.param, segments, i + 1)
+            if found is not _MISS:
+                return found
+        return node.rest
@@ -1,28 +1,27 @@
 
+import asyncio
 import time
 from typing import Optional
 from fastapi import HTTPException, Request , status
-from backend.rate_limiting.constants import DEFAULT_LIMIT, DEFAULT_WINDOW, FAIL_OPEN, RATE_LIMIT_PREFIX, REDIS_TIMEOUT_SECONDS, USE_IN_MEMORY_FALLBACK
-from backend.cache._cache import redis_client
-from backend.rate_limiting.utils import LUA_FIXED_WINDOW_INCR_AND_PEXPIRE, LUA_SLIDING_WINDOW, _ensure_lua_loaded, _identifier_from_request, _in_memory_allow
-from backend.rate_limiting.constants import _in_memory_counters,_in_memory_lock
+from backend.rate_limiting.constants import DEFAULT_LIMIT, DEFAULT_WINDOW, RATE_LIMIT_PREFIX, REDIS_TIMEOUT_SECONDS
+from backend.cache._cache import redis_circuit
+from backend.rate_limiting.utils import _identifier_from_request, _redis_unavailable_fallback, eval_rate_limit_script
 
     
 async def redis_allow(key: str, limit: int, window: int ):
     """
     Returns (allowed: bool, remaining: int, reset_ts: int)
     """
-    rc = redis_client
-    pexpire_ms = int(window * 1000)
-    sha = await _ensure_lua_loaded("fixed_window")
+    # circuit open: local fallback right away ,no socket wait per request
+    if redis_circuit.is_open:
+        return await _redis_unavailable_fallback(key, limit, window)
 
-    print("Using Fixed Window Rate Limiting Strategy")
+    pexpire_ms = int(window * 1000)
 
     try:
-        if sha:
-            res = await rc.evalsha(sha, 1, key, pexpire_ms)
-        else:
-            res = await rc.eval(LUA_FIXED_WINDOW_INCR_AND_PEXPIRE, 1, key, pexpire_ms)
+        # rate limiting gets a tighter deadline than the client wide socket timeout
+        res = await asyncio.wait_for(eval_rate_limit_script("fixed_window", 1, key, pexpire_ms),
+                                     timeout=REDIS_TIMEOUT_SECONDS)
        
         if not res or len(res) < 2 :
             # conservative fallback: allow
@@ -30,39 +29,18 @@ async def redis_allow(key: str, limit: int, window: int ):
             return True, max(0, limit - 1), now + window
         count = int(res[0])
         ttl_ms = int(res[1])
-        print("Fixed Window Rate Limiting - count:",count," ttl_ms:",ttl_ms)
          # reset timestamp in unix seconds
         now = int(time.time())
         reset_ts = now + (ttl_ms // 1000) if ttl_ms > 0 else now + window
         allowed = count <= limit
         remaining = max(0, limit - count) if allowed else 0
         return allowed, remaining, reset_ts
+    except asyncio.TimeoutError:
+        # cancelled by our own deadline ,the client never saw a transport error so count it here
+        redis_circuit.record_failure()
+        return await _redis_unavailable_fallback(key, limit, window)
     except Exception as e:
         print("Redis rate limiting error:", str(e))
 
-        # Redis operation failed (timeout, network, auth)
-        if USE_IN_MEMORY_FALLBACK:
-            try:
-                return await _in_memory_allow(key, limit, window)
-            except Exception:
-                pass
-        # if fallback not usable, obey FAIL_OPEN policy
-        if FAIL_OPEN:
-            now = int(time.time())
-            return True, max(0, limit - 1), now + window
-        else:
-            # fail-closed: deny
-            now = int(time.time())
-            return False, 0, now + window
-
-
-
-
-
-
-
-
-
-
-
-
+        # Redis operation failed (timeout, network, auth) or circuit open
+        return await _redis_unavailable_fallback(key, limit, window)
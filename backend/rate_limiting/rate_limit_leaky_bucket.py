@@ -0,0 +1,35 @@
+
+import asyncio
+import math
+import time
+from backend.rate_limiting.constants import REDIS_TIMEOUT_SECONDS
+from backend.cache._cache import redis_circuit
+from backend.rate_limiting.utils import _redis_unavailable_fallback, eval_rate_limit_script
+
+
+async def redis_allow_gcra(key: str, limit: int, window_seconds: int):
+    """
+    Leaky bucket via GCRA: `limit` requests per `window_seconds` at a steady rate ,bursts up to `limit`.
+    One timestamp per key (vs one zset member per request for the sliding window).
+    Returns (allowed: bool, remaining: int, reset_ts: int)
+    """
+    if redis_circuit.is_open:
+        return await _redis_unavailable_fallback(key, limit, window_seconds)
+
+    window_ms = int(window_seconds * 1000)
+    emission_ms = max(1, window_ms // max(1, limit))
+    try:
+        res = await asyncio.wait_for(eval_rate_limit_script("leaky_bucket", 1, key, emission_ms, window_ms),
+                                     timeout=REDIS_TIMEOUT_SECONDS)
+        if not res or len(res) < 3:
+            # conservative fallback: allow
+            return True, max(0, limit - 1), int(time.time()) + window_seconds
+        allowed = int(res[0]) == 1
+        remaining = max(0, int(res[1]))
+        reset_ts = int(time.time()) + math.ceil(max(0, int(res[2])) / 1000.0)
+        return allowed, remaining, reset_ts
+    except asyncio.TimeoutError:
+        redis_circuit.record_failure()
+        return await _redis_unavailable_fallback(key, limit, window_seconds)
+    except Exception:
+        return await _redis_unavailable_fallback(key, limit, window_seconds)
@@ -0,0 +1,112 @@
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from backend.rate_limiting.constants import LEASE_MAX_KEYS, REDIS_TIMEOUT_SECONDS
+from backend.cache._cache import redis_circuit
+from backend.cache.singleflight import SingleFlight
+from backend.rate_limiting.rate_limit_fixed_window import redis_allow
+from backend.rate_limiting.utils import _redis_unavailable_fallback, eval_rate_limit_script
+
+
+class _Lease:
+    """Tokens this worker claimed from one fixed window counter ,valid until that window ends."""
+    __slots__ = ("tokens", "unclaimed", "expires_at", "reset_ts")
+
+    def __init__(self, tokens: int, unclaimed: int, expires_at: float, reset_ts: int):
+        self.tokens = tokens            # left to spend locally ,0 with the window used up = denied until reset
+        self.unclaimed = unclaimed      # limit - counter at claim time ,for the remaining header
+        self.expires_at = expires_at    # monotonic
+        self.reset_ts = reset_ts        # unix seconds
+
+
+# per worker ,touched only from the event loop so check + spend needs no lock
+_leases: "OrderedDict[str, _Lease]" = OrderedDict()
+# one claim round trip per key at a time ,concurrent requests that find the lease empty wait for it
+_lease_claims = SingleFlight()
+_MAX_CLAIMS_PER_REQUEST = 3
+_UNAVAILABLE = object()
+
+
+def _spend(key: str):
+    """(allowed, remaining, reset_ts) from the local lease ,None when there is no usable lease."""
+    lease = _leases.get(key)
+    if lease is None:
+        return None
+    if lease.expires_at <= time.monotonic():
+        del _leases[key]
+        return None
+    _leases.move_to_end(key)
+    if lease.tokens > 0:
+        lease.tokens -= 1
+        return True, lease.unclaimed + lease.tokens, lease.reset_ts
+    if lease.unclaimed <= 0:
+        # the window is used up in redis ,nothing to ask for until it resets
+        return False, 0, lease.reset_ts
+    return None
+
+def _remember(key: str, lease: _Lease):
+    _leases[key] = lease
+    _leases.move_to_end(key)
+    while len(_leases) > LEASE_MAX_KEYS:
+        _leases.popitem(last=False)
+
+
+async def _claim(key: str, limit: int, window: int, lease_size: int):
+    """
+    Claim up to lease_size tokens. None when the lease was refilled ,(False, 0, reset_ts) when the window is
+    used up ,_UNAVAILABLE when redis is not there (every waiter then takes the fallback for its own request).
+    """
+    if redis_circuit.is_open:
+        return _UNAVAILABLE
+
+    window_ms = int(window * 1000)
+    try:
+        res = await asyncio.wait_for(eval_rate_limit_script("fixed_window_lease", 1, key, window_ms, limit, lease_size),
+                                     timeout=REDIS_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        redis_circuit.record_failure()
+        return _UNAVAILABLE
+    except Exception:
+        return _UNAVAILABLE
+    if not res or len(res) < 3:
+        # conservative fallback: allow
+        return True, max(0, limit - 1), int(time.time()) + window
+
+    granted, counter, ttl_ms = int(res[0]), int(res[1]), int(res[2])
+    ttl_ms = ttl_ms if ttl_ms > 0 else window_ms
+    reset_ts = int(time.time()) + math.ceil(ttl_ms / 1000.0)
+    # granted 0 is remembered too: every request until the reset is denied without a round trip
+    _remember(key, _Lease(granted, max(0, limit - counter), time.monotonic() + ttl_ms / 1000.0, reset_ts))
+    if granted <= 0:
+        return False, 0, reset_ts
+    return None
+
+
+async def redis_allow_leased(key: str, limit: int, window: int, lease_size: int):
+    """
+    Fixed window with local quota leasing: the worker claims `lease_size` tokens from the same redis counter
+    redis_allow uses and spends them in process ,one round trip per lease instead of per request.
+    Never admits more than `limit` per window ,but up to lease_size x workers claimed tokens may go unspent
+    (other workers are denied early by that much). Leases end with their window.
+    Returns (allowed: bool, remaining: int, reset_ts: int)
+    """
+    lease_size = min(lease_size, limit)
+    if lease_size <= 1:
+        return await redis_allow(key, limit, window)
+
+    spent = _spend(key)
+    for _ in range(_MAX_CLAIMS_PER_REQUEST):
+        if spent is not None:
+            return spent
+        res = await _lease_claims.do(key, lambda: _claim(key, limit, window, lease_size))
+        if res is _UNAVAILABLE:
+            return await _redis_unavailable_fallback(key, limit, window)
+        if res is not None:
+            return res
+        spent = _spend(key)
+    if spent is not None:
+        return spent
+    # more concurrent requests than each fresh lease covered ,take a single token the plain way
+    return await redis_allow(key, limit, window)
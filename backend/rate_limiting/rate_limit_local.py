@@ -0,0 +1,76 @@
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class LocalFixedWindow:
+    """
+    Per-process fixed window counters for when redis is unavailable (not distributed).
+
+    Bounded: at most `max_keys` windows are tracked ,when full the window closest to its reset is dropped
+    (it loses the fewest requests). Expired windows are swept from a bucketed expiry queue: keys are filed
+    under the second their window ends and every call pops the buckets that are due ,so cleanup is
+    amortized over calls and never scans the whole table.
+    allow() doesn't await ,so on the event loop it needs no lock.
+    """
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._windows: Dict[str, Tuple[int, int]] = {}    # key -> (count, expires_at)
+        self._buckets: Dict[int, List[str]] = {}          # expires_at -> keys whose window ends then
+        self._due: List[int] = []                         # heap of bucket seconds
+
+    def __len__(self):
+        return len(self._windows)
+
+    def allow(self, key: str, limit: int, window: int, now: Optional[int] = None):
+        """(allowed, remaining, reset_ts) ,same semantics as the redis fixed window."""
+        now = int(time.time()) if now is None else now
+        self._sweep(now)
+        existing = self._windows.get(key)
+        if existing is None or existing[1] <= now:
+            if existing is None and len(self._windows) >= self.max_keys:
+                self._evict_one()
+            expires_at = now + window
+            self._windows[key] = (1, expires_at)
+            self._file(key, expires_at)
+            return True, max(0, limit - 1), expires_at
+
+        count, expires_at = existing
+        if count >= limit:
+            return False, 0, expires_at
+        self._windows[key] = (count + 1, expires_at)
+        return True, max(0, limit - count - 1), expires_at
+
+    def clear(self):
+        self._windows.clear()
+        self._buckets.clear()
+        self._due.clear()
+
+    def _file(self, key: str, expires_at: int):
+        bucket = self._buckets.get(expires_at)
+        if bucket is None:
+            bucket = self._buckets[expires_at] = []
+            heapq.heappush(self._due, expires_at)
+        bucket.append(key)
+
+    def _sweep(self, now: int):
+        while self._due and self._due[0] <= now:
+            second = heapq.heappop(self._due)
+            for key in self._buckets.pop(second, ()):
+                # the key may have been evicted or started a new window (filed under a later second) since
+                entry = self._windows.get(key)
+                if entry is not None and entry[1] == second:
+                    del self._windows[key]
+
+    def _evict_one(self):
+        while self._due:
+            second = self._due[0]
+            bucket = self._buckets[second]
+            while bucket:
+                key = bucket.pop()
+                entry = self._windows.get(key)
+                if entry is not None and entry[1] == second:
+                    del self._windows[key]
+                    return
+            heapq.heappop(self._due)
+            del self._buckets[second]
@@ -0,0 +1,108 @@
+import hashlib
+import mmap
+import os
+import struct
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:     # not posix ,only the per-process fallback is available
+    fcntl = None
+
+# [magic:8][buckets:4][slots per bucket:4] padded to 64 bytes ,then buckets of fixed size slots
+_MAGIC = b"PHYLRL01"
+_HEADER = struct.Struct("<8sII")
+_HEADER_BYTES = 64
+# slot: key hash (0 = never used) ,window end (unix seconds) ,count
+_SLOT = struct.Struct("<QqI4x")
+
+
+def _key_hash(key: str) -> int:
+    # hash() is salted per process ,every worker has to land on the same slot
+    h = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+    return h or 1
+
+
+class SharedFixedWindow:
+    """
+    Fixed window counters in a memory mapped file (/dev/shm) shared by every worker on the host ,so while
+    redis is down the limit holds per host instead of per worker.
+
+    Open addressing over fixed size buckets: a key hashes to one bucket and only that bucket is scanned and
+    locked (fcntl byte range lock on its slots) ,so reclaiming is bounded by the bucket size: a slot whose
+    window has ended is reused ,and a full bucket gives up the window closest to its reset.
+    The lock is per process (posix record lock) ,allow() doesn't await so the event loop never interleaves it.
+    """
+    def __init__(self, path: str, slots: int, bucket_slots: int):
+        self.path = path
+        self.bucket_slots = bucket_slots
+        self.buckets = max(1, slots // bucket_slots)
+        self._fd: Optional[int] = None
+        self._mm: Optional[mmap.mmap] = None
+
+    def open(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # first worker lays out the table ,later ones adopt its dimensions
+            fcntl.lockf(fd, fcntl.LOCK_EX, _HEADER_BYTES, 0)
+            try:
+                header = os.pread(fd, _HEADER.size, 0)
+                if len(header) == _HEADER.size and header[:8] == _MAGIC:
+                    _, self.buckets, self.bucket_slots = _HEADER.unpack(header)
+                else:
+                    os.ftruncate(fd, _HEADER_BYTES + self.buckets * self.bucket_slots * _SLOT.size)
+                    os.pwrite(fd, _HEADER.pack(_MAGIC, self.buckets, self.bucket_slots), 0)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, _HEADER_BYTES, 0)
+            size = _HEADER_BYTES + self.buckets * self.bucket_slots * _SLOT.size
+            self._mm = mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._bucket_bytes = self.bucket_slots * _SLOT.size
+        self._bucket = struct.Struct("<" + "QqI4x" * self.bucket_slots)
+        return self
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            os.close(self._fd)
+            self._mm = self._fd = None
+
+    def allow(self, key: str, limit: int, window: int, now: Optional[int] = None):
+        """(allowed, remaining, reset_ts) ,same semantics as the redis fixed window."""
+        now = int(time.time()) if now is None else now
+        h = _key_hash(key)
+        offset = _HEADER_BYTES + (h % self.buckets) * self._bucket_bytes
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._bucket_bytes, offset)
+        try:
+            values = self._bucket.unpack_from(self._mm, offset)
+            target, reusable, soonest = None, None, None
+            for i in range(self.bucket_slots):
+                slot_hash, expires_at = values[3 * i], values[3 * i + 1]
+                if slot_hash == h:
+                    target = i
+                    break
+                if expires_at <= now:
+                    if reusable is None:
+                        reusable = i
+                elif soonest is None or expires_at < values[3 * soonest + 1]:
+                    soonest = i
+
+            if target is not None:
+                expires_at, count = values[3 * target + 1], values[3 * target + 2]
+                if expires_at > now:
+                    if count >= limit:
+                        return False, 0, expires_at
+                    _SLOT.pack_into(self._mm, offset + target * _SLOT.size, h, expires_at, count + 1)
+                    return True, max(0, limit - count - 1), expires_at
+            else:
+                target = reusable if reusable is not None else soonest
+
+            expires_at = now + window
+            _SLOT.pack_into(self._mm, offset + target * _SLOT.size, h, expires_at, 1)
+            return True, max(0, limit - 1), expires_at
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._bucket_bytes, offset)
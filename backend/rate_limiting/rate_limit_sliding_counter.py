@@ -0,0 +1,45 @@
+
+import asyncio
+import math
+import time
+from typing import Optional
+from backend.rate_limiting.constants import REDIS_TIMEOUT_SECONDS
+from backend.cache._cache import redis_circuit
+from backend.rate_limiting.utils import _redis_unavailable_fallback, eval_rate_limit_script
+
+
+def sliding_counter_keys(key: str, window_ms: int, now_ms: int):
+    """(current window counter key, previous window counter key, ms elapsed in the current window)"""
+    index = now_ms // window_ms
+    return f"{key}:{index}", f"{key}:{index - 1}", now_ms - index * window_ms
+
+
+async def redis_allow_sliding_counter(key: str, limit: int, window_seconds: int, now_ms: Optional[int] = None):
+    """
+    Sliding window counter: current + previous fixed window counts ,the previous one weighted by its overlap
+    with the sliding window. Two integer keys per identity and one script call ,approximate (assumes requests
+    in the previous window were evenly spread) where the zset log is exact.
+    Returns (allowed: bool, remaining: int, reset_ts: int)
+    """
+    if redis_circuit.is_open:
+        return await _redis_unavailable_fallback(key, limit, window_seconds)
+
+    window_ms = int(window_seconds * 1000)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    cur_key, prev_key, elapsed_ms = sliding_counter_keys(key, window_ms, now_ms)
+    try:
+        res = await asyncio.wait_for(eval_rate_limit_script("sliding_window_counter", 2, cur_key, prev_key,
+                                                            limit, window_ms, elapsed_ms),
+                                     timeout=REDIS_TIMEOUT_SECONDS)
+        if not res or len(res) < 3:
+            # conservative fallback: allow
+            return True, max(0, limit - 1), now_ms // 1000 + window_seconds
+        allowed = int(res[0]) == 1
+        remaining = max(0, int(res[1]))
+        reset_ts = now_ms // 1000 + math.ceil(max(0, int(res[2])) / 1000.0)
+        return allowed, remaining, reset_ts
+    except asyncio.TimeoutError:
+        redis_circuit.record_failure()
+        return await _redis_unavailable_fallback(key, limit, window_seconds)
+    except Exception:
+        return await _redis_unavailable_fallback(key, limit, window_seconds)
@@ -1,29 +1,28 @@
 
+import asyncio
 import math
 import time
 import uuid
-from backend.rate_limiting.constants import FAIL_OPEN, USE_IN_MEMORY_FALLBACK
-from backend.cache._cache import redis_client
-from backend.rate_limiting.lua_scripts import LUA_SLIDING_WINDOW
-from backend.rate_limiting.utils import _ensure_lua_loaded, _in_memory_allow
+from backend.rate_limiting.constants import REDIS_TIMEOUT_SECONDS
+from backend.cache._cache import redis_circuit
+from backend.rate_limiting.utils import _redis_unavailable_fallback, eval_rate_limit_script
 
 
 async def redis_allow_sliding(key: str, limit: int, window_seconds: int):
     """
     Sliding window: returns (allowed: bool, remaining: int, reset_ts: int)
     """
-    rc = redis_client
+    if redis_circuit.is_open:
+        return await _redis_unavailable_fallback(key, limit, window_seconds)
+
     window_ms = int(window_seconds * 1000)
     now_ms = int(time.time() * 1000)
     # unique member for zadd: use timestamp + random UUID fragment
     member = f"{now_ms}-{uuid.uuid4().hex[:8]}"
 
-    sha = await _ensure_lua_loaded("sliding_window")
     try:
-        if sha:
-            res = await rc.evalsha(sha, 1, key, window_ms, limit, now_ms, member)
-        else:
-            res = await rc.eval(LUA_SLIDING_WINDOW, 1, key, window_ms, limit, now_ms, member)
+        res = await asyncio.wait_for(eval_rate_limit_script("sliding_window", 1, key, window_ms, limit, now_ms, member),
+                                     timeout=REDIS_TIMEOUT_SECONDS)
       
         if not res or len(res) < 3:
             # conservative fallback: allow
@@ -40,13 +39,9 @@ async def redis_allow_sliding(key: str, limit: int, window_seconds: int):
         retry_after_secs = math.ceil(reset_ms / 1000.0) if reset_ms >= 0 else window_seconds
         reset_ts = int(time.time()) + retry_after_secs
         return allowed, remaining, reset_ts
+    except asyncio.TimeoutError:
+        redis_circuit.record_failure()
+        return await _redis_unavailable_fallback(key, limit, window_seconds)
     except Exception:
         # fallback: use in-memory or fail-open policy
-        if USE_IN_MEMORY_FALLBACK:
-            return await _in_memory_allow(key, limit, window_seconds)
-        if FAIL_OPEN:
-            now = int(time.time())
-            return True, max(0, limit - 1), now + window_seconds
-        else:
-            now = int(time.time())
-            return False, 0, now + window_seconds
\ No newline at end of file
+        return await _redis_unavailable_fallback(key, limit, window_seconds)
@@ -1,53 +1,65 @@
 
-from time import time
+import asyncio
+import time
 from fastapi import Request
-from backend.rate_limiting.constants import _asyncio_lock,_in_memory_counters,_in_memory_lock,_script_sha
+from redis.exceptions import NoScriptError
+from backend.rate_limiting.constants import (FAIL_OPEN, IN_MEMORY_FALLBACK_MAX_KEYS, SHARED_FALLBACK_BUCKET_SLOTS,
+                                             SHARED_FALLBACK_PATH, SHARED_FALLBACK_SLOTS, SHARED_MEMORY_FALLBACK,
+                                             USE_IN_MEMORY_FALLBACK, logger)
 from backend.cache._cache import redis_client
 
-from backend.rate_limiting.lua_scripts import LUA_FIXED_WINDOW_INCR_AND_PEXPIRE, LUA_SLIDING_WINDOW
+from backend.rate_limiting.lua_scripts import RATE_LIMIT_SCRIPT_SHAS, RATE_LIMIT_SCRIPTS
+from backend.rate_limiting.rate_limit_local import LocalFixedWindow
+from backend.rate_limiting.rate_limit_shared import SharedFixedWindow
 
+# fallback counters ,bounded and swept as windows end
+local_fallback_limiter = LocalFixedWindow(IN_MEMORY_FALLBACK_MAX_KEYS)
+# host wide ones ,opened on the first fallback call (nothing is created while redis is fine)
+_shared_fallback = {"limiter": None, "unavailable": not SHARED_MEMORY_FALLBACK}
 
-async def _ensure_lua_loaded(rate_lim_style: str):
+
+async def preload_rate_limit_scripts():
     """
-    Load the Lua script into Redis script cache and store SHA.
-    Called once lazily.
+    SCRIPT LOAD every limiter script at startup so the first calls don't pay a NOSCRIPT round trip.
+    Best effort ,a redis that is down now gets the scripts through the NOSCRIPT path later.
     """
-    global _script_sha
+    try:
+        shas = await asyncio.gather(*(redis_client.script_load(src) for src in RATE_LIMIT_SCRIPTS.values()))
+    except Exception:
+        logger.warning("rate_limit.scripts.preload_failed")
+        return
+    for name, sha in zip(RATE_LIMIT_SCRIPTS, shas):
+        if sha != RATE_LIMIT_SCRIPT_SHAS[name]:
+            logger.warning("rate_limit.scripts.sha_mismatch", extra={"script": name})
 
-    WHICH_RATE_LIMITING_STRATEGY = None
+async def eval_rate_limit_script(name: str, numkeys: int, *args):
+    """One EVALSHA of the named script ,on NOSCRIPT (redis restart / failover / SCRIPT FLUSH) EVAL runs it
+    and puts it back in the script cache ,so only the first call after a flush pays for the source."""
+    try:
+        return await redis_client.evalsha(RATE_LIMIT_SCRIPT_SHAS[name], numkeys, *args)
+    except NoScriptError:
+        return await redis_client.eval(RATE_LIMIT_SCRIPTS[name], numkeys, *args)
 
-    if rate_lim_style == "sliding_window":
-        WHICH_RATE_LIMITING_STRATEGY = LUA_SLIDING_WINDOW
-    elif rate_lim_style == "fixed_window":
-        WHICH_RATE_LIMITING_STRATEGY = LUA_FIXED_WINDOW_INCR_AND_PEXPIRE
-   
-    if _script_sha:
-        return _script_sha
-    async with _asyncio_lock:
-        if _script_sha:
-            return _script_sha
-        rc=redis_client
-        try:
-            _script_sha = await rc.script_load(WHICH_RATE_LIMITING_STRATEGY)
-            return _script_sha
-        except Exception:
-            # If script_load fails, we'll fallback to EVAL (slower) in calls
-            _script_sha = None
-            return None
-        
 def _identifier_from_request(request: Request):
     """
     authenticated user_id or fallback to ip 
     """
-    user_identifier = getattr(request.state, "user_identifier", None)
-    if user_identifier:
-        return str(user_identifier), "user"
+    return _identifier_from_scope(request.scope)
+
+def _identifier_from_scope(scope, ip_only: bool = False):
+    """same as _identifier_from_request straight from the asgi scope (request.state lives in scope["state"])"""
+    if not ip_only:
+        user_identifier = (scope.get("state") or {}).get("user_identifier")
+        if user_identifier:
+            return str(user_identifier), "user"
     # X-Forwarded-For: trust only when behind proper proxy; adapt as needed
-    xff = request.headers.get("X-Forwarded-For")
-    if xff:
-        client_host = xff.split(",")[0].strip()
+    for name, value in scope.get("headers") or ():
+        if name == b"x-forwarded-for":
+            client_host = value.decode("latin-1").split(",")[0].strip()
+            break
     else:
-        client_host = request.client.host if request.client else "unknown"
+        client = scope.get("client")
+        client_host = client[0] if client else "unknown"
     return client_host or "unknown", "ip"
 
 # simple non disributed fallaback for redis unavailability , use only for short outages 
@@ -56,24 +68,33 @@ async def _in_memory_allow(key: str, limit: int, window: int):
     Simple per-process fixed-window counter fallback.
     use only for short outages .
     """
-    async with _in_memory_lock:
-        now = int(time.time())
-        existing = _in_memory_counters.get(key)
-        if not existing or existing["expires_at"] <= now:
-            _in_memory_counters[key] = {"count": 1, "expires_at": now + window}
-            remaining = max(0, limit - 1)
-            reset_ts = now + window
-            return True, remaining, reset_ts
-        else:
-            if existing["count"] >= limit:
-                remaining = 0
-                reset_ts = existing["expires_at"]
-                return False, remaining, reset_ts
-            else:
-                existing["count"] += 1
-                remaining = max(0, limit - existing["count"])
-                reset_ts = existing["expires_at"]
-                return True, remaining, reset_ts
+    shared = _shared_fallback_limiter()
+    if shared is not None:
+        return shared.allow(key, limit, window)
+    return local_fallback_limiter.allow(key, limit, window)
 
+def _shared_fallback_limiter():
+    if _shared_fallback["limiter"] is None and not _shared_fallback["unavailable"]:
+        try:
+            _shared_fallback["limiter"] = SharedFixedWindow(SHARED_FALLBACK_PATH, SHARED_FALLBACK_SLOTS,
+                                                            SHARED_FALLBACK_BUCKET_SLOTS).open()
+        except Exception:
+            _shared_fallback["unavailable"] = True
+            logger.warning("rate_limit.shared_fallback.unavailable", extra={"path": SHARED_FALLBACK_PATH})
+    return _shared_fallback["limiter"]
 
 
+async def _redis_unavailable_fallback(key: str, limit: int, window: int):
+    """
+    Redis failed / timed out / its circuit is open: local fixed window if enabled ,else the FAIL_OPEN policy.
+    """
+    if USE_IN_MEMORY_FALLBACK:
+        try:
+            return await _in_memory_allow(key, limit, window)
+        except Exception:
+            pass
+    now = int(time.time())
+    if FAIL_OPEN:
+        return True, max(0, limit - 1), now + window
+    # fail-closed: deny
+    return False, 0, now + window
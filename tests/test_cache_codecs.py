@@ -0,0 +1,40 @@
+import msgpack
+import orjson
+import pytest
+from backend.cache import codecs
+from backend.cache.codecs import NamespaceCodec, decode_value, encode_value
+
+
+def test_namespace_codecs_round_trip():
+    item = {"id": "12", "public_id": "0190", "name": "fern", "price": 450, "created_at": "2025-01-01T00:00:00+00:00"}
+    packed = encode_value("listing_fragment", item)
+    assert packed[0] == codecs.CODEC_MARKER
+    assert packed[1] == codecs.CODECS["msgpack"].codec_id
+    assert decode_value("listing_fragment", packed) == item
+
+    body = orjson.dumps({"status": "ok"})
+    assert decode_value("products_listing", encode_value("products_listing", body)) == body
+    with pytest.raises(TypeError):
+        encode_value("products_listing", {"not": "bytes"})
+
+
+def test_large_values_are_compressed(monkeypatch):
+    monkeypatch.setitem(codecs.NAMESPACE_CODECS, "test_ns", NamespaceCodec("msgpack", compress_min_bytes=64))
+    value = {"names": ["monstera"] * 200}
+    packed = encode_value("test_ns", value)
+    assert packed[2] & codecs.FLAG_ZLIB
+    assert len(packed) < len(msgpack.packb(value))
+    assert decode_value("test_ns", packed) == value
+    # small ones are left alone
+    assert not encode_value("test_ns", {"a": 1})[2] & codecs.FLAG_ZLIB
+
+
+def test_readers_follow_the_entry_header_not_the_namespace(monkeypatch):
+    # entries written before the header existed use the namespace's legacy codec
+    assert decode_value("listing_fragment", b'{"id":"1"}') == {"id": "1"}
+
+    # switching a namespace's codec doesn't require a flush: old entries still decode
+    written_as_json = encode_value("some_ns", {"a": 1})
+    monkeypatch.setitem(codecs.NAMESPACE_CODECS, "some_ns", NamespaceCodec("msgpack"))
+    assert decode_value("some_ns", written_as_json) == {"a": 1}
+    assert decode_value("some_ns", encode_value("some_ns", {"a": 1})) == {"a": 1}
@@ -0,0 +1,81 @@
+import gzip
+import time
+import orjson
+from backend.cache.utils import (ENVELOPE_HEADER_SIZE, CachedBody, content_digest, etag_matches, make_cached_body,
+                                 pack_envelope, peek_envelope, representation_etag, unpack_envelope)
+from backend.config.cache_config import cache_settings
+
+
+def test_envelope_roundtrip_small_payload_identity_only():
+    payload = orjson.dumps({"status": "ok", "data": {"items": []}})
+    body = make_cached_body(payload)
+    assert body.gzipped is None
+
+    out, fresh_until = unpack_envelope(pack_envelope(body, 30))
+    assert out.identity == payload
+    assert out.gzipped is None
+    assert time.time() < fresh_until <= time.time() + 30
+
+
+def test_envelope_roundtrip_large_payload_keeps_gzip_variant():
+    payload = orjson.dumps({"items": [{"name": f"product {i}", "price": i} for i in range(200)]})
+    assert len(payload) >= cache_settings.GZIP_MIN_BYTES
+
+    body = make_cached_body(payload)
+    assert gzip.decompress(body.gzipped) == payload
+
+    raw = pack_envelope(body, 30)
+    # redis only holds the compressed variant
+    assert len(raw) < len(payload)
+
+    out, _ = unpack_envelope(raw)
+    assert out == body
+
+
+def test_envelope_reads_legacy_and_v1_entries():
+    legacy = orjson.dumps({"status": "ok"})
+    out, fresh_until = unpack_envelope(legacy)
+    assert out == CachedBody(legacy, None, content_digest(legacy))
+    assert fresh_until == float("inf")
+
+    import struct
+    v1 = struct.pack(">Bd", 1, 123.0) + legacy
+    out, fresh_until = unpack_envelope(v1)
+    assert out == CachedBody(legacy, None, content_digest(legacy))
+    assert fresh_until == 123.0
+
+    v2 = struct.pack(">BBd", 2, 0, 456.0) + legacy
+    out, fresh_until = unpack_envelope(v2)
+    assert out.identity == legacy
+    assert out.digest == content_digest(legacy)
+    assert fresh_until == 456.0
+    # no digest in the header ,conditional requests fall back to reading the body
+    assert peek_envelope(v2[:ENVELOPE_HEADER_SIZE]) is None
+
+
+def test_envelope_header_alone_carries_the_etag_digest():
+    payload = orjson.dumps({"items": [{"name": f"product {i}", "price": i} for i in range(200)]})
+    body = make_cached_body(payload)
+
+    raw = pack_envelope(body, 30)
+    digest, gzipped, fresh_until = peek_envelope(raw[:ENVELOPE_HEADER_SIZE])
+    assert digest == body.digest == content_digest(payload)
+    assert gzipped is True
+    assert fresh_until > time.time()
+
+
+class _FakeRequest:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_etag_matches_either_coding_and_weak_form():
+    digest = content_digest(b'{"status":"ok"}')
+    assert representation_etag(digest, False) != representation_etag(digest, True)
+
+    for header in (representation_etag(digest, False), representation_etag(digest, True),
+                   "W/" + representation_etag(digest, False), '"nope", ' + representation_etag(digest, True), "*"):
+        assert etag_matches(_FakeRequest({"if-none-match": header}), digest)
+
+    assert not etag_matches(_FakeRequest({"if-none-match": '"nope"'}), digest)
+    assert not etag_matches(_FakeRequest({}), digest)
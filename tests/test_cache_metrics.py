@@ -0,0 +1,41 @@
+import random
+from prometheus_client import CollectorRegistry, generate_latest
+from backend.cache.metrics import HotKeyCollector, SpaceSaving
+
+
+def test_space_saving_tracks_heavy_hitters():
+    sketch = SpaceSaving(capacity=16)
+    rng = random.Random(7)
+    stream = ["hot-a"] * 500 + ["hot-b"] * 300 + [f"cold-{rng.randrange(5000)}" for _ in range(2000)]
+    rng.shuffle(stream)
+    for item in stream:
+        sketch.offer(item)
+
+    top = sketch.top(2)
+    assert [item for item, _, _ in top] == ["hot-a", "hot-b"]
+    for item, count, error in top:
+        true_count = stream.count(item)
+        # space-saving only over-estimates ,and never by more than the recorded error
+        assert true_count <= count <= true_count + error
+    assert sketch.total == len(stream)
+
+
+def test_space_saving_is_bounded():
+    sketch = SpaceSaving(capacity=8)
+    for i in range(10_000):
+        sketch.offer(i)
+    assert len(sketch) == 8
+    assert sum(count for _, count, _ in sketch.top(8)) == sketch.total
+
+
+def test_hot_key_collector_exports_top_n():
+    sketch = SpaceSaving(capacity=8)
+    for _ in range(3):
+        sketch.offer(("products_listing", "k1"))
+    sketch.offer(("product_details", "product:x"))
+
+    registry = CollectorRegistry()
+    registry.register(HotKeyCollector(sketch, top_n=1))
+    text = generate_latest(registry).decode()
+    assert 'phyl_cache_hot_key_lookups{key="k1",namespace="products_listing"} 3.0' in text
+    assert "product:x" not in text
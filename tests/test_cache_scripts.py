@@ -0,0 +1,39 @@
+import hashlib
+import pytest
+from redis.exceptions import NoScriptError
+from backend.cache.lua_scripts import CACHE_SCRIPT_SHAS, CACHE_SCRIPTS
+from backend.cache.utils import eval_cache_script
+
+
+def test_each_cache_script_has_its_own_content_sha():
+    assert set(CACHE_SCRIPT_SHAS) == set(CACHE_SCRIPTS)
+    assert len(set(CACHE_SCRIPT_SHAS.values())) == len(CACHE_SCRIPT_SHAS)
+    for name, src in CACHE_SCRIPTS.items():
+        assert CACHE_SCRIPT_SHAS[name] == hashlib.sha1(src.encode()).hexdigest()
+
+
+class _FlushedRedis:
+    """Script cache starts empty (restart / failover) ,EVAL loads the script like redis does."""
+    def __init__(self):
+        self.loaded = set()
+        self.calls = []
+
+    async def evalsha(self, sha, numkeys, *args):
+        self.calls.append("evalsha")
+        if sha not in self.loaded:
+            raise NoScriptError("NOSCRIPT No matching script")
+        return [0, b"v"]
+
+    async def eval(self, src, numkeys, *args):
+        self.calls.append("eval")
+        self.loaded.add(hashlib.sha1(src.encode()).hexdigest())
+        return [0, b"v"]
+
+
+@pytest.mark.asyncio
+async def test_noscript_is_recovered_transparently():
+    fake = _FlushedRedis()
+    for _ in range(2):
+        assert await eval_cache_script(fake, "get_or_lock", 2, "k", "k:lock", "t", 5000, 0) == [0, b"v"]
+    # one reload after the flush ,then a single EVALSHA per call
+    assert fake.calls == ["evalsha", "eval", "evalsha"]
@@ -0,0 +1,62 @@
+import random
+from datetime import timedelta
+import pytest
+from sqlalchemy import delete, insert, select
+from backend.background_workers.catalog_outbox_sweeper import CatalogOutboxSweeper
+from backend.common.utils import now
+from backend.db.connection import async_session
+from backend.products.constants import CATALOG_CHANGED_TOPIC
+from backend.schema.full_schema import OutboxEvent, OutboxEventStatus
+
+
+async def _pending_row(age_seconds: float, attempts: int = 0) -> int:
+    async with async_session() as session:
+        res = await session.execute(insert(OutboxEvent).values(
+            topic=CATALOG_CHANGED_TOPIC, payload={"product_id": 1, "product_public_id": "p", "reason": "test"},
+            aggregate_type="product", aggregate_id=random.randint(10**8, 2**31 - 1),
+            status=OutboxEventStatus.PENDING.value, attempts=attempts,
+            created_at=now() - timedelta(seconds=age_seconds)).returning(OutboxEvent.id))
+        await session.commit()
+        return res.scalar_one()
+
+async def _row(outbox_id: int):
+    async with async_session() as session:
+        return (await session.execute(select(OutboxEvent).where(OutboxEvent.id == outbox_id))).scalar_one()
+
+async def _drop(*ids):
+    async with async_session() as session:
+        await session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_stale_pending_rows_are_redelivered_with_backoff():
+    fresh, stale = await _pending_row(age_seconds=1), await _pending_row(age_seconds=120)
+    published = []
+    sweeper = CatalogOutboxSweeper(async_session, interval=1, grace=30, batch=1000)
+    sweeper._publish = lambda topic, task: published.append(task)
+    try:
+        await sweeper.sweep()
+        # the fresh row is still the fast path's
+        assert [t["outbox_event_id"] for t in published if t["outbox_event_id"] in (fresh, stale)] == [stale]
+        row = await _row(stale)
+        assert row.attempts == 1 and row.next_retry_at > now()
+
+        # not due again until the backoff passes
+        published.clear()
+        await sweeper.sweep()
+        assert stale not in [t["outbox_event_id"] for t in published]
+    finally:
+        await _drop(fresh, stale)
+
+
+@pytest.mark.asyncio
+async def test_row_is_failed_after_max_attempts():
+    outbox_id = await _pending_row(age_seconds=120, attempts=3)
+    sweeper = CatalogOutboxSweeper(async_session, interval=1, grace=30, batch=1000, max_attempts=3)
+    sweeper._publish = lambda topic, task: None
+    try:
+        await sweeper.sweep()
+        assert (await _row(outbox_id)).status == OutboxEventStatus.FAILED.value
+    finally:
+        await _drop(outbox_id)
@@ -0,0 +1,81 @@
+import asyncio
+import time
+import uuid
+import pytest
+from backend.cache.existence_filter import BloomFilter, ProductExistenceFilter
+
+
+def _uuid7_at(millis: int) -> uuid.UUID:
+    # timestamp in the top 48 bits ,version 7 ,variant 10
+    value = (millis << 80) | (0x7 << 76) | (0b10 << 62) | uuid.uuid4().int & ((1 << 62) - 1)
+    return uuid.UUID(int=value)
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    members = [str(uuid.uuid4()) for _ in range(5000)]
+    bloom = BloomFilter(capacity=len(members), error_rate=0.01)
+    for m in members:
+        bloom.add(m)
+
+    assert all(m in bloom for m in members)
+
+    probes = [str(uuid.uuid4()) for _ in range(20000)]
+    false_positives = sum(1 for p in probes if p in bloom)
+    assert false_positives / len(probes) < 0.03
+
+
+@pytest.mark.asyncio
+async def test_existence_filter_rejects_unknown_ids_but_never_new_uuid7_ids():
+    old_ms = int((time.time() - 3600) * 1000)
+    live = [str(_uuid7_at(old_ms)) for _ in range(100)]
+
+    async def loader():
+        return live
+
+    f = ProductExistenceFilter(error_rate=0.001, grace_seconds=30, rebuild_interval=600)
+    # nothing built yet ,everything goes through
+    assert f.might_exist(str(uuid.uuid4()))
+
+    f._loader = loader
+    await f.rebuild()
+
+    assert all(f.might_exist(pid) for pid in live)
+    assert not f.might_exist(str(uuid.uuid4()))
+    assert not f.might_exist(str(_uuid7_at(old_ms)))
+    assert not f.might_exist("not-a-uuid")
+    # created after the snapshot ,catalog.changed rebuild may still be pending
+    assert f.might_exist(str(_uuid7_at(int(time.time() * 1000))))
+
+
+@pytest.mark.asyncio
+async def test_created_ids_are_added_without_a_reload_even_mid_build():
+    old_ms = int((time.time() - 3600) * 1000)
+    live = [str(_uuid7_at(old_ms)) for _ in range(10)]
+    loads = []
+    release = asyncio.Event()
+
+    async def loader():
+        loads.append(1)
+        await release.wait()
+        return list(live)
+
+    f = ProductExistenceFilter(error_rate=0.001, grace_seconds=30, rebuild_interval=600)
+    f._loader = loader
+    release.set()
+    await f.rebuild()
+
+    # minted before the snapshot (eg. a non uuid7 id) ,only add() lets it through
+    created = str(uuid.uuid4())
+    assert not f.might_exist(created)
+    f.add(created)
+    assert f.might_exist(created) and len(loads) == 1
+
+    # an add landing while the periodic snapshot loads is kept in the new filter
+    release.clear()
+    build = asyncio.create_task(f.rebuild())
+    await asyncio.sleep(0)
+    late = str(uuid.uuid4())
+    f.add(late)
+    release.set()
+    await build
+    assert f.might_exist(late) and len(loads) == 2
@@ -1,5 +1,6 @@
 
 import asyncio
+import uuid
 import pytest
 from httpx import AsyncClient
 from asgi_lifespan import LifespanManager
@@ -8,7 +9,13 @@ from backend.db.dependencies import get_session
 from backend.main import app
 from sqlmodel import SQLModel, select
 
-import backend.products.routes as products_module
+import backend.products.routes as routes_module
+import backend.products.services as services_module
+from backend.cache.l1_cache import l1_cache
+from backend.cache.listing_index import listing_index
+from backend.config.cache_config import cache_settings
+from backend.db.connection import async_session
+from backend.products.repository import fetch_prods
 
 @pytest.fixture
 async def ac_client():
@@ -20,14 +27,29 @@ async def ac_client():
 async def clear_redis():
     from backend.cache._cache import redis_client
     await redis_client.flushdb()
+    l1_cache.clear()
 
 
+async def _concurrent_listing(ac_client, n=5):
+    async def do_request():
+        resp = await ac_client.get("/api/v1/products?limit=10")
+        assert resp.status_code == 200, resp.text
+        return resp.json()
+
+    results = await asyncio.gather(*[do_request() for _ in range(n)])
+    # all responses should be structurally same
+    first_items = results[0]["data"]["items"]
+    for r in results[1:]:
+        assert r["data"]["items"] == first_items
+    return first_items
+
 
 @pytest.mark.asyncio
 async def test_products_cache_lock_thundering_herd(ac_client, monkeypatch):
-
+    # per-page cache path (index off / not built yet)
+    monkeypatch.setattr(cache_settings, "LISTING_INDEX_ENABLED", False)
     call_count = {"count": 0}
-    original_fetch_prods = products_module.fetch_prods
+    original_fetch_prods = services_module.fetch_prods
 
     async def slow_fetch_prods(session, cursor_vals, limit):
         call_count["count"] += 1
@@ -35,19 +57,76 @@ async def test_products_cache_lock_thundering_herd(ac_client, monkeypatch):
         await asyncio.sleep(0.1)
         return await original_fetch_prods(session, cursor_vals, limit)
 
-    monkeypatch.setattr(products_module, "fetch_prods", slow_fetch_prods)
+    monkeypatch.setattr(services_module, "fetch_prods", slow_fetch_prods)
 
-    async def do_request():
-        resp = await ac_client.get("/api/v1/products?limit=10")
-        assert resp.status_code == 200, resp.text
-        return resp.json()
+    await _concurrent_listing(ac_client)
+    assert call_count["count"] == 1
 
-    # 5 concurrent requests with same params
-    results = await asyncio.gather(*[do_request() for _ in range(5)])
 
-    # all responses should be structurally same
-    first_items = results[0]["data"]["items"]
-    for r in results[1:]:
-        assert r["data"]["items"] == first_items
+@pytest.mark.asyncio
+async def test_products_listing_served_from_index(ac_client, monkeypatch):
+    # the lifespan scheduled the build ,wait for it (or build here if another run held the lock)
+    if listing_index._rebuild_task:
+        await listing_index._rebuild_task
+    assert await listing_index.rebuild_if_missing()
 
-    assert call_count["count"] == 1
+    async def no_fetch_prods(*args):
+        raise AssertionError("listing served from the per-page path")
+    monkeypatch.setattr(services_module, "fetch_prods", no_fetch_prods)
+
+    loads = []
+    original_load_items = listing_index._load_items
+    async def counting_load_items(ids):
+        loads.append(list(ids))
+        await asyncio.sleep(0.05)
+        return await original_load_items(ids)
+    monkeypatch.setattr(listing_index, "_load_items", counting_load_items)
+
+    items = await _concurrent_listing(ac_client)
+    # cold fragments: one flight ,one db load for the whole page
+    assert len(loads) == 1
+
+    # same page ,same order as the db listing
+    async with async_session() as session:
+        rows = await fetch_prods(session, None, 10)
+    assert [it["public_id"] for it in items] == [str(r._mapping["public_id"]) for r in rows[:10]]
+
+    # fragments are in redis now ,a cold L1 reassembles the page without touching the db
+    l1_cache.clear()
+    assert await _concurrent_listing(ac_client) == items
+    assert len(loads) == 1
+
+
+@pytest.mark.asyncio
+async def test_products_listing_revalidation_skips_the_page(ac_client, monkeypatch):
+    resp = await ac_client.get("/api/v1/products?limit=5")
+    assert resp.status_code == 200, resp.text
+    etag = resp.headers["etag"]
+
+    async def no_listing_page(*args):
+        raise AssertionError("304 built the page body")
+    monkeypatch.setattr(routes_module, "listing_page", no_listing_page)
+
+    resp = await ac_client.get("/api/v1/products?limit=5", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_products_batch_details_in_request_order(ac_client):
+
+    resp = await ac_client.get("/api/v1/products?limit=5")
+    assert resp.status_code == 200, resp.text
+    public_ids = [it["public_id"] for it in resp.json()["data"]["items"]]
+    assert public_ids
+
+    unknown_id = str(uuid.uuid4())
+    requested = list(reversed(public_ids)) + [unknown_id]
+
+    # first call fills redis from one db query ,second is served from MGET
+    for _ in range(2):
+        resp = await ac_client.post("/api/v1/products/batch", json={"public_ids": requested})
+        assert resp.status_code == 200, resp.text
+        items = resp.json()["data"]["items"]
+        assert [it["public_id"] for it in items[:-1]] == requested[:-1]
+        assert items[-1] is None
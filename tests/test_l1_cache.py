@@ -0,0 +1,50 @@
+import time
+from backend.cache.l1_cache import L1Cache
+
+
+def test_l1_lru_eviction_by_bytes():
+    cache = L1Cache(max_bytes=10, default_ttl=60)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    # touch a so b becomes least recently used
+    assert cache.get("a") == b"1234"
+    cache.set("c", b"1234")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.get("c") == b"1234"
+    assert cache.size_bytes == 8
+
+
+def test_l1_oversized_payload_not_cached():
+    cache = L1Cache(max_bytes=4, default_ttl=60)
+    cache.set("a", b"12")
+    cache.set("big", b"123456")
+    assert cache.get("big") is None
+    assert cache.get("a") == b"12"
+
+
+def test_l1_per_entry_ttl(monkeypatch):
+    cache = L1Cache(max_bytes=100, default_ttl=60)
+    cache.set("short", b"x", ttl=1)
+    cache.set("long", b"y", ttl=30)
+
+    real_monotonic = time.monotonic
+    monkeypatch.setattr(time, "monotonic", lambda: real_monotonic() + 5)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == b"y"
+
+
+def test_l1_invalidate_dependents():
+    cache = L1Cache(max_bytes=100, default_ttl=60)
+    cache.set("phyl:products_listing:p1", b"p1", depends_on=("phyl:catalog:version",))
+    cache.set("phyl:products_listing:p2", b"p2", depends_on=("phyl:catalog:version",))
+    cache.set("product:abc", b"d", depends_on=("product:abc:ver",))
+
+    cache.invalidate_dependents("phyl:catalog:version")
+
+    assert cache.get("phyl:products_listing:p1") is None
+    assert cache.get("phyl:products_listing:p2") is None
+    assert cache.get("product:abc") == b"d"
+    assert cache.size_bytes == 1
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from backend.cache import listing_index as li
+from backend.cache.listing_index import ListingEntry, ListingIndex, index_member, index_score
+
+
+def test_index_order_matches_listing_order():
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = [(7, base), (3, base), (12, base + timedelta(microseconds=1)), (1, base - timedelta(days=400)),
+            (100, base + timedelta(seconds=5))]
+    # fetch_prods: created_at desc ,id asc
+    expected = sorted(rows, key=lambda r: (-r[1].timestamp(), r[0]))
+    by_index = sorted(rows, key=lambda r: (index_score(r[1]), index_member(r[0])))
+    assert by_index == expected
+
+
+class _FakeRedis:
+    """Just enough of a zset + strings for ListingIndex.page ,the page script is emulated in python."""
+    def __init__(self):
+        self.zset = {}
+        self.strings = {}
+
+    def page(self, score, member, count):
+        ordered = sorted(self.zset.items(), key=lambda kv: (kv[1], kv[0]))
+        start = 0
+        if score:
+            start = sum(1 for m, s in ordered if (s, m) <= (int(score), member))
+        return [m.encode() for m, _ in ordered[start:start + count]]
+
+    async def mget(self, keys):
+        return [self.strings.get(k) for k in keys]
+
+    async def zrem(self, key, *members):
+        for m in members:
+            self.zset.pop(m, None)
+
+
+@pytest.mark.asyncio
+async def test_page_backfills_fragments_and_drops_gone_products(monkeypatch):
+    fake = _FakeRedis()
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    created = {pid: base - timedelta(minutes=pid) for pid in range(1, 6)}
+    for pid, ts in created.items():
+        fake.zset[index_member(pid)] = index_score(ts)
+    deleted = {3}
+    stored = {}
+
+    async def eval_cache_script(client, name, numkeys, key, ready_key, score, member, count):
+        return fake.page(score, member, count)
+
+    async def load_items(ids):
+        return {pid: ListingEntry({"id": str(pid)}, created[pid], 1) for pid in ids if pid not in deleted}
+
+    async def store(entries, index):
+        stored.update(entries)
+        for pid, entry in entries.items():
+            fake.strings[li.listing_fragment_key(pid)] = b'1|{"id":"%d"}' % pid
+
+    monkeypatch.setattr(li, "redis_client", fake)
+    monkeypatch.setattr(li, "eval_cache_script", eval_cache_script)
+    index = ListingIndex(fragment_ttl=60, rebuild_chunk=10, rebuild_lock_seconds=10)
+    monkeypatch.setattr(index, "_store", store)
+    index._load_items = load_items
+
+    # product 3 is gone from the db ,it leaves the zset and has_more still looks past it
+    items, has_more = await index.page(None, 2)
+    assert [i["id"] for i in items] == ["1", "2"]
+    assert has_more
+    assert index_member(3) not in fake.zset
+    assert set(stored) == {1, 2, 4}
+
+    # next page: 4 comes from its backfilled fragment ,only 5 is loaded
+    stored.clear()
+    items, has_more = await index.page((created[2], 2), 2)
+    assert [i["id"] for i in items] == ["4", "5"]
+    assert not has_more
+    assert set(stored) == {5}
+
+
+@pytest.mark.asyncio
+async def test_page_requeries_past_a_run_of_gone_products(monkeypatch):
+    fake = _FakeRedis()
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    created = {pid: base - timedelta(minutes=pid) for pid in range(1, 9)}
+    for pid, ts in created.items():
+        fake.zset[index_member(pid)] = index_score(ts)
+    deleted = {2, 3, 4, 5}
+
+    async def eval_cache_script(client, name, numkeys, key, ready_key, score, member, count):
+        return fake.page(score, member, count)
+
+    async def load_items(ids):
+        return {pid: ListingEntry({"id": str(pid)}, created[pid], 1) for pid in ids if pid not in deleted}
+
+    async def store(entries, index):
+        for pid in entries:
+            fake.strings[li.listing_fragment_key(pid)] = b'1|{"id":"%d"}' % pid
+
+    monkeypatch.setattr(li, "redis_client", fake)
+    monkeypatch.setattr(li, "eval_cache_script", eval_cache_script)
+    index = ListingIndex(fragment_ttl=60, rebuild_chunk=10, rebuild_lock_seconds=10)
+    monkeypatch.setattr(index, "_store", store)
+    index._load_items = load_items
+
+    # more gone products in a row than one re-query skips ,the page still fills and has_more holds
+    items, has_more = await index.page(None, 2)
+    assert [i["id"] for i in items] == ["1", "6"]
+    assert has_more
+    assert not deleted & {int(m) for m in fake.zset}
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from backend.cache import cache_get_n_set as cgs
+from backend.cache.l1_cache import l1_cache
+from backend.cache.utils import CachedBody
+
+
+@pytest.mark.asyncio
+async def test_prefetch_is_budgeted_and_deduplicated(monkeypatch):
+    monkeypatch.setattr(cgs.cache_settings, "CACHE_PREFETCH_MAX_IN_FLIGHT", 2)
+    release = asyncio.Event()
+    filled = []
+
+    async def get_or_lock(key, lock_key, token):
+        return cgs.GET_OR_LOCK_GRANTED, None
+
+    async def fill_and_release(key, lock_key, token, loader, ttl, hard_ttl):
+        await release.wait()
+        filled.append(key)
+        return CachedBody(await loader())
+
+    async def loader():
+        return b"{}"
+
+    monkeypatch.setattr(cgs, "_get_or_lock", get_or_lock)
+    monkeypatch.setattr(cgs, "_fill_and_release", fill_and_release)
+    l1_cache.clear()
+
+    assert cgs.prefetch_listing("products_listing", "page-2", 60, loader)
+    # same key again while the first prefetch runs => skipped
+    assert not cgs.prefetch_listing("products_listing", "page-2", 60, loader)
+    assert cgs.prefetch_listing("products_listing", "page-3", 60, loader)
+    # budget of 2 in flight is used up
+    assert not cgs.prefetch_listing("products_listing", "page-4", 60, loader)
+
+    release.set()
+    await asyncio.gather(*list(cgs._prefetches.values()))
+    assert sorted(filled) == [cgs.listing_cache_key("products_listing", "page-2"),
+                              cgs.listing_cache_key("products_listing", "page-3")]
+    assert not cgs._prefetches
+
+
+@pytest.mark.asyncio
+async def test_prefetch_never_waits_on_another_workers_lock(monkeypatch):
+    async def get_or_lock(key, lock_key, token):
+        return cgs.GET_OR_LOCK_BUSY, None
+
+    async def loader():
+        raise AssertionError("busy keys are filled by the lock holder")
+
+    monkeypatch.setattr(cgs, "_get_or_lock", get_or_lock)
+    l1_cache.clear()
+
+    assert cgs.prefetch_listing("products_listing", "page-9", 60, loader)
+    await asyncio.gather(*list(cgs._prefetches.values()))
+    assert not cgs._prefetches
+
+
+@pytest.mark.asyncio
+async def test_next_page_hook_skips_l1_hits(monkeypatch):
+    async def get_or_fill_listing(namespace, key, ttl, hard_ttl, loader, mode, lock_timeout):
+        body = CachedBody(b'{"data":{}}')
+        cgs._remember(key, body, ttl)
+        return body
+
+    async def loader():
+        return b"{}"
+
+    monkeypatch.setattr(cgs, "_get_or_fill_listing", get_or_fill_listing)
+    l1_cache.clear()
+    fetched = []
+
+    for _ in range(3):
+        await cgs.cache_get_or_set_product_listings("products_listing", "page-1", 60, loader,
+                                                    on_fetched=fetched.append)
+    # the redis / loader result is handed over once ,the L1 hits after it are not
+    assert fetched == [CachedBody(b'{"data":{}}')]
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+import orjson
+import pytest
+from backend.cache import cache_prod_details as cpd
+from backend.cache.cache_prod_details import _details_payload, with_availability
+
+
+def _row(**overrides):
+    row = {
+        "public_id": "0190a1b2-0000-7000-8000-000000000001",
+        "stock_qty": 7,
+        "name": "fern",
+        "description": "x" * 2000,
+        "base_price": 1200,
+        "specs": {"light": "low"},
+        "updated_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        "categories": [{"id": 1, "name": "indoor"}],
+    }
+    row.update(overrides)
+    return row
+
+
+def test_static_document_does_not_carry_stock():
+    body, version, stock_qty = _details_payload(_row())
+    assert stock_qty == 7
+    assert "stock_qty" not in orjson.loads(body.identity)["data"]
+
+    # a stock movement alone produces the exact same static document
+    other, _, _ = _details_payload(_row(stock_qty=3))
+    assert other.identity == body.identity
+
+
+def test_availability_is_spliced_into_the_cached_bytes():
+    body, _, _ = _details_payload(_row())
+
+    merged = with_availability(body, 42)
+    doc = orjson.loads(merged.identity)
+    assert doc["data"]["stock_qty"] == 42
+    assert doc["data"]["name"] == "fern"
+    assert merged.gzipped is None
+
+    # etag follows the stock ,not only the static document
+    assert with_availability(body, 41).digest != merged.digest
+    assert with_availability(body, 42).digest == merged.digest
+
+
+class _AvailabilityRedis:
+    def __init__(self, qty):
+        self.qty = qty
+        self.hgets = 0
+
+    async def hget(self, key, field):
+        self.hgets += 1
+        return str(self.qty).encode()
+
+    async def eval(self, script, numkeys, key, qty, version, ttl, channel):
+        self.qty = int(qty)
+        return 1
+
+
+@pytest.mark.asyncio
+async def test_availability_is_held_in_l1_until_the_stock_changes(monkeypatch):
+    fake = _AvailabilityRedis(7)
+    monkeypatch.setattr(cpd, "redis_client", fake)
+    cpd.l1_cache.clear()
+    pid = "0190a1b2-0000-7000-8000-000000000002"
+
+    async def load(session, public_id):
+        raise AssertionError("availability is warm in redis")
+
+    assert [await cpd._availability(None, pid, load) for _ in range(3)] == [7, 7, 7]
+    assert fake.hgets == 1
+
+    # a stock change drops this worker's copy right away (other workers on the script's PUBLISH)
+    await cpd.set_product_availability(pid, 3, 2)
+    assert await cpd._availability(None, pid, load) == 3
+    assert fake.hgets == 2
@@ -0,0 +1,77 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+import pytest
+from backend.cache import cache_prod_details as cpd
+
+
+class _Redis:
+    """Cold cache ,the lock is always granted."""
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, **kwargs):
+        return True
+
+    async def hget(self, key, field):
+        return b"3"
+
+
+class _Session:
+    def __init__(self):
+        self.closed = False
+
+
+class _SessionFactory:
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        factory = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                session = _Session()
+                factory.opened.append(session)
+                return session
+
+            async def __aexit__(self, *exc):
+                factory.opened[-1].closed = True
+        return _Ctx()
+
+
+@pytest.mark.asyncio
+async def test_shared_load_survives_the_leader_request(monkeypatch):
+    factory = _SessionFactory()
+    monkeypatch.setattr(cpd, "redis_client", _Redis())
+    monkeypatch.setattr(cpd, "async_session", factory)
+    monkeypatch.setattr(cpd.l1_cache, "get", lambda key: None)
+
+    async def noop(*args, **kwargs):
+        return True
+    for name in ("release_lock", "publish_fill", "set_product_cache_if_newer", "_try_set_availability"):
+        monkeypatch.setattr(cpd, name, noop)
+
+    used = []
+    async def load(session, pid):
+        used.append(session)
+        await asyncio.sleep(0.05)
+        assert not session.closed
+        return {"public_id": pid, "name": "fern", "stock_qty": 3,
+                "updated_at": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+
+    pid = str(uuid.uuid4())
+    leader_session, follower_session = _Session(), _Session()
+    leader = asyncio.create_task(cpd.cache_get_n_set_product_details(leader_session, pid, load))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(cpd.cache_get_n_set_product_details(follower_session, pid, load))
+    await asyncio.sleep(0)
+    # leader's request goes away (client disconnect) ,its session closes with it
+    leader.cancel()
+    leader_session.closed = True
+
+    body = await follower
+    assert b'"stock_qty":3' in body.identity
+    # one load ,on a session the flight opened itself
+    assert used == factory.opened[:1]
+    assert leader_session not in used
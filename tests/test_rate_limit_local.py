@@ -0,0 +1,38 @@
+from backend.rate_limiting.rate_limit_local import LocalFixedWindow
+
+NOW = 1_700_000_000
+
+
+def test_fixed_window_semantics():
+    limiter = LocalFixedWindow(max_keys=10)
+    results = [limiter.allow("k", 3, 60, now=NOW + i) for i in range(5)]
+    assert results == [(True, 2, NOW + 60), (True, 1, NOW + 60), (True, 0, NOW + 60),
+                       (False, 0, NOW + 60), (False, 0, NOW + 60)]
+    # next window starts fresh
+    assert limiter.allow("k", 3, 60, now=NOW + 60) == (True, 2, NOW + 120)
+
+
+def test_expired_windows_are_swept():
+    limiter = LocalFixedWindow(max_keys=1000)
+    for i in range(500):
+        limiter.allow(f"ip:{i}", 5, 10 + i % 7, now=NOW)
+    assert len(limiter) == 500
+
+    # a key restarted after its first window ends is not dropped with the old bucket
+    limiter.allow("ip:0", 5, 60, now=NOW + 10)
+    limiter.allow("other", 5, 60, now=NOW + 16)
+    assert len(limiter) == 2
+    assert not limiter._buckets.keys() - {NOW + 70, NOW + 76}
+
+
+def test_entry_cap_drops_the_window_closest_to_reset():
+    limiter = LocalFixedWindow(max_keys=3)
+    limiter.allow("long", 1, 600, now=NOW)
+    limiter.allow("short", 1, 5, now=NOW)
+    limiter.allow("mid", 1, 60, now=NOW)
+    limiter.allow("new", 1, 60, now=NOW + 1)
+
+    assert len(limiter) == 3
+    assert set(limiter._windows) == {"long", "mid", "new"}
+    # still limited ,the cap never resets a tracked window
+    assert limiter.allow("long", 1, 600, now=NOW + 2)[0] is False
@@ -0,0 +1,110 @@
+import pytest
+from backend.middlewares.rate_limit_asgi_middleware import RateLimitASGIMiddleware
+from backend.rate_limiting import policies as pol
+from backend.rate_limiting.policies import UNMATCHED_TEMPLATE, PolicyTable, RateLimitPolicy
+from backend.rate_limiting.rate_limit_local import LocalFixedWindow
+
+ROUTES = ["/api/v1/products", "/api/v1/products/{product_id}", "/api/v1/products/featured",
+          "/api/v1/products/{product_id}/reviews", "/api/v1/auth/login", "/api/v1/admin/products/{product_id}",
+          "/static/{file_path:path}", "/metrics"]
+LOGIN = RateLimitPolicy(limit=5, window=60, scope="ip")
+
+
+def _table():
+    return PolicyTable.compile(ROUTES, {"/api/v1/auth/login": LOGIN, "/api/v1/admin/*": None, "/metrics": None},
+                               RateLimitPolicy(limit=100), "fixed_window")
+
+
+@pytest.mark.parametrize("path,template", [
+    ("/api/v1/products", "/api/v1/products"),
+    ("/api/v1/products/", "/api/v1/products"),
+    ("/api/v1/products/3f2a9c", "/api/v1/products/{product_id}"),
+    ("/api/v1/products/featured", "/api/v1/products/featured"),
+    ("/api/v1/products/featured/reviews", "/api/v1/products/{product_id}/reviews"),
+    ("/static/css/site.css", "/static/{file_path:path}"),
+    ("/api/v1/products/3f2a9c/nope", UNMATCHED_TEMPLATE),
+    ("/wp-login.php", UNMATCHED_TEMPLATE),
+])
+def test_paths_resolve_to_their_route_template(path, template):
+    assert _table().resolve(path).template == template
+
+
+def test_explicit_prefix_and_exempt_policies():
+    table = _table()
+    login = table.resolve("/api/v1/auth/login")
+    assert (login.limit, login.window, login.scope) == (5, 60, "ip")
+    assert table.resolve("/api/v1/admin/products/1") is None
+    assert table.resolve("/metrics") is None
+    assert table.resolve("/api/v1/products/1").limit == 100
+
+
+def test_unknown_strategy_fails_at_compile_time():
+    with pytest.raises(ValueError):
+        PolicyTable.compile(ROUTES, {}, RateLimitPolicy(strategy="token_bucket"), "fixed_window")
+
+
+class _Route:
+    def __init__(self, path):
+        self.path = path
+
+class _App:
+    routes = [_Route(p) for p in ROUTES]
+
+
+async def _endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+async def _get(middleware, path, client="10.0.0.1"):
+    sent = []
+    async def send(message):
+        sent.append(message)
+    scope = {"type": "http", "path": path, "headers": [], "client": (client, 5000), "app": _App}
+    await middleware(scope, None, send)
+    return sent[0]["status"], dict(sent[0]["headers"])
+
+
+@pytest.mark.asyncio
+async def test_middleware_limits_per_template_and_adds_headers(monkeypatch):
+    limiter = LocalFixedWindow(max_keys=100)
+    keys = []
+    async def local_allow(key, limit, window):
+        keys.append(key)
+        return limiter.allow(key, limit, window)
+    monkeypatch.setitem(pol.RATE_LIMIT_STRATEGIES, "fixed_window", local_allow)
+    middleware = RateLimitASGIMiddleware(_endpoint, default=RateLimitPolicy(limit=3, window=60))
+
+    statuses = [(await _get(middleware, f"/api/v1/products/{i}"))[0] for i in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    assert set(keys) == {"rl:ip:10.0.0.1:/api/v1/products/{product_id}"}
+
+    status, headers = await _get(middleware, "/api/v1/products", client="10.0.0.2")
+    assert status == 200
+    assert headers[b"content-type"] == b"text/plain"
+    assert (headers[b"x-ratelimit-limit"], headers[b"x-ratelimit-remaining"]) == (b"3", b"2")
+
+    status, headers = await _get(middleware, "/api/v1/products/9")
+    assert status == 429 and b"retry-after" in headers
+
+
+async def _lifespan_app(scope, receive, send):
+    # routers are included inside the app's lifespan ,before it reports startup complete
+    await send({"type": "lifespan.startup.complete"})
+
+async def _startup(middleware):
+    sent = []
+    async def send(message):
+        sent.append(message)
+    await middleware({"type": "lifespan", "app": _App}, None, send)
+    return sent[-1]
+
+
+@pytest.mark.asyncio
+async def test_table_is_compiled_at_startup_and_bad_policies_fail_it():
+    middleware = RateLimitASGIMiddleware(_lifespan_app, default=RateLimitPolicy(limit=3, window=60))
+    assert (await _startup(middleware))["type"] == "lifespan.startup.complete"
+    assert middleware._table.resolve("/api/v1/products/9").template == "/api/v1/products/{product_id}"
+
+    broken = RateLimitASGIMiddleware(_lifespan_app, default=RateLimitPolicy(strategy="token_bucket"))
+    message = await _startup(broken)
+    assert message["type"] == "lifespan.startup.failed" and "token_bucket" in message["message"]
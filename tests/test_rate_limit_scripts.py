@@ -0,0 +1,41 @@
+import hashlib
+import pytest
+from redis.exceptions import NoScriptError
+from backend.rate_limiting import utils
+from backend.rate_limiting.lua_scripts import RATE_LIMIT_SCRIPT_SHAS, RATE_LIMIT_SCRIPTS
+
+
+def test_each_strategy_has_its_own_content_sha():
+    assert set(RATE_LIMIT_SCRIPT_SHAS) == set(RATE_LIMIT_SCRIPTS)
+    assert len(set(RATE_LIMIT_SCRIPT_SHAS.values())) == len(RATE_LIMIT_SCRIPT_SHAS)
+    for name, src in RATE_LIMIT_SCRIPTS.items():
+        assert RATE_LIMIT_SCRIPT_SHAS[name] == hashlib.sha1(src.encode()).hexdigest()
+
+
+class _FlushedRedis:
+    """Script cache starts empty (restart / failover) ,EVAL loads the script like redis does."""
+    def __init__(self):
+        self.loaded = set()
+        self.calls = []
+
+    async def evalsha(self, sha, numkeys, *args):
+        self.calls.append("evalsha")
+        if sha not in self.loaded:
+            raise NoScriptError("NOSCRIPT No matching script")
+        return [1, 1000]
+
+    async def eval(self, src, numkeys, *args):
+        self.calls.append("eval")
+        self.loaded.add(hashlib.sha1(src.encode()).hexdigest())
+        return [1, 1000]
+
+
+@pytest.mark.asyncio
+async def test_noscript_is_recovered_transparently(monkeypatch):
+    fake = _FlushedRedis()
+    monkeypatch.setattr(utils, "redis_client", fake)
+
+    assert await utils.eval_rate_limit_script("fixed_window", 1, "rl:k", 60000) == [1, 1000]
+    assert await utils.eval_rate_limit_script("fixed_window", 1, "rl:k", 60000) == [1, 1000]
+    # one reload after the flush ,then a single EVALSHA per call
+    assert fake.calls == ["evalsha", "eval", "evalsha"]
@@ -0,0 +1,62 @@
+import multiprocessing
+import pytest
+from backend.rate_limiting.rate_limit_shared import SharedFixedWindow
+
+pytest.importorskip("fcntl")
+
+NOW = 1_700_000_000
+
+
+def _hammer(path: str, key: str, calls: int, limit: int) -> int:
+    limiter = SharedFixedWindow(path, slots=1024, bucket_slots=8).open()
+    try:
+        return sum(limiter.allow(key, limit, 60, now=NOW)[0] for _ in range(calls))
+    finally:
+        limiter.close()
+
+
+def test_workers_share_one_limit(tmp_path):
+    path = str(tmp_path / "rl")
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        admitted = pool.starmap(_hammer, [(path, "rl:ip:1.2.3.4:/x", 500, 300)] * 4)
+    # four processes on one table ,together exactly the limit
+    assert sum(admitted) == 300
+
+
+def test_fixed_window_semantics_and_reuse_of_ended_windows(tmp_path):
+    limiter = SharedFixedWindow(str(tmp_path / "rl"), slots=8, bucket_slots=8).open()
+    try:
+        assert [limiter.allow("k", 2, 60, now=NOW)[:2] for _ in range(3)] == [(True, 1), (True, 0), (False, 0)]
+        for i in range(7):
+            limiter.allow(f"other:{i}", 2, 10, now=NOW)
+        # bucket full ,the ended windows make room without touching "k"
+        for i in range(7):
+            assert limiter.allow(f"later:{i}", 2, 60, now=NOW + 10)[0]
+        assert limiter.allow("k", 2, 60, now=NOW + 10) == (False, 0, NOW + 60)
+    finally:
+        limiter.close()
+
+
+def test_full_bucket_gives_up_the_window_closest_to_reset(tmp_path):
+    limiter = SharedFixedWindow(str(tmp_path / "rl"), slots=4, bucket_slots=4).open()
+    try:
+        for i, window in enumerate((600, 5, 600, 600)):
+            limiter.allow(f"k{i}", 1, window, now=NOW)
+        limiter.allow("new", 1, 60, now=NOW)
+        assert limiter.allow("k1", 1, 5, now=NOW)[0]          # its window was dropped ,starts over
+        assert not limiter.allow("k0", 1, 600, now=NOW)[0]
+    finally:
+        limiter.close()
+
+
+def test_second_opener_adopts_the_existing_layout(tmp_path):
+    path = str(tmp_path / "rl")
+    first = SharedFixedWindow(path, slots=64, bucket_slots=8).open()
+    second = SharedFixedWindow(path, slots=4096, bucket_slots=16).open()
+    try:
+        assert (second.buckets, second.bucket_slots) == (8, 8)
+        first.allow("k", 1, 60, now=NOW)
+        assert not second.allow("k", 1, 60, now=NOW)[0]
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,36 @@
+import time
+import pytest
+import pytest_asyncio
+from backend.cache._cache import redis_client
+from backend.rate_limiting.rate_limit_leaky_bucket import redis_allow_gcra
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def clear_and_close_redis():
+    await redis_client.flushdb()
+    try:
+        yield
+    finally:
+        await redis_client.flushdb()
+        await redis_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_gcra_allows_a_burst_of_limit_then_denies():
+    key = "rl:test:gcra"
+    results = [await redis_allow_gcra(key, 5, 60) for _ in range(6)]
+
+    assert [allowed for allowed, _, _ in results] == [True] * 5 + [False]
+    assert [remaining for _, remaining, _ in results] == [4, 3, 2, 1, 0, 0]
+    # next request is allowed one emission interval (60s / 5) after the burst
+    _, _, reset = results[-1]
+    assert 0 < reset - int(time.time()) <= 13
+
+
+@pytest.mark.asyncio
+async def test_gcra_keeps_one_value_per_key():
+    key = "rl:test:gcra:mem"
+    for _ in range(50):
+        await redis_allow_gcra(key, 100, 60)
+    assert await redis_client.type(key) == b"string"
+    assert 0 < await redis_client.pttl(key) <= 60_000
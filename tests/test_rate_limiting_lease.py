@@ -0,0 +1,69 @@
+import asyncio
+from collections import OrderedDict
+import pytest
+import pytest_asyncio
+from backend.cache._cache import redis_client
+from backend.rate_limiting import rate_limit_lease as lease
+from backend.rate_limiting.rate_limit_lease import redis_allow_leased
+
+LIMIT = 50
+WINDOW_S = 60
+LEASE = 10
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def clear_and_close_redis(monkeypatch):
+    monkeypatch.setattr(lease, "_leases", OrderedDict())
+    await redis_client.flushdb()
+    try:
+        yield
+    finally:
+        await redis_client.flushdb()
+        await redis_client.aclose()
+
+
+@pytest.fixture
+def claims(monkeypatch):
+    """redis round trips made by the limiter"""
+    calls = []
+    real = lease.eval_rate_limit_script
+
+    async def counting(name, *args):
+        calls.append(name)
+        return await real(name, *args)
+    monkeypatch.setattr(lease, "eval_rate_limit_script", counting)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_one_round_trip_per_lease_and_none_once_the_window_is_used_up(claims):
+    results = [await redis_allow_leased("rl:test:lease:seq", LIMIT, WINDOW_S, LEASE) for _ in range(LIMIT + 20)]
+
+    assert [r[0] for r in results] == [True] * LIMIT + [False] * 20
+    assert [r[1] for r in results[:LIMIT]] == list(range(LIMIT - 1, -1, -1))
+    # 5 leases ,the last one already saw the counter at the limit so the denials stay local
+    assert len(claims) == LIMIT // LEASE
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_claim(claims):
+    results = await asyncio.gather(*(redis_allow_leased("rl:test:lease:burst", LIMIT, WINDOW_S, LEASE)
+                                     for _ in range(30)))
+
+    assert all(allowed for allowed, _, _ in results)
+    assert len(claims) == 3
+
+
+@pytest.mark.asyncio
+async def test_workers_never_admit_more_than_the_limit(monkeypatch):
+    # three workers ,each with its own lease table ,taking turns on one key
+    workers = [OrderedDict() for _ in range(3)]
+    admitted = 0
+    for i in range(3 * LIMIT):
+        monkeypatch.setattr(lease, "_leases", workers[i % 3])
+        allowed, _, _ = await redis_allow_leased("rl:test:lease:workers", LIMIT, WINDOW_S, LEASE)
+        admitted += allowed
+
+    assert admitted == LIMIT
+    # leftovers are bounded by lease size x workers
+    assert sum(l.tokens for w in workers for l in w.values()) < LEASE * 3
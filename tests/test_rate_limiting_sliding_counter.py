@@ -0,0 +1,91 @@
+import bisect
+import random
+import pytest
+import pytest_asyncio
+from backend.cache._cache import redis_client
+from backend.rate_limiting.rate_limit_sliding_counter import redis_allow_sliding_counter
+
+LIMIT = 100
+WINDOW_S = 60
+WINDOW_MS = WINDOW_S * 1000
+START_MS = 1_700_000_000_000 - 1_700_000_000_000 % WINDOW_MS
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def clear_and_close_redis():
+    await redis_client.flushdb()
+    try:
+        yield
+    finally:
+        await redis_client.flushdb()
+        await redis_client.aclose()
+
+
+async def _admitted(key: str, arrivals: list) -> list:
+    admitted = []
+    for t in arrivals:
+        allowed, _, _ = await redis_allow_sliding_counter(key, LIMIT, WINDOW_S, now_ms=t)
+        if allowed:
+            admitted.append(t)
+    return admitted
+
+def _max_exact_window_count(admitted: list) -> int:
+    """What the zset log measures: most admitted requests in any sliding window."""
+    return max((i - bisect.bisect_left(admitted, t - WINDOW_MS + 1) + 1 for i, t in enumerate(admitted)), default=0)
+
+def _poisson(rate_per_s: float, windows: int, seed: int) -> list:
+    rng = random.Random(seed)
+    t, out = float(START_MS), []
+    while t < START_MS + windows * WINDOW_MS:
+        t += rng.expovariate(rate_per_s / 1000)
+        out.append(int(t))
+    return out
+
+
+@pytest.mark.asyncio
+async def test_under_the_limit_nothing_is_denied():
+    arrivals = _poisson(rate_per_s=LIMIT / WINDOW_S / 2, windows=6, seed=1)
+    assert await _admitted("rl:test:swc:under", arrivals) == arrivals
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("overload", [2, 5])
+async def test_sustained_overload_stays_close_to_the_exact_log(overload):
+    windows = 8
+    arrivals = _poisson(rate_per_s=overload * LIMIT / WINDOW_S, windows=windows, seed=overload)
+    admitted = await _admitted(f"rl:test:swc:{overload}", arrivals)
+
+    # never more than 15% over what the exact log would allow in any sliding window
+    assert _max_exact_window_count(admitted) <= LIMIT * 1.15
+    # and the limit is actually usable: >= 90% of it admitted on average
+    assert len(admitted) >= 0.9 * LIMIT * windows
+    # any single fixed window never exceeds the limit
+    per_window = {}
+    for t in admitted:
+        per_window[t // WINDOW_MS] = per_window.get(t // WINDOW_MS, 0) + 1
+    assert max(per_window.values()) <= LIMIT
+
+
+@pytest.mark.asyncio
+async def test_worst_case_boundary_burst_is_bounded_by_twice_the_limit():
+    # everything at the very end of one window ,then a burst right after the boundary
+    end_of_window = START_MS + WINDOW_MS - 1
+    arrivals = [end_of_window] * (2 * LIMIT) + [START_MS + WINDOW_MS + i for i in range(2 * LIMIT)]
+    admitted = await _admitted("rl:test:swc:burst", arrivals)
+
+    assert admitted.count(end_of_window) == LIMIT
+    assert _max_exact_window_count(admitted) <= 2 * LIMIT
+
+
+@pytest.mark.asyncio
+async def test_denied_request_reports_when_it_would_fit():
+    for _ in range(LIMIT):
+        await redis_allow_sliding_counter("rl:test:swc:reset", LIMIT, WINDOW_S, now_ms=START_MS)
+    allowed, remaining, reset_ts = await redis_allow_sliding_counter("rl:test:swc:reset", LIMIT, WINDOW_S,
+                                                                     now_ms=START_MS)
+    assert not allowed and remaining == 0
+    # the full window turns into the previous one at the boundary and then slides out
+    assert START_MS // 1000 + WINDOW_S < reset_ts <= START_MS // 1000 + 2 * WINDOW_S
+    allowed, _, _ = await redis_allow_sliding_counter("rl:test:swc:reset", LIMIT, WINDOW_S,
+                                                      now_ms=(reset_ts + 1) * 1000)
+    assert allowed
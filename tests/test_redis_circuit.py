@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError
+from backend.cache import _cache
+from backend.common.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+@pytest.mark.asyncio
+async def test_guarded_calls_open_the_circuit_on_transport_errors_only(monkeypatch):
+    circuit = CircuitBreaker(name="redis-test", failure_threshold=2, recovery_timeout=60)
+    monkeypatch.setattr(_cache, "redis_circuit", circuit)
+
+    async def script_error():
+        raise ResponseError("NOSCRIPT")
+
+    async def down():
+        raise RedisConnectionError("connection refused")
+
+    # command level errors say nothing about redis health
+    for _ in range(3):
+        with pytest.raises(ResponseError):
+            await _cache._guarded(script_error())
+    assert not circuit.is_open
+
+    for _ in range(2):
+        with pytest.raises(RedisConnectionError):
+            await _cache._guarded(down())
+    assert circuit.is_open
+
+    async def ok():
+        return b"v"
+
+    # open: fails fast without running the call
+    call = ok()
+    with pytest.raises(CircuitOpenError):
+        await _cache._guarded(call)
+    call.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_timeouts_do_not_open_the_circuit(monkeypatch):
+    circuit = CircuitBreaker(name="redis-test", failure_threshold=2, recovery_timeout=60)
+    monkeypatch.setattr(_cache, "redis_circuit", circuit)
+
+    async def pool_exhausted():
+        raise RedisConnectionError("No connection available.")
+
+    # every connection of this worker's pool busy ,redis itself is fine
+    for _ in range(5):
+        with pytest.raises(RedisConnectionError):
+            await _cache._guarded(pool_exhausted())
+    assert not circuit.is_open
+
+
+@pytest.mark.asyncio
+async def test_half_open_lets_a_single_probe_through(monkeypatch):
+    circuit = CircuitBreaker(name="redis-test", failure_threshold=1, recovery_timeout=60)
+    monkeypatch.setattr(_cache, "redis_circuit", circuit)
+    circuit.record_failure()
+    circuit._opened_at -= 60   # recovery timeout passed
+    release = asyncio.Event()
+
+    async def slow_ok():
+        await release.wait()
+        return b"v"
+
+    async def ok():
+        return b"v"
+
+    probe = asyncio.create_task(_cache._guarded(slow_ok()))
+    await asyncio.sleep(0)
+    # probe in flight ,everyone else fails fast to their fallback
+    call = ok()
+    with pytest.raises(CircuitOpenError):
+        await _cache._guarded(call)
+    call.close()
+
+    release.set()
+    assert await probe == b"v"
+    assert await _cache._guarded(ok()) == b"v"
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from backend.cache.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_singleflight_coalesces_concurrent_callers():
+    flights = SingleFlight()
+    calls = {"count": 0}
+
+    async def loader():
+        calls["count"] += 1
+        await asyncio.sleep(0.05)
+        return b"payload"
+
+    results = await asyncio.gather(*[flights.do("phyl:products_listing:k", loader) for _ in range(20)])
+
+    assert results == [b"payload"] * 20
+    assert calls["count"] == 1
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_singleflight_shares_errors_and_forgets_key():
+    flights = SingleFlight()
+    calls = {"count": 0}
+
+    async def failing():
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    results = await asyncio.gather(*[flights.do("k", failing) for _ in range(5)], return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert calls["count"] == 1
+
+    async def ok():
+        return 1
+
+    # next call after a failure runs again
+    assert await flights.do("k", ok) == 1
+
+
+@pytest.mark.asyncio
+async def test_singleflight_leader_cancel_does_not_cancel_followers():
+    flights = SingleFlight()
+
+    async def loader():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.create_task(flights.do("k", loader))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("k", loader))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "done"